@@ -0,0 +1,117 @@
+import argparse
+import time
+import numpy as np
+from collections import defaultdict
+from dataset_analyzer.store import AnnotationStore
+from dataset_analyzer.stats import StatsCalculator
+
+def build_store(num_images: int, boxes_per_image: int, num_classes: int, seed: int = 0) -> AnnotationStore:
+    rng = np.random.default_rng(seed)
+    store = AnnotationStore()
+    store.set_classes([f"class_{i}" for i in range(num_classes)])
+    counts = rng.poisson(boxes_per_image, num_images)
+    for row in range(num_images):
+        store.add_image(str(row), f"{row}.jpg", f"/data/{row}.jpg", int(rng.integers(320, 1920)), int(rng.integers(240, 1080)), ["train", "val"][row % 2])
+    image_index = np.repeat(np.arange(num_images), counts)
+    n = len(image_index)
+    w = rng.uniform(0.005, 0.6, n)
+    h = rng.uniform(0.005, 0.6, n)
+    x = rng.uniform(0, 1 - w)
+    y = rng.uniform(0, 1 - h)
+    class_ids = rng.integers(0, num_classes, n)
+    for row, bx, by, bw, bh, cid in zip(image_index.tolist(), x.tolist(), y.tolist(), w.tolist(), h.tolist(), class_ids.tolist()):
+        store.add_box(row, bx, by, bw, bh, cid)
+    store.finalize()
+    return store
+
+def loop_stats(store: AnnotationStore, grid_size: int = 10) -> dict:
+    # Reference implementation: the per-box Python loops the vectorized calculator replaced
+    class_counts = defaultdict(int)
+    areas, aspect_ratios, boxes_per_image = [], [], []
+    tiny = small = medium = large = 0
+    heatmap = np.zeros((grid_size, grid_size))
+    per_class = defaultdict(lambda: np.zeros((grid_size, grid_size)))
+    edges = {"top": 0, "bottom": 0, "left": 0, "right": 0, "center": 0}
+    xs, ys, ws, hs, cs = (a.tolist() for a in (store.x, store.y, store.w, store.h, store.class_ids))
+    widths, heights, offsets = store.widths.tolist(), store.heights.tolist(), store.offsets.tolist()
+    for row in range(store.num_images):
+        start, end = offsets[row], offsets[row + 1]
+        boxes_per_image.append(end - start)
+        for i in range(start, end):
+            name = store.classes[cs[i]]
+            class_counts[name] += 1
+            pw, ph = ws[i] * widths[row], hs[i] * heights[row]
+            area = pw * ph
+            areas.append(area)
+            if ph > 0:
+                aspect_ratios.append(pw / ph)
+            if pw < 16 or ph < 16:
+                tiny += 1
+            if area < 32 * 32:
+                small += 1
+            elif area < 96 * 96:
+                medium += 1
+            else:
+                large += 1
+            gx = min(int((xs[i] + ws[i] / 2) * grid_size), grid_size - 1)
+            gy = min(int((ys[i] + hs[i] / 2) * grid_size), grid_size - 1)
+            heatmap[gy, gx] += 1
+            per_class[name][gy, gx] += 1
+            if ys[i] < 0.05:
+                edges["top"] += 1
+            elif ys[i] + hs[i] > 0.95:
+                edges["bottom"] += 1
+            elif xs[i] < 0.05:
+                edges["left"] += 1
+            elif xs[i] + ws[i] > 0.95:
+                edges["right"] += 1
+            else:
+                edges["center"] += 1
+    return {
+        "class_distribution": dict(sorted(class_counts.items(), key=lambda x: -x[1])),
+        "counts": (tiny, small, medium, large),
+        "areas_sum": sum(areas),
+        "aspect_count": len(aspect_ratios),
+        "boxes_per_image": boxes_per_image,
+        "heatmap": heatmap,
+        "per_class": dict(per_class),
+        "edges": edges,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vectorized stats against the per-box loop")
+    parser.add_argument("--images", type=int, default=100_000)
+    parser.add_argument("--boxes-per-image", type=float, default=10)
+    parser.add_argument("--classes", type=int, default=80)
+    args = parser.parse_args()
+    
+    store = build_store(args.images, args.boxes_per_image, args.classes)
+    print(f"{store.num_images} images, {store.num_boxes} boxes")
+    
+    start = time.perf_counter()
+    expected = loop_stats(store)
+    loop_time = time.perf_counter() - start
+    
+    calculator = StatsCalculator(store)
+    start = time.perf_counter()
+    dataset_stats = calculator.compute_dataset_stats()
+    box_stats = calculator.compute_box_stats()
+    spatial_stats = calculator.compute_spatial_stats()
+    vector_time = time.perf_counter() - start
+    
+    assert dataset_stats.class_distribution == expected["class_distribution"]
+    assert (box_stats.tiny_boxes, box_stats.small_count, box_stats.medium_count, box_stats.large_count) == expected["counts"]
+    assert box_stats.boxes_per_image["max"] == max(expected["boxes_per_image"])
+    heatmap = expected["heatmap"] / expected["heatmap"].max()
+    assert np.allclose(spatial_stats.heatmap, heatmap)
+    for name, h in expected["per_class"].items():
+        assert np.allclose(spatial_stats.per_class_heatmaps[name], h / h.max())
+    total = store.num_boxes
+    assert spatial_stats.edge_proximity == {k: round(v / total * 100, 1) for k, v in expected["edges"].items()}
+    
+    print(f"loop:       {loop_time:.3f}s")
+    print(f"vectorized: {vector_time:.3f}s ({loop_time / vector_time:.0f}x)")
+    print("outputs match")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from dataset_analyzer.parsers import VOCParser, DEFAULT_PARSE_WORKERS
+from dataset_analyzer.parsers import voc
+
+def write_dataset(root: Path, num_files: int, boxes_per_image: int, num_classes: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    annotations = root / "Annotations"
+    annotations.mkdir(parents=True)
+    (root / "JPEGImages").mkdir()
+    for i in range(num_files):
+        width, height = int(rng.integers(320, 1920)), int(rng.integers(240, 1080))
+        objects = []
+        for _ in range(rng.poisson(boxes_per_image)):
+            x0, y0 = int(rng.integers(0, width - 8)), int(rng.integers(0, height - 8))
+            x1, y1 = int(rng.integers(x0 + 1, width)), int(rng.integers(y0 + 1, height))
+            objects.append(
+                f"<object><name>class_{rng.integers(num_classes)}</name><difficult>0</difficult>"
+                f"<bndbox><xmin>{x0}</xmin><ymin>{y0}</ymin><xmax>{x1}</xmax><ymax>{y1}</ymax></bndbox></object>"
+            )
+        (annotations / f"{i:07d}.xml").write_text(
+            f"<annotation><folder>JPEGImages</folder><filename>{i:07d}.jpg</filename>"
+            f"<size><width>{width}</width><height>{height}</height><depth>3</depth></size>{''.join(objects)}</annotation>"
+        )
+        (root / "JPEGImages" / f"{i:07d}.jpg").touch()
+
+def run(root: Path, workers: int) -> tuple[float, VOCParser]:
+    parser = VOCParser(root)
+    parser.parse_workers = workers
+    start = time.perf_counter()
+    parser.parse()
+    return time.perf_counter() - start, parser
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare VOC XML parsing throughput across backends and worker counts")
+    parser.add_argument("--files", type=int, default=50_000)
+    parser.add_argument("--boxes-per-image", type=float, default=5)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=DEFAULT_PARSE_WORKERS)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_dataset(root, args.files, args.boxes_per_image, args.classes)
+        
+        backends = [("ElementTree", "etree")]
+        if voc.lxml_etree is not None:
+            backends.append(("lxml", "lxml"))
+        default_backend = voc.XML_BACKEND
+        
+        baseline = None
+        for name, backend in backends:
+            voc.XML_BACKEND = backend
+            for workers in sorted({1, args.workers}):
+                elapsed, result = run(root, workers)
+                store = result.store
+                if baseline is None:
+                    baseline = store
+                    print(f"{store.num_images} images, {store.num_boxes} boxes")
+                assert store.ids == baseline.ids and store.classes == baseline.classes
+                assert np.array_equal(store.class_ids, baseline.class_ids) and np.array_equal(store.w, baseline.w)
+                print(f"{name:<12} workers={workers:<3} {elapsed:.2f}s  {args.files / elapsed:,.0f} files/s")
+        voc.XML_BACKEND = default_backend
+    print("outputs match")
+
+if __name__ == "__main__":
+    main()
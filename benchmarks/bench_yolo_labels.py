@@ -0,0 +1,88 @@
+import argparse
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from dataset_analyzer.imageheader import DEFAULT_IO_WORKERS
+from dataset_analyzer.parsers import YOLOParser
+from dataset_analyzer.parsers.yolo import LABEL_BATCH_SIZE, read_label_files
+from dataset_analyzer.store import AnnotationStore
+
+def write_labels(root: Path, num_labels: int, labels_per_file: int, num_classes: int, seed: int = 0) -> list[Path]:
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(0, num_labels, labels_per_file):
+        n = min(labels_per_file, num_labels - i)
+        boxes = rng.uniform(0, 1, (n, 4))
+        classes = rng.integers(0, num_classes, n)
+        lines = [f"{c} {x:.6f} {y:.6f} {w:.6f} {h:.6f}" for c, (x, y, w, h) in zip(classes.tolist(), boxes.tolist())]
+        # Every tenth file carries a confidence column, like exported predictions
+        if len(paths) % 10 == 0:
+            lines = [f"{line} {score:.4f}" for line, score in zip(lines, rng.uniform(0, 1, n).tolist())]
+        path = root / f"{len(paths):07d}.txt"
+        path.write_text("\n".join(lines) + "\n")
+        paths.append(path)
+    return paths
+
+def loop_labels(paths: list[Path], rows: list[int], store: AnnotationStore, num_declared_classes: int) -> None:
+    # Reference implementation: the per-line parsing and per-box appends the bulk reader replaced
+    for path, row in zip(paths, rows):
+        for line in path.read_text().splitlines():
+            parts = line.strip().split()
+            if len(parts) < 5:
+                continue
+            class_id = int(parts[0])
+            cx, cy, w, h = map(float, parts[1:5])
+            confidence = float(parts[5]) if len(parts) > 5 else None
+            class_name = store.classes[class_id] if class_id < num_declared_classes else f"class_{class_id}"
+            store.add_box(row, cx - w / 2, cy - h / 2, w, h, store.class_id(class_name), confidence)
+
+def new_store(num_files: int, classes: list[str]) -> AnnotationStore:
+    store = AnnotationStore()
+    store.set_classes(classes)
+    for row in range(num_files):
+        store.add_image(str(row), f"{row}.jpg", f"/data/{row}.jpg", 640, 480)
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bulk YOLO label parsing against the per-line loop")
+    parser.add_argument("--labels", type=int, default=1_000_000)
+    parser.add_argument("--labels-per-file", type=int, default=10)
+    parser.add_argument("--classes", type=int, default=80)
+    parser.add_argument("--io-workers", type=int, default=DEFAULT_IO_WORKERS)
+    args = parser.parse_args()
+    # Half the classes are declared, so the rest take the class_<id> fallback
+    classes = [f"name_{i}" for i in range(args.classes // 2)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_labels(Path(tmp), args.labels, args.labels_per_file, args.classes)
+        print(f"{len(paths)} label files, {args.labels} labels")
+        rows = list(range(len(paths)))
+        
+        expected = new_store(len(paths), classes)
+        start = time.perf_counter()
+        loop_labels(paths, rows, expected, len(classes))
+        expected.finalize()
+        loop_time = time.perf_counter() - start
+        
+        yolo = YOLOParser(Path(tmp))
+        yolo._num_declared_classes = len(classes)
+        store = new_store(len(paths), classes)
+        start = time.perf_counter()
+        for i in range(0, len(paths), LABEL_BATCH_SIZE):
+            batch = paths[i:i + LABEL_BATCH_SIZE]
+            yolo._add_labels(store, np.array(rows[i:i + LABEL_BATCH_SIZE], dtype=np.int32), read_label_files(batch, args.io_workers))
+        store.finalize()
+        bulk_time = time.perf_counter() - start
+    
+    assert store.classes == expected.classes
+    assert np.array_equal(store.offsets, expected.offsets)
+    for column in ("x", "y", "w", "h", "class_ids", "confidence"):
+        assert np.array_equal(getattr(store, column), getattr(expected, column), equal_nan=True), column
+    
+    print(f"loop: {loop_time:.3f}s  {args.labels / loop_time:,.0f} labels/s")
+    print(f"bulk: {bulk_time:.3f}s  {args.labels / bulk_time:,.0f} labels/s ({loop_time / bulk_time:.1f}x)")
+    print("outputs match")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-from .core import Dataset, dataset
+from .core import Dataset
+from .registry import DatasetRegistry, registry
 from .models import DatasetInfo, ImageInfo, BoundingBox
+from .store import AnnotationStore
 
 __version__ = "0.1.0"
-__all__ = ["Dataset", "dataset", "DatasetInfo", "ImageInfo", "BoundingBox"]
+__all__ = ["Dataset", "DatasetRegistry", "registry", "DatasetInfo", "ImageInfo", "BoundingBox", "AnnotationStore"]
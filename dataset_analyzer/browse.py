@@ -0,0 +1,82 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Optional
+from .parsers import detect_format
+
+DETECT_WORKERS = 16
+DETECT_TIME_BUDGET = 2.0
+DETECT_CACHE_SIZE = 4096
+
+class FormatDetector:
+    # Results are cached per directory and keyed by its mtime; detections still running when the
+    # time budget runs out keep going in the background and land in the cache for the next request.
+    def __init__(self, workers: int = DETECT_WORKERS, cache_size: int = DETECT_CACHE_SIZE):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detect")
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[int, Optional[str]]] = OrderedDict()
+        self._pending: dict[tuple[str, int], Future] = {}
+        self._lock = threading.Lock()
+    
+    def _cached(self, path: str, mtime_ns: int) -> tuple[bool, Optional[str]]:
+        with self._lock:
+            entry = self._cache.get(path)
+            if entry is None or entry[0] != mtime_ns:
+                return False, None
+            self._cache.move_to_end(path)
+            return True, entry[1]
+    
+    def _detect(self, path: str, mtime_ns: int) -> Optional[str]:
+        try:
+            parser = detect_format(Path(path))
+        except Exception:
+            with self._lock:
+                self._pending.pop((path, mtime_ns), None)
+            raise
+        result = parser.format.value.upper() if parser else None
+        with self._lock:
+            self._cache[path] = (mtime_ns, result)
+            self._cache.move_to_end(path)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self._pending.pop((path, mtime_ns), None)
+        return result
+    
+    def submit(self, path: str, mtime_ns: int) -> Future:
+        with self._lock:
+            # Folders still being probed from an earlier request are not scanned twice
+            future = self._pending.get((path, mtime_ns))
+            if future is None:
+                future = self._pending[(path, mtime_ns)] = self.executor.submit(self._detect, path, mtime_ns)
+            return future
+    
+    def detect(self, path: str) -> Optional[str]:
+        mtime_ns = os.stat(path).st_mtime_ns
+        hit, result = self._cached(path, mtime_ns)
+        return result if hit else self.submit(path, mtime_ns).result()
+    
+    def detect_many(self, paths: dict[str, int], time_budget: float = DETECT_TIME_BUDGET) -> tuple[dict[str, str], list[str]]:
+        # paths maps folder path -> mtime_ns; returns detected formats plus folders still unresolved
+        detected = {}
+        futures = {}
+        for path, mtime_ns in paths.items():
+            hit, result = self._cached(path, mtime_ns)
+            if not hit:
+                futures[self.submit(path, mtime_ns)] = path
+            elif result is not None:
+                detected[path] = result
+        
+        done, _ = wait(futures, timeout=time_budget)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception:
+                continue
+            if result is not None:
+                detected[futures[future]] = result
+        unresolved = [futures[future] for future in futures if future not in done]
+        return detected, unresolved
+
+detector = FormatDetector()
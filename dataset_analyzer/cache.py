@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import Optional
+from .parsers import BaseParser
+from .store import AnnotationStore, ARRAY_FIELDS
+
+CACHE_VERSION = 3
+# Per-image string columns are stored as one NUL-separated UTF-8 blob each; NUL cannot occur in a path,
+# and a single split decodes several times faster than JSON or per-string offsets
+STRING_FIELDS = ("ids", "filenames", "filepaths")
+DEFAULT_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "dataset_analyzer"
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _save_strings(path: Path, values: list[str]) -> None:
+    blob = "\0".join(values)
+    if blob.count("\0") != max(len(values) - 1, 0):
+        raise ValueError(f"{path.stem} contains a NUL character")
+    np.save(path, np.frombuffer(blob.encode(), dtype=np.uint8))
+
+def _load_strings(path: Path, count: int) -> list[str]:
+    values = np.load(path).tobytes().decode().split("\0") if count else []
+    if len(values) != count:
+        raise ValueError(f"{path.stem} holds {len(values)} strings, expected {count}")
+    return values
+
+def _load_array(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Zero-length arrays cannot be memory-mapped
+        return np.load(path)
+
+class ParseCache:
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, content_hash: bool = False):
+        self.root = Path(root)
+        self.content_hash = content_hash
+    
+    def _entry_dir(self, parser: BaseParser) -> Path:
+        key = hashlib.sha1(str(parser.dataset_path.resolve()).encode()).hexdigest()[:20]
+        return self.root / key
+    
+    def fingerprint(self, parser: BaseParser, snapshot: Optional[dict[str, tuple[int, int]]] = None) -> str:
+        if snapshot is None:
+            snapshot = parser.snapshot_files()
+        digest = hashlib.sha1(f"{CACHE_VERSION}:{parser.format.value}\n".encode())
+        for path, (size, mtime_ns) in sorted(snapshot.items()):
+            digest.update(f"{path}\0{size}\0{mtime_ns}\n".encode())
+            # YOLO image directories are tracked by listing mtime only; there is no content to hash
+            if self.content_hash and stat.S_ISREG(os.stat(path).st_mode):
+                digest.update(_file_digest(Path(path)).encode())
+        return digest.hexdigest()
+    
+    def load(self, parser: BaseParser, fingerprint: Optional[str] = None) -> bool:
+        entry = self._entry_dir(parser)
+        try:
+            meta = json.loads((entry / "meta.json").read_text())
+            if meta.get("version") != CACHE_VERSION or meta.get("format") != parser.format.value:
+                return False
+            if meta.get("fingerprint") != (fingerprint or self.fingerprint(parser)):
+                return False
+            
+            store = AnnotationStore()
+            store.classes = meta["classes"]
+            store.split_names = meta["split_names"]
+            for field in STRING_FIELDS:
+                setattr(store, field, _load_strings(entry / f"{field}.npy", meta["num_images"]))
+            for field in ARRAY_FIELDS:
+                setattr(store, field, _load_array(entry / f"{field}.npy"))
+            store.rebuild_indexes()
+        except (OSError, ValueError, KeyError):
+            return False
+        
+        parser.store = store
+        parser.splits = meta["splits"]
+        parser.unresolved = meta.get("unresolved", {})
+        parser.undeclared_classes = meta.get("undeclared_classes", [])
+        return True
+    
+    def save(self, parser: BaseParser, fingerprint: Optional[str] = None) -> None:
+        entry = self._entry_dir(parser)
+        staging = entry.with_name(f"{entry.name}.{uuid.uuid4().hex}.tmp")
+        store = parser.store
+        try:
+            staging.mkdir(parents=True)
+            for field in ARRAY_FIELDS:
+                np.save(staging / f"{field}.npy", np.ascontiguousarray(getattr(store, field)))
+            for field in STRING_FIELDS:
+                _save_strings(staging / f"{field}.npy", getattr(store, field))
+            meta = {
+                "version": CACHE_VERSION,
+                "format": parser.format.value,
+                "path": str(parser.dataset_path),
+                "fingerprint": fingerprint or self.fingerprint(parser),
+                "splits": parser.splits,
+                "unresolved": parser.unresolved,
+                "undeclared_classes": parser.undeclared_classes,
+                "classes": store.classes,
+                "split_names": store.split_names,
+                "num_images": store.num_images,
+            }
+            (staging / "meta.json").write_text(json.dumps(meta))
+            
+            # Swap directories instead of overwriting files that may still be memory-mapped
+            if entry.exists():
+                retired = entry.with_name(f"{entry.name}.{uuid.uuid4().hex}.old")
+                os.replace(entry, retired)
+                shutil.rmtree(retired, ignore_errors=True)
+            os.replace(staging, entry)
+        except (OSError, ValueError):
+            shutil.rmtree(staging, ignore_errors=True)
+    
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
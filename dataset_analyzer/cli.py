@@ -2,6 +2,15 @@ import argparse
 import webbrowser
 import uvicorn
 from pathlib import Path
+from .imageheader import DEFAULT_IO_WORKERS
+from .cache import ParseCache, DEFAULT_CACHE_DIR
+from .stats import DEFAULT_IMAGE_SAMPLE_SIZE
+from .pixels import DEFAULT_PIXEL_WORKERS
+from .parsers import DEFAULT_PARSE_WORKERS
+from .parsers import voc
+from .thumbnails import thumbnails, DEFAULT_THUMBNAIL_CACHE_BYTES
+from .duplicates import hash_cache
+from .registry import DEFAULT_MEMORY_BUDGET
 
 def main():
     parser = argparse.ArgumentParser(description="Dataset Analyzer")
@@ -9,18 +18,46 @@ def main():
     parser.add_argument("--port", type=int, default=5151, help="Port to run server on")
     parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
     parser.add_argument("--no-browser", action="store_true", help="Don't open browser")
+    parser.add_argument("--io-workers", type=int, default=DEFAULT_IO_WORKERS, help="Threads used to read image headers")
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR), help="Directory for the parsed dataset cache")
+    parser.add_argument("--no-cache", action="store_true", help="Always reparse instead of using the parse cache")
+    parser.add_argument("--hash-annotations", action="store_true", help="Include annotation file contents in the cache key")
+    parser.add_argument("--image-sample-size", type=int, default=DEFAULT_IMAGE_SAMPLE_SIZE, help="Images decoded for brightness statistics")
+    parser.add_argument("--image-sampling", choices=["random", "stratified", "first"], default="random", help="How brightness sample images are chosen")
+    parser.add_argument("--pixel-workers", type=int, default=DEFAULT_PIXEL_WORKERS, help="Processes used to decode sample images (1 disables the pool)")
+    parser.add_argument("--parse-workers", type=int, default=DEFAULT_PARSE_WORKERS, help="Processes used to parse annotation files (1 disables the pool)")
+    parser.add_argument("--xml-backend", choices=voc.XML_BACKENDS, default=voc.XML_BACKEND, help="XML parser for Pascal VOC annotations (lxml needs the fast extra)")
+    parser.add_argument("--thumbnail-cache-mb", type=int, default=DEFAULT_THUMBNAIL_CACHE_BYTES >> 20, help="Disk budget for cached grid thumbnails")
+    parser.add_argument("--memory-budget-mb", type=int, default=DEFAULT_MEMORY_BUDGET >> 20, help="Memory for resident datasets before least recently used ones are evicted")
+    parser.add_argument("--watch", action="store_true", help="Apply label file changes to loaded datasets in the background")
+    parser.add_argument("--watch-interval", type=float, default=2.0, help="Minimum polling interval in seconds when watchdog is not installed")
     
     args = parser.parse_args()
     
+    from .registry import registry
+    registry.io_workers = args.io_workers
+    registry.image_sample_size = args.image_sample_size
+    registry.image_sampling = args.image_sampling
+    registry.pixel_workers = args.pixel_workers
+    registry.parse_workers = args.parse_workers
+    registry.memory_budget = args.memory_budget_mb << 20
+    thumbnails.root = Path(args.cache_dir) / "thumbnails"
+    thumbnails.max_bytes = args.thumbnail_cache_mb << 20
+    hash_cache.root = Path(args.cache_dir) / "hashes"
+    if args.xml_backend == "lxml" and voc.lxml_etree is None:
+        print("Error: --xml-backend lxml requires lxml (pip install lxml)")
+        return 1
+    voc.XML_BACKEND = args.xml_backend
+    registry.parse_cache = None if args.no_cache else ParseCache(Path(args.cache_dir), args.hash_annotations)
+    
     if args.path:
         dataset_path = Path(args.path).resolve()
         if not dataset_path.exists():
             print(f"Error: Path does not exist: {args.path}")
             return 1
         
-        from .core import dataset
         try:
-            info = dataset.load(str(dataset_path))
+            info = registry.load(str(dataset_path))
             print(f"Loaded {info.format.value.upper()} dataset: {info.name}")
             print(f"  Images: {info.total_images}")
             print(f"  Annotations: {info.total_annotations}")
@@ -29,6 +66,12 @@ def main():
             print(f"Error loading dataset: {e}")
             return 1
     
+    if args.watch:
+        from .watcher import DatasetWatcher
+        watcher = DatasetWatcher(registry, poll_interval=args.watch_interval)
+        watcher.start()
+        print(f"Watching for dataset changes ({'notifications' if watcher.uses_notifications else 'polling'})")
+    
     url = f"http://{args.host}:{args.port}"
     print(f"\nStarting server at {url}")
     
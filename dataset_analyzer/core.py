@@ -1,46 +1,219 @@
+import itertools
+import threading
+import numpy as np
+from collections import Counter
 from pathlib import Path
-from typing import Optional
-from .parsers import get_parser, BaseParser
-from .stats import StatsCalculator
-from .models import DatasetInfo, ImageInfo, DatasetStats, BoxStats, ImageStats, SpatialStats
+from typing import Callable, Optional
+from pydantic import BaseModel
+from .parsers import get_parser, BaseParser, LoadProgress, DEFAULT_PARSE_WORKERS
+from .stats import StatsCalculator, DEFAULT_IMAGE_SAMPLE_SIZE, DEFAULT_DUPLICATE_IOU, DEFAULT_OVERLAP_IOU, SIZE_BINS, ASPECT_BINS, GRID_SIZE
+from .cubes import StatsCubes
+from .index import FilterIndex
+from .imageheader import DEFAULT_IO_WORKERS
+from .cache import ParseCache
+from .pixels import DEFAULT_PIXEL_WORKERS
+from .jobs import StatsJobManager
+from .validation import IssueIndex, validate, DEFAULT_ISSUE_LIMIT
+from .duplicates import compute_image_hashes, find_duplicates, hash_cache, DEFAULT_HASH, DEFAULT_HAMMING_THRESHOLD, DEFAULT_GROUP_LIMIT
+from .models import DatasetFormat, DatasetInfo, ImageInfo, DatasetStats, BoxStats, ImageStats, SpatialStats, OverlapStats, GroupedStats, DriftStats, DuplicateStats, ValidationReport, ValidationIssue, RefreshResult
+
+# Shared by every Dataset so a generation number identifies one dataset version within the process
+_generations = itertools.count(1)
 
 class Dataset:
-    def __init__(self):
+    def __init__(self, io_workers: int = DEFAULT_IO_WORKERS, parse_cache: Optional[ParseCache] = None):
+        self.io_workers = io_workers
+        self.parse_cache = parse_cache
         self.parser: Optional[BaseParser] = None
         self.stats_calculator: Optional[StatsCalculator] = None
-        self._dataset_stats: Optional[DatasetStats] = None
-        self._box_stats: Optional[BoxStats] = None
-        self._image_stats: Optional[ImageStats] = None
-        self._spatial_stats: Optional[SpatialStats] = None
+        self.filter_index: Optional[FilterIndex] = None
+        # Every cached result is stored as (stats_calculator, value) and only served while that calculator is current
+        self._dataset_stats: Optional[tuple[StatsCalculator, DatasetStats]] = None
+        self._box_stats: Optional[tuple[StatsCalculator, BoxStats]] = None
+        self._image_stats: Optional[tuple[StatsCalculator, ImageStats]] = None
+        self._spatial_stats: Optional[tuple[StatsCalculator, SpatialStats]] = None
+        self._overlap_stats: Optional[tuple[StatsCalculator, OverlapStats]] = None
+        # Hashes are shared by every duplicate query on one dataset version
+        self._image_hashes: Optional[tuple[StatsCalculator, np.ndarray]] = None
+        self._issue_index: Optional[tuple[StatsCalculator, IssueIndex]] = None
+        self._stats_cubes: Optional[tuple[StatsCalculator, StatsCubes]] = None
+        self._split_groups: Optional[tuple[StatsCalculator, GroupedStats]] = None
+        self._class_groups: Optional[tuple[StatsCalculator, GroupedStats]] = None
+        self._drift_stats: Optional[tuple[StatsCalculator, DriftStats]] = None
+        self.image_sample_size = DEFAULT_IMAGE_SAMPLE_SIZE
+        self.image_sampling = "random"
+        self.pixel_workers = DEFAULT_PIXEL_WORKERS
+        self.parse_workers = DEFAULT_PARSE_WORKERS
+        self.generation = 0
+        self._update_lock = threading.Lock()
+        self.stats_jobs = StatsJobManager(self)
+        self.id: Optional[str] = None
     
-    def load(self, path: str) -> DatasetInfo:
+    def load(self, path: str, progress: Optional[LoadProgress] = None) -> DatasetInfo:
         dataset_path = Path(path).resolve()
         if not dataset_path.exists():
             raise ValueError(f"Path does not exist: {path}")
         
-        self.parser = get_parser(dataset_path)
-        self.parser.parse()
-        self.stats_calculator = StatsCalculator(self.parser.get_images())
+        # Parse off to the side; readers keep seeing the current dataset until the swap
+        parser = get_parser(dataset_path, self.io_workers)
+        parser.parse_workers = self.parse_workers
+        if progress is not None:
+            parser.progress = progress
+        progress = parser.progress
+        progress.phase = "scanning"
+        snapshot = parser.snapshot_files()
+        parser.file_state = snapshot
+        progress.total_files = len(snapshot)
+        progress.total_bytes = sum(size for size, _ in snapshot.values())
+        
+        progress.phase = "parsing"
+        if self.parse_cache is None:
+            parser.parse()
+        else:
+            fingerprint = self.parse_cache.fingerprint(parser, snapshot)
+            if not self.parse_cache.load(parser, fingerprint):
+                parser.parse()
+                progress.check()
+                self.parse_cache.save(parser, fingerprint)
         
-        self._dataset_stats = None
+        progress.phase = "indexing"
+        stats_calculator = StatsCalculator(parser.store)
+        with self._update_lock:
+            progress.check()
+            self._swap(parser, stats_calculator)
+        progress.phase = "done"
+        
+        return self.get_info()
+    
+    def _swap(
+        self,
+        parser: BaseParser,
+        stats_calculator: StatsCalculator,
+        dataset_stats: Optional[DatasetStats] = None,
+        image_stats: Optional[ImageStats] = None
+    ) -> None:
+        # Readers never lock; they grab stats_calculator once, and a result they store for an older calculator
+        # is never served because every cache entry is checked against the current one.
+        # The calculator goes in first so is_loaded (parser set) always implies a calculator for it.
+        parser.store = stats_calculator.store
+        self.stats_calculator = stats_calculator
+        self.parser = parser
+        self.filter_index = FilterIndex(stats_calculator.store)
+        self._dataset_stats = None if dataset_stats is None else (stats_calculator, dataset_stats)
         self._box_stats = None
-        self._image_stats = None
+        self._image_stats = None if image_stats is None else (stats_calculator, image_stats)
         self._spatial_stats = None
+        self._overlap_stats = None
+        self._image_hashes = None
+        self._issue_index = None
+        self._stats_cubes = None
+        self._split_groups = None
+        self._class_groups = None
+        self._drift_stats = None
+        self.generation = next(_generations)
+    
+    def _current(self, attr: str, stats_calculator: Optional[StatsCalculator] = None):
+        # The cached value of `attr` if it was computed from `stats_calculator` (default: the current one)
+        if stats_calculator is None:
+            stats_calculator = self.stats_calculator
+        cached = getattr(self, attr)
+        if cached is None or cached[0] is not stats_calculator:
+            return None
+        return cached[1]
+    
+    def refresh(self) -> RefreshResult:
+        if not self.is_loaded:
+            raise ValueError("No dataset loaded")
         
+        with self._update_lock:
+            result = self._refresh()
+        if result is None:
+            # Parsed off to the side like load(), so other loads and refreshes are not held up by it
+            info = self.load(str(self.parser.dataset_path))
+            result = RefreshResult(added=0, modified=0, removed=0, full_reparse=True, info=info)
+        return result
+    
+    def _refresh(self) -> Optional[RefreshResult]:
+        # None when the changes need a full reparse
+        snapshot = self.parser.snapshot_files()
+        previous = self.parser.file_state
+        changed = [Path(p) for p, state in snapshot.items() if previous.get(p) != state]
+        removed = [Path(p) for p in previous.keys() - snapshot.keys()]
+        
+        if not changed and not removed:
+            return RefreshResult(added=0, modified=0, removed=0, full_reparse=False, info=self.get_info())
+        
+        update = self.parser.reparse_files(changed, removed)
+        if update is None:
+            return None
+        
+        patch, removed_ids = update
+        store = self.parser.store
+        modified_ids = [image_id for image_id in patch.ids if image_id in store.index]
+        removed_ids = [image_id for image_id in removed_ids if image_id in store.index]
+        added = patch.num_images - len(modified_ids)
+        
+        old_class_ids = store.class_ids[np.isin(store.image_index, store.affected_rows(modified_ids + removed_ids))]
+        removed_class_counts = Counter(store.classes[c] for c in old_class_ids.tolist())
+        added_class_counts = Counter(patch.classes[c] for c in patch.class_ids.tolist())
+        
+        images_changed = added > 0 or len(removed_ids) > 0
+        for image_id in modified_ids:
+            old_row, new_row = store.index[image_id], patch.index[image_id]
+            if (store.widths[old_row], store.heights[old_row]) != (patch.widths[new_row], patch.heights[new_row]):
+                images_changed = True
+                break
+        
+        stats_calculator = StatsCalculator(store.merge(patch, removed_ids))
+        dataset_stats = self._current("_dataset_stats")
+        if dataset_stats is not None:
+            dataset_stats = stats_calculator.patch_dataset_stats(dataset_stats, removed_class_counts, added_class_counts)
+        
+        self._swap(self.parser, stats_calculator, dataset_stats, None if images_changed else self._current("_image_stats"))
+        self.parser.file_state = snapshot
+        if self.parse_cache is not None:
+            self.parse_cache.save(self.parser, self.parse_cache.fingerprint(self.parser, snapshot))
+        
+        return RefreshResult(
+            added=added,
+            modified=len(modified_ids),
+            removed=len(removed_ids),
+            full_reparse=False,
+            info=self.get_info()
+        )
+    
+    def get_info(self) -> DatasetInfo:
+        if not self.is_loaded:
+            raise ValueError("No dataset loaded")
+        parser = self.parser
+        store = self.stats_calculator.store
+        dataset_path = Path(parser.dataset_path)
         return DatasetInfo(
+            id=self.id,
             name=dataset_path.name,
             path=str(dataset_path),
-            format=self.parser.format,
-            total_images=len(self.parser.images),
-            total_annotations=sum(len(img.annotations) for img in self.parser.images.values()),
-            classes=self.parser.classes,
-            splits=self.parser.splits
+            format=parser.format,
+            total_images=store.num_images,
+            total_annotations=store.num_boxes,
+            classes=store.classes,
+            splits=parser.splits,
+            unresolved_files=parser.unresolved
         )
     
     @property
     def is_loaded(self) -> bool:
         return self.parser is not None
     
+    def memory_bytes(self) -> int:
+        if not self.is_loaded:
+            return 0
+        issue_index, stats_cubes = self._current("_issue_index"), self._current("_stats_cubes")
+        return (
+            self.stats_calculator.store.nbytes() + self.filter_index.nbytes()
+            + (0 if issue_index is None else issue_index.nbytes())
+            + (0 if stats_cubes is None else stats_cubes.nbytes())
+        )
+    
     def get_images(
         self,
         page: int = 1,
@@ -48,62 +221,141 @@ class Dataset:
         class_filter: Optional[str] = None,
         split_filter: Optional[str] = None,
         min_boxes: Optional[int] = None,
-        max_boxes: Optional[int] = None
+        max_boxes: Optional[int] = None,
+        query: Optional[str] = None,
+        prefetch: Optional[Callable[[list[str]], None]] = None
     ) -> tuple[list[ImageInfo], int]:
         if not self.is_loaded:
             return [], 0
         
-        images = self.parser.get_images()
+        filter_index = self.filter_index
+        rows = filter_index.query(class_filter, split_filter, min_boxes, max_boxes, query)
+        page_rows, total = filter_index.page(rows, page, limit)
+        if prefetch is not None:
+            # Hand the next page's files to the caller, e.g. to warm thumbnails before they are requested
+            next_rows, _ = filter_index.page(rows, page + 1, limit)
+            prefetch([filter_index.store.filepaths[row] for row in next_rows.tolist()])
         
-        if class_filter:
-            images = [img for img in images if any(ann.class_name == class_filter for ann in img.annotations)]
-        
-        if split_filter:
-            images = [img for img in images if img.split == split_filter]
-        
-        if min_boxes is not None:
-            images = [img for img in images if len(img.annotations) >= min_boxes]
-        
-        if max_boxes is not None:
-            images = [img for img in images if len(img.annotations) <= max_boxes]
-        
-        total = len(images)
-        start = (page - 1) * limit
-        end = start + limit
-        
-        return images[start:end], total
+        return [filter_index.store.image_info(int(row)) for row in page_rows], total
     
     def get_image(self, image_id: str) -> Optional[ImageInfo]:
         if not self.is_loaded:
             return None
-        return self.parser.get_image(image_id)
+        return self.stats_calculator.store.get_image(image_id)
     
-    def get_dataset_stats(self) -> DatasetStats:
+    def _cached_stats(self, attr: str, compute: Callable[[StatsCalculator], BaseModel]) -> BaseModel:
         if not self.is_loaded:
             raise ValueError("No dataset loaded")
-        if self._dataset_stats is None:
-            self._dataset_stats = self.stats_calculator.compute_dataset_stats()
-        return self._dataset_stats
+        stats_calculator = self.stats_calculator
+        value = self._current(attr, stats_calculator)
+        if value is None:
+            value = compute(stats_calculator)
+            setattr(self, attr, (stats_calculator, value))
+        return value
     
-    def get_box_stats(self) -> BoxStats:
-        if not self.is_loaded:
-            raise ValueError("No dataset loaded")
-        if self._box_stats is None:
-            self._box_stats = self.stats_calculator.compute_box_stats()
-        return self._box_stats
+    def get_dataset_stats(self) -> DatasetStats:
+        return self._cached_stats("_dataset_stats", StatsCalculator.compute_dataset_stats)
+    
+    def _cubes(self) -> StatsCubes:
+        return self._cached_stats("_stats_cubes", lambda calculator: StatsCubes(calculator.store))
+    
+    def get_box_stats(
+        self,
+        size_bins: int = SIZE_BINS,
+        size_range: tuple[Optional[float], Optional[float]] = (None, None),
+        aspect_bins: int = ASPECT_BINS,
+        aspect_range: tuple[Optional[float], Optional[float]] = (None, None),
+        log_scale: bool = False,
+        normalize: bool = True,
+        split: Optional[str] = None,
+        class_name: Optional[str] = None
+    ) -> BoxStats:
+        options = (size_bins, size_range, aspect_bins, aspect_range, log_scale, normalize, split, class_name)
+        if options == (SIZE_BINS, (None, None), ASPECT_BINS, (None, None), False, True, None, None):
+            return self._cached_stats("_box_stats", StatsCalculator.compute_box_stats)
+        # Any other resolution or scope is read off the count cubes instead of the boxes
+        return self._cubes().box_stats(*options)
+    
+    def get_image_stats(self, progress: Optional[Callable[[int, int, ImageStats], None]] = None) -> ImageStats:
+        return self._cached_stats(
+            "_image_stats",
+            lambda calculator: calculator.compute_image_stats(
+                self.image_sample_size, self.image_sampling, workers=self.pixel_workers, progress=progress
+            )
+        )
     
-    def get_image_stats(self) -> ImageStats:
+    def get_spatial_stats(
+        self,
+        grid_size: int = GRID_SIZE,
+        log_scale: bool = False,
+        normalize: bool = True,
+        split: Optional[str] = None,
+        class_name: Optional[str] = None
+    ) -> SpatialStats:
+        options = (grid_size, log_scale, normalize, split, class_name)
+        if options == (GRID_SIZE, False, True, None, None):
+            return self._cached_stats("_spatial_stats", StatsCalculator.compute_spatial_stats)
+        return self._cubes().spatial_stats(*options)
+    
+    def _grouped_stats(self, by: str, progress: Optional[Callable[[int, int], None]]) -> GroupedStats:
+        return self._cached_stats(
+            f"_{by}_groups",
+            lambda calculator: calculator.compute_grouped_stats(
+                by, self.image_sample_size, self.image_sampling, workers=self.pixel_workers, progress=progress
+            )
+        )
+    
+    def get_split_group_stats(self, progress: Optional[Callable[[int, int], None]] = None) -> GroupedStats:
+        return self._grouped_stats("split", progress)
+    
+    def get_class_group_stats(self, progress: Optional[Callable[[int, int], None]] = None) -> GroupedStats:
+        return self._grouped_stats("class", progress)
+    
+    def get_drift_stats(self) -> DriftStats:
+        return self._cached_stats("_drift_stats", StatsCalculator.compute_drift_stats)
+    
+    def get_overlap_stats(self, duplicate_iou: float = DEFAULT_DUPLICATE_IOU, overlap_iou: float = DEFAULT_OVERLAP_IOU) -> OverlapStats:
+        if (duplicate_iou, overlap_iou) == (DEFAULT_DUPLICATE_IOU, DEFAULT_OVERLAP_IOU):
+            return self._cached_stats("_overlap_stats", StatsCalculator.compute_overlap_stats)
+        # Only the default thresholds are cached
         if not self.is_loaded:
             raise ValueError("No dataset loaded")
-        if self._image_stats is None:
-            self._image_stats = self.stats_calculator.compute_image_stats()
-        return self._image_stats
+        return self.stats_calculator.compute_overlap_stats(duplicate_iou, overlap_iou)
     
-    def get_spatial_stats(self) -> SpatialStats:
+    def get_duplicate_stats(
+        self,
+        hash_name: str = DEFAULT_HASH,
+        threshold: int = DEFAULT_HAMMING_THRESHOLD,
+        limit: int = DEFAULT_GROUP_LIMIT,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> DuplicateStats:
         if not self.is_loaded:
             raise ValueError("No dataset loaded")
-        if self._spatial_stats is None:
-            self._spatial_stats = self.stats_calculator.compute_spatial_stats()
-        return self._spatial_stats
-
-dataset = Dataset()
+        stats_calculator = self.stats_calculator
+        hashes = self._current("_image_hashes", stats_calculator)
+        if hashes is None:
+            hashes = compute_image_hashes(
+                stats_calculator.store.filepaths, str(self.parser.dataset_path), hash_cache, self.pixel_workers, progress
+            )
+            self._image_hashes = (stats_calculator, hashes)
+        return find_duplicates(stats_calculator.store, hashes, hash_name, threshold, limit)
+    
+    def _validate(self, progress: Optional[Callable[[int, int], None]] = None) -> IssueIndex:
+        parser = self.parser
+        return self._cached_stats(
+            "_issue_index",
+            lambda calculator: validate(
+                calculator.store,
+                parser.undeclared_classes,
+                # YOLO image sizes are read from the headers in the first place
+                check_headers=parser.format != DatasetFormat.YOLO,
+                workers=self.io_workers,
+                progress=progress
+            )
+        )
+    
+    def get_validation_report(self, progress: Optional[Callable[[int, int], None]] = None) -> ValidationReport:
+        return self._validate(progress).report
+    
+    def get_issues(self, rule: Optional[str] = None, page: int = 1, limit: int = DEFAULT_ISSUE_LIMIT) -> tuple[list[ValidationIssue], int]:
+        return self._validate().page(rule, page, limit)
@@ -0,0 +1,235 @@
+import numpy as np
+from typing import Optional
+from .models import BoxStats, SpatialStats
+from .stats import box_pixel_sizes, size_bucket_masks, edge_bucket_masks, ASPECT_RANGE
+from .store import AnnotationStore
+
+# Fine heatmap cells per axis; requested grid sizes must divide it so cells merge exactly
+SPATIAL_RESOLUTION = 120
+GRID_SIZES = tuple(size for size in range(1, SPATIAL_RESOLUTION + 1) if SPATIAL_RESOLUTION % size == 0)
+# Fine histogram bins per octave on the log2 axes below
+OCTAVE_BINS = 64
+AREA_OCTAVES = (0, 34)
+ASPECT_OCTAVES = (-10, 10)
+MAX_HISTOGRAM_BINS = 200
+
+class CountCube:
+    # Sparse counts over (group, bin) keys, one entry per occupied combination
+    def __init__(self, groups: np.ndarray, bins: np.ndarray, num_bins: int):
+        keys = groups.astype(np.int64) * num_bins + bins
+        if (int(groups.max(initial=0)) + 1) * num_bins <= np.iinfo(np.int32).max:
+            keys = keys.astype(np.int32)
+        keys = np.sort(keys)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+        self.num_bins = num_bins
+        self.keys = keys[starts]
+        self.counts = np.diff(np.r_[starts, len(keys)]).astype(np.int32)
+    
+    def select(self, groups: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (group, bin, count) for the entries whose group is set in the boolean `groups`
+        group = self.keys // self.num_bins
+        keep = groups[group]
+        return group[keep], self.keys[keep] % self.num_bins, self.counts[keep]
+    
+    def counts_for(self, groups: np.ndarray) -> np.ndarray:
+        _, bins, counts = self.select(groups)
+        return np.bincount(bins, weights=counts, minlength=self.num_bins).astype(np.int64)
+    
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.counts.nbytes
+
+class LogAxis:
+    # Bin 0 holds values below 2**low (including zero and negatives), the rest split each octave evenly
+    def __init__(self, octaves: tuple[int, int]):
+        self.low, self.high = octaves
+        self.num_bins = (self.high - self.low) * OCTAVE_BINS + 1
+        self.centers = np.r_[0.0, 2.0 ** (self.low + (np.arange(1, self.num_bins) - 0.5) / OCTAVE_BINS)]
+    
+    def bins(self, values: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            octave = np.floor((np.log2(values) - self.low) * OCTAVE_BINS)
+        bins = np.clip(np.nan_to_num(octave, nan=-1, neginf=-1), -1, self.num_bins - 2).astype(np.int64) + 1
+        return np.where(np.isnan(values), -1, bins)
+
+def rebin(
+    fine: np.ndarray,
+    centers: np.ndarray,
+    bins: int,
+    value_range: tuple[Optional[float], Optional[float]],
+    bounds: tuple[float, float] = (0.0, np.inf),
+    log_scale: bool = False,
+    normalize: bool = True
+) -> tuple[list[int], list[float]]:
+    # Folds fine counts into `bins` equal-width (or equal-ratio) bins; returns the counts and the range used.
+    # Open ends of the range follow the data, limited to `bounds`.
+    occupied = (fine > 0) & (centers >= bounds[0]) & (centers <= bounds[1])
+    if log_scale:
+        occupied &= centers > 0
+    low, high = value_range
+    if low is None or (log_scale and low <= 0):
+        low = float(centers[occupied].min()) if occupied.any() else (1.0 if log_scale else 0.0)
+    if high is None:
+        high = float(centers[occupied].max()) if occupied.any() else low + 1
+    if high < low:
+        raise ValueError("Histogram range must not be inverted")
+    
+    keep = occupied & (centers >= low) & (centers <= high)
+    if log_scale:
+        span = np.log(high) - np.log(low)
+        positions = (np.log(centers[keep]) - np.log(low)) / span if span > 0 else np.full(int(keep.sum()), 0.5)
+    else:
+        positions = (centers[keep] - low) / (high - low) if high > low else np.full(int(keep.sum()), 0.5)
+    index = np.clip(np.floor(positions * bins), 0, bins - 1).astype(np.int64)
+    hist = np.bincount(index, weights=fine[keep], minlength=bins).astype(np.int64)
+    if normalize:
+        max_val = hist.max() if hist.max() > 0 else 1
+        hist = hist * 100 // max_val
+    return hist.tolist(), [low, high]
+
+class StatsCubes:
+    # High-resolution counts per (split, class) group; any resolution or scope is read off these
+    def __init__(self, store: AnnotationStore):
+        self.store = store
+        self.num_classes = len(store.classes)
+        self.num_groups = (len(store.split_names) + 1) * self.num_classes
+        image_index = store.image_index
+        groups = (store.split_ids[image_index].astype(np.int64) + 1) * self.num_classes + store.class_ids
+        
+        x, y = store.x.astype(np.float64), store.y.astype(np.float64)
+        w, h = store.w.astype(np.float64), store.h.astype(np.float64)
+        gx = np.clip(np.trunc((x + w / 2) * SPATIAL_RESOLUTION), 0, SPATIAL_RESOLUTION - 1).astype(np.int64)
+        gy = np.clip(np.trunc((y + h / 2) * SPATIAL_RESOLUTION), 0, SPATIAL_RESOLUTION - 1).astype(np.int64)
+        self.cells = CountCube(groups, gy * SPATIAL_RESOLUTION + gx, SPATIAL_RESOLUTION * SPATIAL_RESOLUTION)
+        
+        pixel_w, pixel_h = box_pixel_sizes(store)
+        self.area_axis = LogAxis(AREA_OCTAVES)
+        self.aspect_axis = LogAxis(ASPECT_OCTAVES)
+        area_bins = self.area_axis.bins(pixel_w * pixel_h)
+        valid_area = area_bins >= 0
+        self.areas = CountCube(groups[valid_area], area_bins[valid_area], self.area_axis.num_bins)
+        valid_h = pixel_h > 0
+        aspect_ratios = np.full(store.num_boxes, np.nan)
+        aspect_ratios[valid_h] = pixel_w[valid_h] / pixel_h[valid_h]
+        aspect_bins = self.aspect_axis.bins(aspect_ratios)
+        valid_aspect = aspect_bins >= 0
+        self.aspects = CountCube(groups[valid_aspect], aspect_bins[valid_aspect], self.aspect_axis.num_bins)
+        
+        buckets = size_bucket_masks(pixel_w, pixel_h)
+        size_class = np.where(buckets["small"], 0, np.where(buckets["medium"], 1, 2))
+        self.size_classes = np.bincount(groups * 3 + size_class, minlength=self.num_groups * 3).reshape(-1, 3)
+        self.tiny = np.bincount(groups[buckets["tiny"]], minlength=self.num_groups)
+        edges = edge_bucket_masks(store)
+        self.edge_names = list(edges)
+        edge_class = np.zeros(store.num_boxes, dtype=np.int64)
+        for i, mask in enumerate(edges.values()):
+            edge_class[mask] = i
+        self.edges = np.bincount(groups * len(edges) + edge_class, minlength=self.num_groups * len(edges)).reshape(self.num_groups, -1)
+        # Boxes of each class per image, for boxes-per-image within a class
+        self.image_classes = CountCube(store.class_ids, image_index, store.num_images)
+        
+        # Present classes in order of first occurrence, like the unscoped stats
+        class_ids, first_index = np.unique(store.class_ids, return_index=True)
+        self.class_order = class_ids[np.argsort(first_index, kind="stable")]
+    
+    def nbytes(self) -> int:
+        cubes = (self.cells, self.areas, self.aspects, self.image_classes)
+        arrays = (self.size_classes, self.tiny, self.edges, self.class_order)
+        return sum(cube.nbytes() for cube in cubes) + sum(array.nbytes for array in arrays)
+    
+    def scope(self, split: Optional[str] = None, class_name: Optional[str] = None) -> np.ndarray:
+        store = self.store
+        groups = np.ones((len(store.split_names) + 1, self.num_classes), dtype=bool)
+        if split is not None:
+            if split not in store.split_names:
+                raise ValueError(f"Unknown split: {split}")
+            groups[:] = False
+            groups[store.split_names.index(split) + 1] = True
+        if class_name is not None:
+            if class_name not in store.classes:
+                raise ValueError(f"Unknown class: {class_name}")
+            groups[:, np.arange(self.num_classes) != store.classes.index(class_name)] = False
+        return groups.ravel()
+    
+    def box_stats(
+        self,
+        size_bins: int,
+        size_range: tuple[Optional[float], Optional[float]],
+        aspect_bins: int,
+        aspect_range: tuple[Optional[float], Optional[float]],
+        log_scale: bool = False,
+        normalize: bool = True,
+        split: Optional[str] = None,
+        class_name: Optional[str] = None
+    ) -> BoxStats:
+        store = self.store
+        groups = self.scope(split, class_name)
+        size_hist, size_range = rebin(self.areas.counts_for(groups), self.area_axis.centers, size_bins, size_range, log_scale=log_scale, normalize=normalize)
+        aspect_hist, aspect_range = rebin(self.aspects.counts_for(groups), self.aspect_axis.centers, aspect_bins, aspect_range, ASPECT_RANGE, log_scale, normalize)
+        small, medium, large = self.size_classes[groups].sum(axis=0).tolist()
+        
+        rows = np.arange(store.num_images) if split is None else np.flatnonzero(store.split_ids == store.split_names.index(split))
+        if class_name is None:
+            per_image = store.box_counts()
+        else:
+            per_image = self.image_classes.counts_for(np.arange(self.num_classes) == store.classes.index(class_name))
+            # Over the images that contain the class, like the per-class groups
+            rows = rows[per_image[rows] > 0]
+        bpi_array = per_image[rows] if len(rows) else np.array([0])
+        
+        return BoxStats(
+            size_distribution=size_hist,
+            aspect_ratio_distribution=aspect_hist,
+            small_count=small,
+            medium_count=medium,
+            large_count=large,
+            boxes_per_image={
+                "min": int(bpi_array.min()),
+                "max": int(bpi_array.max()),
+                "avg": round(float(bpi_array.mean()), 1),
+                "median": int(np.median(bpi_array))
+            },
+            tiny_boxes=int(self.tiny[groups].sum()),
+            size_range=size_range,
+            aspect_range=aspect_range
+        )
+    
+    def spatial_stats(
+        self,
+        grid_size: int,
+        log_scale: bool = False,
+        normalize: bool = True,
+        split: Optional[str] = None,
+        class_name: Optional[str] = None
+    ) -> SpatialStats:
+        if grid_size not in GRID_SIZES:
+            raise ValueError(f"Grid size must divide {SPATIAL_RESOLUTION}: one of {', '.join(map(str, GRID_SIZES))}")
+        groups = self.scope(split, class_name)
+        group, cells, counts = self.cells.select(groups)
+        factor = SPATIAL_RESOLUTION // grid_size
+        coarse = (cells // SPATIAL_RESOLUTION // factor) * grid_size + cells % SPATIAL_RESOLUTION // factor
+        num_cells = grid_size * grid_size
+        class_ids = group % self.num_classes
+        class_heatmaps = np.bincount(class_ids * num_cells + coarse, weights=counts, minlength=self.num_classes * num_cells)
+        class_heatmaps = class_heatmaps.reshape(-1, grid_size, grid_size)
+        
+        def scale(heatmap: np.ndarray) -> list[list[float]]:
+            if log_scale:
+                heatmap = np.log1p(heatmap)
+            if normalize and heatmap.max() > 0:
+                heatmap = heatmap / heatmap.max()
+            return heatmap.tolist()
+        
+        edge_counts = self.edges[groups].sum(axis=0)
+        total_boxes = int(edge_counts.sum())
+        present = class_heatmaps.sum(axis=(1, 2)) > 0
+        return SpatialStats(
+            heatmap=scale(class_heatmaps.sum(axis=0)),
+            edge_proximity={
+                name: round(int(count) / total_boxes * 100, 1) if total_boxes > 0 else 0
+                for name, count in zip(self.edge_names, edge_counts)
+            },
+            per_class_heatmaps={
+                self.store.classes[class_id]: scale(class_heatmaps[class_id])
+                for class_id in self.class_order.tolist() if present[class_id]
+            }
+        )
@@ -0,0 +1,273 @@
+import hashlib
+import os
+import uuid
+import numpy as np
+from collections import Counter
+from itertools import combinations, groupby
+from math import comb
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Sequence
+from PIL import Image
+from .cache import DEFAULT_CACHE_DIR
+from .models import DuplicateGroup, DuplicateStats
+from .pixels import DEFAULT_PIXEL_WORKERS, MIN_PARALLEL_IMAGES
+from .pool import process_map
+from .store import AnnotationStore
+
+HASH_NAMES = ("ahash", "dhash", "phash")
+DEFAULT_HASH = "phash"
+DEFAULT_HAMMING_THRESHOLD = 4
+# The number of masked passes over the codes grows combinatorially with the tolerance
+MAX_HAMMING_THRESHOLD = 8
+DEFAULT_GROUP_LIMIT = 100
+MAX_GROUP_IDS = 50
+PHASH_SIZE = 32
+PROGRESS_STEPS = 50
+
+POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+DCT = _dct_matrix(PHASH_SIZE)
+
+def _pack(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+def image_hashes(path: str) -> Optional[tuple[int, int, int]]:
+    # Module-level so it can run in worker processes; returns (aHash, dHash, pHash) as 64-bit codes
+    try:
+        with Image.open(path) as img:
+            img.draft("L", (PHASH_SIZE * 2, PHASH_SIZE * 2))
+            gray = img.convert("L")
+    except Exception:
+        return None
+    
+    average = np.asarray(gray.resize((8, 8), Image.Resampling.BOX), dtype=np.float64)
+    gradient = np.asarray(gray.resize((9, 8), Image.Resampling.BOX), dtype=np.float64)
+    pixels = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.BOX), dtype=np.float64)
+    low = (DCT @ pixels @ DCT.T)[:8, :8].ravel()
+    return (
+        _pack(average > average.mean()),
+        _pack(gradient[:, 1:] > gradient[:, :-1]),
+        # The DC term only tracks overall brightness, so it is left out of the median
+        _pack(low > np.median(low[1:]))
+    )
+
+def hash_images(paths: Sequence[str], workers: int = DEFAULT_PIXEL_WORKERS) -> Iterator[Optional[tuple[int, int, int]]]:
+    return process_map(image_hashes, paths, workers, MIN_PARALLEL_IMAGES)
+
+def _file_state(path: str) -> tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return -1, -1
+    return st.st_mtime_ns, st.st_size
+
+class HashCache:
+    # One file per dataset holding every hashed path with the mtime and size it was hashed at
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR / "hashes"):
+        self.root = Path(root)
+    
+    def path_for(self, key: str) -> Path:
+        return self.root / f"{hashlib.sha1(key.encode()).hexdigest()[:20]}.npz"
+    
+    def load(self, key: str) -> Optional[tuple[dict[str, int], np.ndarray, np.ndarray]]:
+        # Returns path -> entry index, the (mtime_ns, size) states and the codes, or None without a cache file
+        try:
+            with np.load(self.path_for(key)) as data:
+                paths = data["paths"].tobytes().decode().split("\n")
+                states, hashes = data["states"], data["hashes"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return {path: i for i, path in enumerate(paths)}, states, hashes
+    
+    def save(self, key: str, paths: Sequence[str], states: np.ndarray, hashes: np.ndarray) -> None:
+        target = self.path_for(key)
+        tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}.npz")
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(
+                tmp,
+                paths=np.frombuffer("\n".join(paths).encode(), dtype=np.uint8),
+                states=states,
+                hashes=hashes
+            )
+            os.replace(tmp, target)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+hash_cache = HashCache()
+
+def compute_image_hashes(
+    paths: Sequence[str],
+    cache_key: str,
+    cache: Optional[HashCache] = hash_cache,
+    workers: int = DEFAULT_PIXEL_WORKERS,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> np.ndarray:
+    # (n, 3) uint64 codes in HASH_NAMES order; rows of images that could not be decoded are all ones
+    states = np.array([_file_state(path) for path in paths], dtype=np.int64).reshape(-1, 2)
+    hashes = np.full((len(paths), len(HASH_NAMES)), np.iinfo(np.uint64).max, dtype=np.uint64)
+    
+    cached = cache.load(cache_key) if cache is not None else None
+    if cached is not None:
+        index, cached_states, cached_hashes = cached
+        entries = np.array([index.get(path, -1) for path in paths], dtype=np.int64)
+        hit = entries >= 0
+        hit[hit] = (cached_states[entries[hit]] == states[hit]).all(axis=1)
+        hashes[hit] = cached_hashes[entries[hit]]
+        missing = np.flatnonzero(~hit).tolist()
+    else:
+        missing = list(range(len(paths)))
+    
+    report_every = max(1, len(missing) // PROGRESS_STEPS)
+    for done, (row, codes) in enumerate(zip(missing, hash_images([paths[row] for row in missing], workers)), 1):
+        if codes is not None:
+            hashes[row] = codes
+        if progress is not None and done % report_every == 0:
+            progress(done, len(missing))
+    
+    if missing and cache is not None:
+        cache.save(cache_key, paths, states, hashes)
+    return hashes
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return POPCOUNT8[np.ascontiguousarray(values).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def _substring_count(n: int, threshold: int) -> int:
+    # Fewer, wider substrings mean emptier buckets but more masked passes per substring; pick the cheapest
+    def cost(m: int) -> float:
+        bits, radius = 64 // m, threshold // m
+        passes = sum(comb(bits, k) for k in range(radius + 1))
+        return m * passes * (1 + n / 2 ** (bits - radius))
+    return min(range(2, threshold + 2), key=cost)
+
+def hamming_pairs(codes: np.ndarray, threshold: int) -> np.ndarray:
+    # Multi-index hashing over unique codes: the 64 bits are cut into m substrings, and by the pigeonhole
+    # principle two codes within `threshold` bits differ in at most threshold // m bits of at least one of
+    # them. For every set of that many bit positions, codes whose substring is equal outside those positions
+    # land in the same bucket, and only bucket mates are compared instead of all pairs.
+    n = len(codes)
+    if threshold == 0 or n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    found = []
+    m = _substring_count(n, threshold)
+    bounds = np.linspace(0, 64, m + 1).astype(int)
+    index_bits = (n - 1).bit_length()
+    rows = np.arange(n, dtype=np.uint64)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        keys = (codes >> np.uint64(lo)) & np.uint64((1 << (hi - lo)) - 1)
+        for k in range(threshold // m + 1):
+            for positions in combinations(range(hi - lo), k):
+                masked = keys & np.uint64(~sum(1 << p for p in positions) & ((1 << (hi - lo)) - 1))
+                # Sorting key and row packed into one word is several times faster than an argsort
+                packed = np.sort((masked << np.uint64(index_bits)) | rows)
+                buckets = packed >> np.uint64(index_bits)
+                order = (packed & np.uint64((1 << index_bits) - 1)).astype(np.int64)
+                # Walk each bucket by increasing offset; a position drops out once its bucket is exhausted
+                candidates = np.arange(n)
+                offset = 1
+                while True:
+                    candidates = candidates[candidates + offset < n]
+                    candidates = candidates[buckets[candidates] == buckets[candidates + offset]]
+                    if not len(candidates):
+                        break
+                    left, right = order[candidates], order[candidates + offset]
+                    close = popcount(codes[left] ^ codes[right]) <= threshold
+                    found.append(np.stack([np.minimum(left, right)[close], np.maximum(left, right)[close]], axis=1))
+                    offset += 1
+    if not found:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(found), axis=0)
+
+def connected_components(n: int, pairs: np.ndarray) -> np.ndarray:
+    # Min-label propagation with pointer jumping; labels[i] is the smallest node index in i's component
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    a, b = pairs[:, 0], pairs[:, 1]
+    while True:
+        low = np.minimum(labels[a], labels[b])
+        if np.array_equal(labels[a], low) and np.array_equal(labels[b], low):
+            return labels
+        np.minimum.at(labels, a, low)
+        np.minimum.at(labels, b, low)
+        labels = labels[labels]
+
+def find_duplicates(
+    store: AnnotationStore,
+    hashes: np.ndarray,
+    hash_name: str = DEFAULT_HASH,
+    threshold: int = DEFAULT_HAMMING_THRESHOLD,
+    limit: int = DEFAULT_GROUP_LIMIT
+) -> DuplicateStats:
+    if hash_name not in HASH_NAMES:
+        raise ValueError(f"Unknown hash: {hash_name}")
+    if not 0 <= threshold <= MAX_HAMMING_THRESHOLD:
+        raise ValueError(f"threshold must be between 0 and {MAX_HAMMING_THRESHOLD}")
+    
+    valid = ~(hashes == np.iinfo(np.uint64).max).all(axis=1)
+    rows = np.flatnonzero(valid)
+    # Identical codes collapse first, so large sets of exact duplicates cost one bucket entry
+    codes, inverse = np.unique(hashes[rows, HASH_NAMES.index(hash_name)], return_inverse=True)
+    inverse = inverse.ravel()
+    components = connected_components(len(codes), hamming_pairs(codes, threshold))[inverse]
+    
+    sizes = np.bincount(components, minlength=len(codes))
+    grouped = sizes[components] > 1
+    rows, components, inverse = rows[grouped], components[grouped], inverse[grouped]
+    group_ids, group_index = np.unique(components, return_inverse=True)
+    group_index = group_index.ravel()
+    
+    # Distinct (group, split) pairs; a group spanning two or more splits leaks between them
+    base = max(len(store.split_names), 1)
+    split_ids = store.split_ids[rows].astype(np.int64)
+    has_split = split_ids >= 0
+    group_splits = np.unique(group_index[has_split] * base + split_ids[has_split])
+    splits_per_group = np.bincount(group_splits // base, minlength=len(group_ids))
+    leaking = splits_per_group > 1
+    
+    split_leaks = Counter()
+    leaking_splits = group_splits[leaking[group_splits // base]]
+    for _, entries in groupby(leaking_splits.tolist(), key=lambda value: value // base):
+        names = sorted(store.split_names[value % base] for value in entries)
+        split_leaks.update(f"{first}/{second}" for first, second in combinations(names, 2))
+    
+    leaked = leaking[group_index] & has_split
+    leaked_images = np.bincount(split_ids[leaked], minlength=len(store.split_names))
+    
+    order = np.argsort(group_index, kind="stable")
+    bounds = np.searchsorted(group_index[order], np.arange(len(group_ids) + 1))
+    group_sizes = np.diff(bounds)
+    # Cross-split groups first, then the largest
+    ranked = np.lexsort((-group_sizes, ~leaking))[:limit]
+    groups = []
+    for group in ranked.tolist():
+        members = order[bounds[group]:bounds[group + 1]]
+        member_splits = split_ids[members]
+        groups.append(DuplicateGroup(
+            size=len(members),
+            image_ids=[store.ids[row] for row in rows[members[:MAX_GROUP_IDS]].tolist()],
+            splits=sorted({store.split_names[s] for s in member_splits[member_splits >= 0].tolist()}),
+            exact=bool((inverse[members] == inverse[members[0]]).all())
+        ))
+    
+    return DuplicateStats(
+        hash=hash_name,
+        threshold=threshold,
+        hashed_images=int(valid.sum()),
+        failed_images=int((~valid).sum()),
+        duplicate_groups=len(group_ids),
+        duplicate_images=len(rows),
+        redundant_images=len(rows) - len(group_ids),
+        cross_split_groups=int(leaking.sum()),
+        leaked_images={name: int(count) for name, count in zip(store.split_names, leaked_images.tolist()) if count},
+        split_leaks=dict(split_leaks),
+        groups=groups
+    )
@@ -16,18 +16,49 @@ export async function fetchApi(endpoint, options = {}) {
 
 export const api = {
   browse: (path) => fetchApi(`/browse?path=${encodeURIComponent(path || '')}`),
+  detectFormat: (path) => fetchApi(`/browse/detect?path=${encodeURIComponent(path)}`),
   loadDataset: (path) => fetchApi(`/dataset/load?path=${encodeURIComponent(path)}`, { method: 'POST' }),
+  startLoadJob: (path) => fetchApi(`/dataset/load/jobs?path=${encodeURIComponent(path)}`, { method: 'POST' }),
+  getLoadJob: (id) => fetchApi(`/dataset/load/jobs/${id}`),
+  cancelLoadJob: (id) => fetchApi(`/dataset/load/jobs/${id}/cancel`, { method: 'POST' }),
+  refreshDataset: () => fetchApi('/dataset/refresh', { method: 'POST' }),
   getDatasetInfo: () => fetchApi('/dataset/info'),
+  listDatasets: () => fetchApi('/datasets'),
+  unloadDataset: (id) => fetchApi(`/datasets/${id}`, { method: 'DELETE' }),
   getOverviewStats: () => fetchApi('/stats/overview'),
-  getBoxStats: () => fetchApi('/stats/boxes'),
+  getBoxStats: (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return fetchApi(`/stats/boxes?${query}`);
+  },
   getImageStats: () => fetchApi('/stats/images'),
-  getSpatialStats: () => fetchApi('/stats/spatial'),
+  getSpatialStats: (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return fetchApi(`/stats/spatial?${query}`);
+  },
+  getOverlapStats: (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return fetchApi(`/stats/overlap?${query}`);
+  },
+  getDuplicateStats: (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return fetchApi(`/stats/duplicates?${query}`);
+  },
+  getGroupedStats: (by) => fetchApi(`/stats/groups?by=${encodeURIComponent(by)}`),
+  getDriftStats: () => fetchApi('/stats/drift'),
+  getValidationReport: () => fetchApi('/stats/validation'),
+  getValidationIssues: (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return fetchApi(`/validation/issues?${query}`);
+  },
+  startStatsJob: (kind) => fetchApi(`/stats/jobs?kind=${encodeURIComponent(kind)}`, { method: 'POST' }),
+  getStatsJob: (id) => fetchApi(`/stats/jobs/${id}`),
   getImages: (params) => {
     const query = new URLSearchParams(params).toString();
     return fetchApi(`/images?${query}`);
   },
   getImage: (id) => fetchApi(`/images/${id}`),
   getImageUrl: (id) => `${API_BASE}/images/${id}/file`,
+  getThumbnailUrl: (id, size = 256) => `${API_BASE}/images/${id}/thumbnail?size=${size}`,
   getClasses: () => fetchApi('/classes'),
   getSplits: () => fetchApi('/splits')
 };
@@ -14,8 +14,10 @@ export function ExplorerTab({ datasetInfo, theme }) {
     class_filter: '',
     split_filter: '',
     min_boxes: '',
-    max_boxes: ''
+    max_boxes: '',
+    query: ''
   });
+  const [queryDraft, setQueryDraft] = useState('');
 
   const limit = 24;
 
@@ -27,6 +29,7 @@ export function ExplorerTab({ datasetInfo, theme }) {
       if (filters.split_filter) params.split_filter = filters.split_filter;
       if (filters.min_boxes) params.min_boxes = parseInt(filters.min_boxes);
       if (filters.max_boxes) params.max_boxes = parseInt(filters.max_boxes);
+      if (filters.query) params.query = filters.query;
       
       const data = await api.getImages(params);
       setImages(data.images);
@@ -109,6 +112,19 @@ export function ExplorerTab({ datasetInfo, theme }) {
                 />
               </div>
             </div>
+
+            <div>
+              <label className="text-[10px] block mb-1" style={{ color: theme.textDim }}>QUERY</label>
+              <input
+                type="text"
+                placeholder="class:cat AND NOT size:tiny"
+                value={queryDraft}
+                onChange={(e) => setQueryDraft(e.target.value)}
+                onKeyDown={(e) => { if (e.key === 'Enter') { setFilters(f => ({ ...f, query: queryDraft.trim() })); setPage(1); } }}
+                className="w-full px-2 py-1 text-xs"
+                style={{ backgroundColor: theme.inputBg, border: `1px solid ${theme.border}`, color: theme.text }}
+              />
+            </div>
           </div>
         </Panel>
 
@@ -166,7 +182,7 @@ export function ExplorerTab({ datasetInfo, theme }) {
               >
                 <div className="aspect-video relative overflow-hidden" style={{ backgroundColor: theme.bgInset }}>
                   <img
-                    src={api.getImageUrl(img.id)}
+                    src={api.getThumbnailUrl(img.id)}
                     alt={img.filename}
                     className="w-full h-full object-cover"
                     loading="lazy"
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { api } from '../api';
 import { Button } from './ui';
 
@@ -10,6 +10,7 @@ export function FolderBrowser({ theme, onDatasetLoad }) {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [loadingDataset, setLoadingDataset] = useState(null);
+  const browsedPath = useRef(null);
 
   const browse = async (path) => {
     setLoading(true);
@@ -20,6 +21,16 @@ export function FolderBrowser({ theme, onDatasetLoad }) {
       setParentPath(data.parent_path);
       setFolders(data.folders);
       setDetectedDatasets(data.detected_datasets);
+      browsedPath.current = data.current_path;
+      (data.unknown_datasets || []).forEach((folder) => {
+        api.detectFormat(data.current_path + '/' + folder)
+          .then((result) => {
+            if (result.format && browsedPath.current === data.current_path) {
+              setDetectedDatasets((prev) => ({ ...prev, [folder]: result.format }));
+            }
+          })
+          .catch(() => {});
+      });
     } catch (err) {
       setError(err.message);
     }
@@ -0,0 +1,122 @@
+import numpy as np
+from typing import NamedTuple
+from .store import AnnotationStore
+
+GROUP_KEYS = ("split", "class")
+# Images without a split are grouped under this name
+UNASSIGNED_SPLIT = "unassigned"
+
+class Groups(NamedTuple):
+    names: list[str]
+    # One entry per (group, image) membership, sorted by group and then image
+    member_groups: np.ndarray
+    member_rows: np.ndarray
+    # Boxes of the group in each member image
+    member_boxes: np.ndarray
+    box_groups: np.ndarray
+
+def run_lengths(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Sorted distinct keys with their counts
+    keys = np.sort(keys)
+    if not len(keys):
+        return keys, np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.diff(np.r_[starts, len(keys)])
+
+def split_groups(store: AnnotationStore) -> Groups:
+    image_groups = store.split_ids.astype(np.int64) + 1
+    rows = np.argsort(image_groups, kind="stable")
+    return Groups(
+        [UNASSIGNED_SPLIT] + store.split_names,
+        image_groups[rows],
+        rows,
+        store.box_counts()[rows],
+        image_groups[store.image_index]
+    )
+
+def class_groups(store: AnnotationStore) -> Groups:
+    # An image belongs to every class it has a box of
+    num_images = store.num_images
+    pairs, counts = run_lengths(store.class_ids.astype(np.int64) * num_images + store.image_index)
+    return Groups(list(store.classes), pairs // num_images, pairs % num_images, counts, store.class_ids.astype(np.int64))
+
+def make_groups(store: AnnotationStore, by: str) -> Groups:
+    if by == "split":
+        return split_groups(store)
+    if by == "class":
+        return class_groups(store)
+    raise ValueError(f"Unknown grouping: {by}")
+
+def group_order(groups: np.ndarray, num_groups: int) -> np.ndarray:
+    # Stable sort by group; small group ids go through numpy's radix sort
+    if num_groups <= np.iinfo(np.int16).max:
+        groups = groups.astype(np.int16)
+    return np.argsort(groups, kind="stable")
+
+def segments(sorted_groups: np.ndarray, num_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    counts = np.bincount(sorted_groups, minlength=num_groups)
+    return np.cumsum(counts) - counts, counts
+
+def reduce_segments(ufunc: np.ufunc, values: np.ndarray, starts: np.ndarray, counts: np.ndarray, empty: float = 0) -> np.ndarray:
+    # ufunc.reduceat over the non-empty segments of group-sorted values; empty groups get `empty`
+    out = np.full(len(counts), empty, dtype=np.result_type(values, type(empty)))
+    present = counts > 0
+    if present.any():
+        out[present] = ufunc.reduceat(values, starts[present])
+    return out
+
+def grouped_histograms(values: np.ndarray, groups: np.ndarray, num_groups: int, bins: int, range_limit: tuple = None) -> np.ndarray:
+    # StatsCalculator._compute_histogram for every group at once: bins span each group's own range, scaled to 0-100
+    keep = np.isfinite(values)
+    if range_limit:
+        keep &= (values >= range_limit[0]) & (values <= range_limit[1])
+    values, groups = values[keep], groups[keep]
+    order = group_order(groups, num_groups)
+    values, groups = values[order], groups[order]
+    starts, counts = segments(groups, num_groups)
+    low = reduce_segments(np.minimum, values, starts, counts)[groups]
+    span = reduce_segments(np.maximum, values, starts, counts)[groups] - low
+    # np.histogram widens a single-valued range by half a unit on each side
+    single = span == 0
+    low = np.where(single, low - 0.5, low)
+    span = np.where(single, 1.0, span)
+    index = np.minimum(((values - low) / span * bins).astype(np.int64), bins - 1)
+    hist = np.bincount(groups * bins + index, minlength=num_groups * bins).reshape(num_groups, bins)
+    peak = np.maximum(hist.max(axis=1, keepdims=True), 1)
+    return (hist / peak * 100).astype(np.int64)
+
+def _stable_argsort(values: np.ndarray) -> np.ndarray:
+    info = np.iinfo(np.int16)
+    if len(values) and values.dtype.kind in "iu" and info.min <= values.min() and values.max() <= info.max:
+        values = values.astype(np.int16)
+    return np.argsort(values, kind="stable")
+
+def grouped_summaries(values: np.ndarray, sorted_groups: np.ndarray, num_groups: int, median: bool = False) -> dict[str, np.ndarray]:
+    # min, max and mean (and optionally median) of values already ordered by group; empty groups read as 0
+    starts, counts = segments(sorted_groups, num_groups)
+    summary = {
+        "min": reduce_segments(np.minimum, values, starts, counts),
+        "max": reduce_segments(np.maximum, values, starts, counts),
+        "avg": reduce_segments(np.add, values.astype(np.float64), starts, counts) / np.maximum(counts, 1),
+    }
+    if median:
+        by_value = _stable_argsort(values)
+        values = values[by_value[group_order(sorted_groups[by_value], num_groups)]]
+        last = np.maximum(starts + counts - 1, starts)
+        lower = np.minimum(starts + np.maximum(counts - 1, 0) // 2, last)
+        upper = np.minimum(starts + counts // 2, last)
+        padded = np.r_[values, 0]
+        summary["median"] = (padded[lower] + padded[upper]) / 2
+    return summary
+
+def divergences(counts: np.ndarray, smoothing: float) -> tuple[np.ndarray, np.ndarray]:
+    # Pairwise KL(row i || row j) and Jensen-Shannon divergence in bits between the rows of a count matrix.
+    # Bins empty in every row are dropped; the rest get a pseudo-count so KL stays finite.
+    counts = counts[:, counts.sum(axis=0) > 0].astype(np.float64) + smoothing
+    p = counts / counts.sum(axis=1, keepdims=True)
+    log_p = np.log2(p)
+    kl = (p[:, None, :] * (log_p[:, None, :] - log_p[None, :, :])).sum(axis=2)
+    m = (p[:, None, :] + p[None, :, :]) / 2
+    log_m = np.log2(m)
+    js = ((p[:, None, :] * (log_p[:, None, :] - log_m)).sum(axis=2) + (p[None, :, :] * (log_p[None, :, :] - log_m)).sum(axis=2)) / 2
+    return kl, np.clip(js, 0, 1)
@@ -0,0 +1,117 @@
+import gzip
+from collections import OrderedDict
+from typing import Callable, Optional
+from starlette.datastructures import Headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024
+RESPONSE_CACHE_SIZE = 64
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison (RFC 9110): W/ prefixes are ignored on both sides
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+class VersionedResponseMiddleware:
+    # GET responses that depend only on a dataset version get a weak ETag, 304 revalidation,
+    # and memoized compressed bodies. get_version(path) returns None for paths that are not versioned;
+    # memoize(path) returns False for versioned paths whose handler must still run on every request.
+    def __init__(self, app, get_version: Callable[[str], Optional[str]], memoize: Callable[[str], bool] = lambda path: True):
+        self.app = app
+        self.get_version = get_version
+        self.memoize = memoize
+        self._cache: OrderedDict = OrderedDict()
+    
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        version = self.get_version(scope["path"])
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+        
+        etag = f'W/"{version}"'
+        request_headers = Headers(scope=scope)
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            await self._send(send, 304, [(b"etag", etag.encode()), (b"cache-control", b"no-cache")], b"")
+            return
+        
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        # Entries for older versions are never hit again and age out of the LRU
+        key = (scope["path"], scope["query_string"], encoding, version)
+        memoize = self.memoize(scope["path"])
+        cached = self._cache.get(key) if memoize else None
+        if cached is not None:
+            self._cache.move_to_end(key)
+            await self._send(send, 200, *cached)
+            return
+        
+        status, headers, body = await self._capture(scope, receive)
+        # Anything unusual, or a dataset swap while the handler ran, goes out untouched and uncached
+        if status != 200 or self.get_version(scope["path"]) != version:
+            await self._send(send, status, headers, body)
+            return
+        
+        headers = [(name, value) for name, value in headers if name.lower() not in (b"content-length", b"etag")]
+        content_type = dict(headers).get(b"content-type", b"")
+        if encoding is not None and len(body) >= MIN_COMPRESS_SIZE and content_type.startswith(b"application/json"):
+            body = compress(body, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+        headers += [(b"etag", etag.encode()), (b"cache-control", b"no-cache"), (b"vary", b"Accept-Encoding")]
+        
+        if memoize:
+            self._cache[key] = (headers, body)
+            if len(self._cache) > RESPONSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        await self._send(send, 200, headers, body)
+    
+    async def _capture(self, scope, receive) -> tuple[int, list, bytes]:
+        start = {}
+        chunks = []
+        
+        async def capture_send(message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+        
+        await self.app(scope, receive, capture_send)
+        return start["status"], list(start.get("headers", [])), b"".join(chunks)
+    
+    async def _send(self, send, status: int, headers: list, body: bytes) -> None:
+        if status != 304:
+            headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
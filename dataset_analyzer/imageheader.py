@@ -0,0 +1,72 @@
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Optional, Sequence, Union
+from PIL import Image
+
+DEFAULT_IO_WORKERS = 16
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+def _png_size(f: BinaryIO) -> Optional[tuple[int, int]]:
+    f.seek(0)
+    head = f.read(24)
+    if len(head) < 24 or head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+def _jpeg_size(f: BinaryIO) -> Optional[tuple[int, int]]:
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        
+        marker = byte[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xD9:
+            return None
+        
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        
+        if marker in JPEG_SOF_MARKERS:
+            sof = f.read(5)
+            if len(sof) < 5:
+                return None
+            height, width = struct.unpack(">xHH", sof)
+            return width, height
+        
+        f.seek(length - 2, 1)
+
+def read_image_size(path: Union[str, Path]) -> Optional[tuple[int, int]]:
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(8)
+            size = None
+            if magic.startswith(b"\xff\xd8"):
+                size = _jpeg_size(f)
+            elif magic == PNG_SIGNATURE:
+                size = _png_size(f)
+            if size and size[0] > 0 and size[1] > 0:
+                return size
+        
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+def probe_image_sizes(paths: Sequence[Union[str, Path]], workers: int = DEFAULT_IO_WORKERS) -> list[Optional[tuple[int, int]]]:
+    if workers <= 1 or len(paths) < 2:
+        return [read_image_size(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_image_size, paths))
@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Optional
+from .store import AnnotationStore
+from .query import QueryEngine
+
+def _group_rows(keys: np.ndarray, rows: np.ndarray, num_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    # Sort rows by key; bounds[k]:bounds[k + 1] then holds the sorted rows of group k
+    order = np.lexsort((rows, keys))
+    bounds = np.searchsorted(keys[order], np.arange(num_groups + 1))
+    return rows[order], bounds
+
+class FilterIndex:
+    def __init__(self, store: AnnotationStore):
+        self.store = store
+        num_images = store.num_images
+        self.box_counts = store.box_counts()
+        self.query_engine = QueryEngine(store)
+        
+        pairs = np.unique(store.class_ids.astype(np.int64) * max(num_images, 1) + store.image_index)
+        self._class_rows, self._class_bounds = _group_rows(
+            pairs // max(num_images, 1), pairs % max(num_images, 1), len(store.classes)
+        )
+        
+        # Images without a split (id -1) go into group 0
+        self._split_rows, self._split_bounds = _group_rows(
+            store.split_ids.astype(np.int64) + 1, np.arange(num_images, dtype=np.int64), len(store.split_names) + 1
+        )
+    
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.box_counts, self._class_rows, self._class_bounds, self._split_rows, self._split_bounds))
+    
+    def class_rows(self, class_id: int) -> np.ndarray:
+        return self._class_rows[self._class_bounds[class_id]:self._class_bounds[class_id + 1]]
+    
+    def split_rows(self, split_id: int) -> np.ndarray:
+        return self._split_rows[self._split_bounds[split_id + 1]:self._split_bounds[split_id + 2]]
+    
+    def query(
+        self,
+        class_filter: Optional[str] = None,
+        split_filter: Optional[str] = None,
+        min_boxes: Optional[int] = None,
+        max_boxes: Optional[int] = None,
+        query: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        # Returns sorted matching rows, or None when nothing is filtered (every row matches)
+        rows = None
+        
+        if class_filter:
+            class_id = self.store.class_index(class_filter)
+            if class_id is None:
+                return np.zeros(0, dtype=np.int64)
+            rows = self.class_rows(class_id)
+        
+        if split_filter:
+            split_id = self.store.split_index(split_filter)
+            if split_id is None:
+                return np.zeros(0, dtype=np.int64)
+            split_rows = self.split_rows(split_id)
+            rows = split_rows if rows is None else np.intersect1d(rows, split_rows, assume_unique=True)
+        
+        if query:
+            matches = self.query_engine.evaluate(query)
+            rows = np.flatnonzero(matches) if rows is None else rows[matches[rows]]
+        
+        if min_boxes is None and max_boxes is None:
+            return rows
+        
+        counts = self.box_counts if rows is None else self.box_counts[rows]
+        mask = np.ones(len(counts), dtype=bool)
+        if min_boxes is not None:
+            mask &= counts >= min_boxes
+        if max_boxes is not None:
+            mask &= counts <= max_boxes
+        return np.flatnonzero(mask) if rows is None else rows[mask]
+    
+    def page(self, rows: Optional[np.ndarray], page: int, limit: int) -> tuple[np.ndarray, int]:
+        start = (page - 1) * limit
+        if rows is None:
+            total = self.store.num_images
+            return np.arange(min(start, total), min(start + limit, total)), total
+        return rows[start:start + limit], len(rows)
@@ -0,0 +1,211 @@
+import threading
+import uuid
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+from pydantic import BaseModel
+from .models import StatsJobStatus, LoadJobStatus
+from .parsers import LoadCancelled, LoadProgress
+
+STATS_GETTERS = {
+    "overview": "get_dataset_stats",
+    "boxes": "get_box_stats",
+    "images": "get_image_stats",
+    "spatial": "get_spatial_stats",
+    "duplicates": "get_duplicate_stats",
+    "overlap": "get_overlap_stats",
+    "validation": "get_validation_report",
+    "split_groups": "get_split_group_stats",
+    "class_groups": "get_class_group_stats",
+    "drift": "get_drift_stats",
+}
+# Getters that take a progress callback
+PROGRESS_KINDS = {"images", "duplicates", "validation", "split_groups", "class_groups"}
+MAX_JOBS = 64
+
+class StatsJob:
+    def __init__(self, kind: str, generation: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.generation = generation
+        self.done = 0
+        self.total = 0
+        self.partial: Optional[BaseModel] = None
+        # Bumped on every progress report so pollers can tell whether anything changed
+        self.version = 0
+        self.future: Future = Future()
+    
+    def report(self, done: int, total: int, partial: Optional[BaseModel] = None) -> None:
+        self.done = done
+        self.total = total
+        if partial is not None:
+            self.partial = partial
+        self.version += 1
+    
+    @property
+    def state(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "pending"
+        return "failed" if self.future.exception() is not None else "done"
+    
+    def status(self) -> StatsJobStatus:
+        state = self.state
+        result = self.future.result() if state == "done" else self.partial
+        return StatsJobStatus(
+            id=self.id,
+            kind=self.kind,
+            generation=self.generation,
+            state=state,
+            done=self.done,
+            total=self.total,
+            result=result.model_dump() if result is not None else None,
+            partial=state != "done",
+            error=str(self.future.exception()) if state == "failed" else None
+        )
+
+class LoadJob:
+    def __init__(self, path: str, make_default: bool = True):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.make_default = make_default
+        self.progress = LoadProgress()
+        self.future: Future = Future()
+    
+    def cancel(self) -> None:
+        # Cooperative: the parser raises LoadCancelled at its next progress report
+        self.progress.cancelled.set()
+    
+    @property
+    def state(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "pending"
+        error = self.future.exception()
+        if error is None:
+            return "done"
+        return "cancelled" if isinstance(error, LoadCancelled) else "failed"
+    
+    def status(self) -> LoadJobStatus:
+        state = self.state
+        progress = self.progress
+        return LoadJobStatus(
+            id=self.id,
+            path=self.path,
+            state=state,
+            phase=progress.phase,
+            files_scanned=progress.files_scanned,
+            total_files=progress.total_files,
+            bytes_read=progress.bytes_read,
+            total_bytes=progress.total_bytes,
+            images_parsed=progress.images_parsed,
+            boxes_parsed=progress.boxes_parsed,
+            info=self.future.result() if state == "done" else None,
+            error=str(self.future.exception()) if state == "failed" else None
+        )
+
+class _JobRegistry:
+    def __init__(self, workers: int, name: str):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._jobs: dict = {}
+        self._lock = threading.Lock()
+        self.closed = False
+    
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+    
+    def close(self) -> None:
+        # Jobs already submitted still finish; the worker threads exit once the queue drains
+        with self._lock:
+            self.closed = True
+        self.executor.shutdown(wait=False)
+    
+    def _add(self, job) -> None:
+        self._jobs[job.id] = job
+        for job_id in list(self._jobs)[:max(0, len(self._jobs) - MAX_JOBS)]:
+            old = self._jobs[job_id]
+            if old.future.done():
+                del self._jobs[job_id]
+                self._forget(old)
+    
+    def _forget(self, job) -> None:
+        pass
+
+class StatsJobManager(_JobRegistry):
+    def __init__(self, dataset, workers: int = 2):
+        super().__init__(workers, "stats")
+        self.dataset = dataset
+        self._by_key: dict[tuple[str, int], StatsJob] = {}
+    
+    def submit(self, kind: str) -> StatsJob:
+        if kind not in STATS_GETTERS:
+            raise ValueError(f"Unknown stats kind: {kind}")
+        with self._lock:
+            if self.closed:
+                raise ValueError("Dataset has been unloaded")
+            key = (kind, self.dataset.generation)
+            job = self._by_key.get(key)
+            # Concurrent requests for the same stats of the same dataset generation share one job
+            if job is not None and job.state != "failed":
+                return job
+            job = StatsJob(*key)
+            self._by_key[key] = job
+            self._add(job)
+        self.executor.submit(self._run, job)
+        return job
+    
+    def _forget(self, job: StatsJob) -> None:
+        if self._by_key.get((job.kind, job.generation)) is job:
+            del self._by_key[(job.kind, job.generation)]
+    
+    def _run(self, job: StatsJob) -> None:
+        if not job.future.set_running_or_notify_cancel():
+            return
+        getter = getattr(self.dataset, STATS_GETTERS[job.kind])
+        try:
+            if job.kind in PROGRESS_KINDS:
+                result = getter(progress=job.report)
+            else:
+                job.report(0, 1)
+                result = getter()
+                job.report(1, 1)
+        except Exception as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+
+class LoadJobManager(_JobRegistry):
+    def __init__(self, registry, workers: int = 2):
+        super().__init__(workers, "load")
+        self.registry = registry
+        self._by_path: dict[str, LoadJob] = {}
+    
+    def submit(self, path: str, make_default: bool = True) -> LoadJob:
+        key = str(Path(path).resolve())
+        with self._lock:
+            # Loading a path that is already being loaded joins the running job
+            job = self._by_path.get(key)
+            if job is not None and not job.future.done() and not job.progress.cancelled.is_set():
+                job.make_default = job.make_default or make_default
+                return job
+            job = self._by_path[key] = LoadJob(path, make_default)
+            self._add(job)
+        self.executor.submit(self._run, job)
+        return job
+    
+    def _forget(self, job: LoadJob) -> None:
+        key = str(Path(job.path).resolve())
+        if self._by_path.get(key) is job:
+            del self._by_path[key]
+    
+    def _run(self, job: LoadJob) -> None:
+        if not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            job.progress.check()
+            result = self.registry.load(job.path, job.progress, make_default=False)
+            # Read after the load: a request that joined the job meanwhile may have asked for the default
+            if job.make_default:
+                self.registry.make_default(result.id)
+        except Exception as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
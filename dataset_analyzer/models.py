@@ -25,6 +25,7 @@ class ImageInfo(BaseModel):
     annotations: list[BoundingBox] = []
 
 class DatasetInfo(BaseModel):
+    id: Optional[str] = None
     name: str
     path: str
     format: DatasetFormat
@@ -32,6 +33,7 @@ class DatasetInfo(BaseModel):
     total_annotations: int
     classes: list[str]
     splits: list[str]
+    unresolved_files: dict[str, int] = {}
 
 class DatasetStats(BaseModel):
     total_images: int
@@ -40,7 +42,7 @@ class DatasetStats(BaseModel):
     avg_boxes_per_image: float
     empty_images: int
     class_distribution: dict[str, int]
-    
+
 class BoxStats(BaseModel):
     size_distribution: list[int]
     aspect_ratio_distribution: list[int]
@@ -49,6 +51,8 @@ class BoxStats(BaseModel):
     large_count: int
     boxes_per_image: dict[str, float]
     tiny_boxes: int
+    size_range: Optional[list[float]] = None
+    aspect_range: Optional[list[float]] = None
 
 class ImageStats(BaseModel):
     min_width: int
@@ -61,8 +65,137 @@ class ImageStats(BaseModel):
     color_modes: dict[str, int]
     brightness_mean: float
     brightness_std: float
+    brightness_histogram: list[int] = []
+    sampled_images: int = 0
+    sharpness_mean: float = 0.0
+    blurry_images: int = 0
+    channel_means: dict[str, float] = {}
 
 class SpatialStats(BaseModel):
     heatmap: list[list[float]]
     edge_proximity: dict[str, float]
     per_class_heatmaps: dict[str, list[list[float]]]
+
+class OverlapStats(BaseModel):
+    duplicate_iou: float
+    overlap_iou: float
+    overlapping_pairs: int
+    iou_histogram: list[int]
+    duplicate_pairs: int
+    duplicate_boxes: int
+    images_with_duplicates: int
+    duplicates_per_class: dict[str, int]
+    duplicate_examples: list[str]
+    classes: list[str]
+    overlap_matrix: list[list[int]]
+    overlapping_boxes: int
+    mean_neighbors: float
+    max_neighbors: int
+    crowded_images: int
+
+class DuplicateGroup(BaseModel):
+    size: int
+    image_ids: list[str]
+    splits: list[str]
+    exact: bool
+
+class DuplicateStats(BaseModel):
+    hash: str
+    threshold: int
+    hashed_images: int
+    failed_images: int
+    duplicate_groups: int
+    duplicate_images: int
+    redundant_images: int
+    cross_split_groups: int
+    leaked_images: dict[str, int]
+    split_leaks: dict[str, int]
+    groups: list[DuplicateGroup]
+
+class GroupStats(BaseModel):
+    dataset: DatasetStats
+    boxes: BoxStats
+    images: ImageStats
+    spatial: SpatialStats
+
+class GroupedStats(BaseModel):
+    by: str
+    sampled_images: int
+    groups: dict[str, GroupStats]
+
+class SplitDrift(BaseModel):
+    split: str
+    boxes: int
+    class_kl: float
+    class_js: float
+    size_kl: float
+    size_js: float
+    missing_classes: list[str]
+
+class DriftStats(BaseModel):
+    reference: str
+    splits: list[str]
+    class_js_matrix: list[list[float]]
+    size_js_matrix: list[list[float]]
+    drift: list[SplitDrift]
+
+class ValidationReport(BaseModel):
+    rules: list[str]
+    headers_checked: bool
+    checked_images: int
+    checked_boxes: int
+    total_issues: int
+    issues_per_rule: dict[str, int]
+    issues_per_class: dict[str, int]
+    images_with_issues: int
+    boxes_with_issues: int
+
+class ValidationIssue(BaseModel):
+    rule: str
+    image_id: str
+    filename: str
+    split: Optional[str] = None
+    image_size: list[int]
+    header_size: Optional[list[int]] = None
+    box_index: Optional[int] = None
+    class_name: Optional[str] = None
+    box: Optional[list[float]] = None
+
+class RefreshResult(BaseModel):
+    added: int
+    modified: int
+    removed: int
+    full_reparse: bool
+    info: DatasetInfo
+
+class StatsJobStatus(BaseModel):
+    id: str
+    kind: str
+    generation: int
+    state: str
+    done: int
+    total: int
+    result: Optional[dict] = None
+    partial: bool = True
+    error: Optional[str] = None
+
+class LoadJobStatus(BaseModel):
+    id: str
+    path: str
+    state: str
+    phase: str
+    files_scanned: int
+    total_files: int
+    bytes_read: int
+    total_bytes: int
+    images_parsed: int
+    boxes_parsed: int
+    info: Optional[DatasetInfo] = None
+    error: Optional[str] = None
+
+class DatasetEntry(BaseModel):
+    id: str
+    path: str
+    loaded: bool
+    default: bool
+    memory_bytes: int
@@ -0,0 +1,63 @@
+import numpy as np
+from typing import Iterator
+from .store import AnnotationStore
+
+# Upper bound on horizontal bands per image; a box taller than a band is swept once in every band it spans
+MAX_BANDS = 64
+
+def _num_bands(heights: np.ndarray) -> int:
+    # About one median box height per band, so a typical box lands in one or two bands
+    positive = heights[heights > 0]
+    if not len(positive):
+        return 1
+    return int(np.clip(1 / float(np.median(positive)), 1, MAX_BANDS))
+
+def iter_box_overlaps(store: AnnotationStore) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    # Yields (first, second, iou) batches covering every pair of intersecting boxes within an image once.
+    # Each image is cut into horizontal bands and boxes are swept along x within each band they touch:
+    # sorted by (image, band, left edge), a box is only paired with the boxes after it that start before
+    # it ends. Banding keeps rows of boxes that share an x-range but not a y-range (tall objects, stacked
+    # text lines) from pairing up, so cost follows the number of pairs that are close in both axes.
+    # A pair that shares several bands is reported only in the band holding the top of its intersection.
+    # Normalized coordinates are fine because IoU does not change when an axis is scaled.
+    x0 = store.x.astype(np.float64)
+    y0 = store.y.astype(np.float64)
+    x1 = x0 + store.w
+    y1 = y0 + store.h
+    area = (x1 - x0) * (y1 - y0)
+    
+    num_bands = _num_bands(store.h)
+    
+    def band_of(y: np.ndarray) -> np.ndarray:
+        return np.clip(np.floor(np.nan_to_num(y) * num_bands), 0, num_bands - 1).astype(np.int64)
+    
+    first_band = band_of(y0)
+    copies = np.maximum(band_of(y1) - first_band, 0) + 1
+    box = np.repeat(np.arange(len(x0)), copies)
+    starts = np.cumsum(copies) - copies
+    band = first_band[box] + np.arange(len(box)) - np.repeat(starts, copies)
+    key = store.image_index[box].astype(np.int64) * num_bands + band
+    order = np.lexsort((x0[box], key))
+    box, band, key = box[order], band[order], key[order]
+    
+    n = len(box)
+    candidates = np.arange(n)
+    offset = 1
+    while True:
+        candidates = candidates[candidates + offset < n]
+        others = candidates + offset
+        # Once a box's next neighbour starts past its right edge, all later ones do too
+        live = (key[others] == key[candidates]) & (x0[box[others]] < x1[box[candidates]])
+        candidates, others = candidates[live], others[live]
+        if not len(candidates):
+            return
+        
+        a, b = box[candidates], box[others]
+        top = np.maximum(y0[a], y0[b])
+        inter_w = np.minimum(x1[a], x1[b]) - x0[b]
+        inter_h = np.minimum(y1[a], y1[b]) - top
+        hit = (inter_w > 0) & (inter_h > 0) & (band_of(top) == band[candidates])
+        first, second = a[hit], b[hit]
+        inter = inter_w[hit] * inter_h[hit]
+        yield first, second, inter / (area[first] + area[second] - inter)
+        offset += 1
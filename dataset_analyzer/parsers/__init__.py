@@ -1,22 +1,23 @@
 from pathlib import Path
-from .base import BaseParser
+from .base import BaseParser, LoadCancelled, LoadProgress, DEFAULT_PARSE_WORKERS
 from .coco import COCOParser
 from .yolo import YOLOParser
 from .voc import VOCParser
+from ..imageheader import DEFAULT_IO_WORKERS
 
 PARSERS = [COCOParser, YOLOParser, VOCParser]
 
-def detect_format(dataset_path: Path) -> BaseParser | None:
+def detect_format(dataset_path: Path, io_workers: int = DEFAULT_IO_WORKERS) -> BaseParser | None:
     for parser_class in PARSERS:
-        parser = parser_class(dataset_path)
+        parser = parser_class(dataset_path, io_workers)
         if parser.detect():
             return parser
     return None
 
-def get_parser(dataset_path: Path) -> BaseParser:
-    parser = detect_format(dataset_path)
+def get_parser(dataset_path: Path, io_workers: int = DEFAULT_IO_WORKERS) -> BaseParser:
+    parser = detect_format(dataset_path, io_workers)
     if parser is None:
         raise ValueError(f"Could not detect dataset format at {dataset_path}")
     return parser
 
-__all__ = ["BaseParser", "COCOParser", "YOLOParser", "VOCParser", "detect_format", "get_parser"]
+__all__ = ["BaseParser", "LoadCancelled", "LoadProgress", "DEFAULT_PARSE_WORKERS", "COCOParser", "YOLOParser", "VOCParser", "detect_format", "get_parser"]
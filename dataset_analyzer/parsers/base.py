@@ -1,13 +1,109 @@
+import logging
+import os
+import threading
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Iterable, Optional
 from ..models import ImageInfo, DatasetFormat
+from ..store import AnnotationStore
+from ..imageheader import DEFAULT_IO_WORKERS
+
+UNRESOLVED_EXAMPLES = 20
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 1
+
+logger = logging.getLogger(__name__)
+
+class LoadCancelled(Exception):
+    pass
+
+class LoadProgress:
+    def __init__(self):
+        self.phase = "pending"
+        self.files_scanned = 0
+        self.bytes_read = 0
+        self.images_parsed = 0
+        self.boxes_parsed = 0
+        self.total_files = 0
+        self.total_bytes = 0
+        self.cancelled = threading.Event()
+    
+    def check(self) -> None:
+        if self.cancelled.is_set():
+            raise LoadCancelled("Dataset load cancelled")
+    
+    def advance(self, files: int = 0, bytes_read: int = 0) -> None:
+        # Called from parser loops, so it doubles as the cancellation point
+        self.files_scanned += files
+        self.bytes_read += bytes_read
+        self.check()
+
+class DirectoryListing:
+    # Each directory is listed once with scandir, so per-file existence checks become dict lookups
+    def __init__(self):
+        self._entries: dict[Path, dict[str, bool]] = {}
+        self._nested: dict[Path, dict[str, Path]] = {}
+    
+    def entries(self, directory: Path) -> dict[str, bool]:
+        # name -> is_dir, in scandir order
+        listing = self._entries.get(directory)
+        if listing is None:
+            listing = self._entries[directory] = {}
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            listing[entry.name] = entry.is_dir()
+                        except OSError:
+                            continue
+            except OSError:
+                pass
+        return listing
+    
+    def exists(self, path: Path) -> bool:
+        return path.name in self.entries(path.parent)
+    
+    def files(self, directory: Path, suffix: str) -> list[Path]:
+        # Name order, so image rows and first-seen class numbering do not depend on the filesystem
+        return [
+            directory / name for name, is_dir in sorted(self.entries(directory).items())
+            if not is_dir and name.endswith(suffix) and not name.startswith(".")
+        ]
+    
+    def subdirs(self, directory: Path) -> list[Path]:
+        return [directory / name for name, is_dir in self.entries(directory).items() if is_dir]
+    
+    def find_in_subdirs(self, directory: Path, filename: str) -> Optional[Path]:
+        # First match among the immediate subdirectories of `directory`
+        if "/" in filename or os.sep in filename:
+            return next((subdir / filename for subdir in self.subdirs(directory) if self.exists(subdir / filename)), None)
+        nested = self._nested.get(directory)
+        if nested is None:
+            nested = self._nested[directory] = {}
+            for subdir in self.subdirs(directory):
+                for name, is_dir in self.entries(subdir).items():
+                    if not is_dir:
+                        nested.setdefault(name, subdir / name)
+        return nested.get(filename)
 
 class BaseParser(ABC):
-    def __init__(self, dataset_path: Path):
+    def __init__(self, dataset_path: Path, io_workers: int = DEFAULT_IO_WORKERS):
         self.dataset_path = dataset_path
-        self.images: dict[str, ImageInfo] = {}
-        self.classes: list[str] = []
+        self.io_workers = io_workers
+        # Processes for parsers that shard CPU-bound annotation parsing
+        self.parse_workers = DEFAULT_PARSE_WORKERS
+        self.store = AnnotationStore()
         self.splits: list[str] = []
+        self.file_state: dict[str, tuple[int, int]] = {}
+        self.progress = LoadProgress()
+        self.listing = DirectoryListing()
+        # kind -> number of referenced files that could not be found on disk
+        self.unresolved: dict[str, int] = {}
+        # Fallback class names given to ids or categories the dataset never declared
+        self.undeclared_classes: list[str] = []
+    
+    @property
+    def classes(self) -> list[str]:
+        return self.store.classes
     
     @abstractmethod
     def parse(self) -> None:
@@ -22,8 +118,84 @@ class BaseParser(ABC):
     def format(self) -> DatasetFormat:
         pass
     
+    @abstractmethod
+    def source_files(self) -> list[Path]:
+        pass
+    
+    def snapshot_files(self) -> dict[str, tuple[int, int]]:
+        state = {}
+        for path in self.source_files():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            state[str(path)] = (st.st_size, st.st_mtime_ns)
+        return state
+    
+    def _report_progress(self, files: int = 0, bytes_read: int = 0) -> None:
+        self.progress.images_parsed = self.store.num_images
+        self.progress.boxes_parsed = self.store.num_boxes
+        self.progress.advance(files, bytes_read)
+    
+    def _file_parsed(self, path: Path) -> None:
+        self._report_progress(1, self.file_state.get(str(path), (0, 0))[0])
+    
+    def _unresolved(self, kind: str, path: Path) -> None:
+        self.unresolved[kind] = self.unresolved.get(kind, 0) + 1
+        if self.unresolved[kind] <= UNRESOLVED_EXAMPLES:
+            logger.debug("Unresolved %s file: %s", kind, path)
+    
+    def _undeclared(self, class_name: str) -> str:
+        if class_name not in self.undeclared_classes:
+            self.undeclared_classes.append(class_name)
+        return class_name
+    
+    def _log_unresolved(self) -> None:
+        for kind, count in self.unresolved.items():
+            logger.warning("%s: %d %s file(s) could not be resolved", self.dataset_path, count, kind)
+    
+    def reparse_files(self, changed: list[Path], removed: list[Path]) -> Optional[tuple[AnnotationStore, set[str]]]:
+        # Returns a patch store plus ids to drop, or None when a full parse is required
+        return None
+    
     def get_images(self) -> list[ImageInfo]:
-        return list(self.images.values())
+        return [self.store.image_info(row) for row in range(self.store.num_images)]
     
     def get_image(self, image_id: str) -> ImageInfo | None:
-        return self.images.get(image_id)
+        return self.store.get_image(image_id)
+
+
+def scan_files(directory: Path, suffixes: Iterable[str], recursive: bool = False) -> list[Path]:
+    suffixes = tuple(suffixes)
+    found = []
+    pending = [directory]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(Path(entry.path))
+                    elif entry.name.lower().endswith(suffixes):
+                        found.append(Path(entry.path))
+        except OSError:
+            continue
+    return sorted(found)
+
+def has_files(directory: Path, suffixes: Iterable[str], max_depth: int = 0) -> bool:
+    # Stops at the first match; max_depth bounds how many directory levels below `directory` are searched
+    suffixes = tuple(suffixes)
+    pending = [(directory, 0)]
+    while pending:
+        path, depth = pending.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth < max_depth:
+                            pending.append((entry.path, depth + 1))
+                    elif entry.name.lower().endswith(suffixes):
+                        return True
+        except OSError:
+            continue
+    return False
@@ -1,7 +1,12 @@
-import json
+import numpy as np
+from array import array
 from pathlib import Path
-from .base import BaseParser
-from ..models import ImageInfo, BoundingBox, DatasetFormat
+from .base import BaseParser, has_files
+from .jsonstream import iter_array_items
+from ..models import DatasetFormat
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
 
 class COCOParser(BaseParser):
     @property
@@ -11,8 +16,8 @@ class COCOParser(BaseParser):
     def detect(self) -> bool:
         annotations_dir = self.dataset_path / "annotations"
         if annotations_dir.exists():
-            return any(f.suffix == ".json" for f in annotations_dir.iterdir())
-        return any(self.dataset_path.glob("*.json"))
+            return has_files(annotations_dir, [".json"])
+        return has_files(self.dataset_path, [".json"])
     
     def _find_annotation_files(self) -> list[Path]:
         annotations_dir = self.dataset_path / "annotations"
@@ -20,6 +25,9 @@ class COCOParser(BaseParser):
             return list(annotations_dir.glob("*.json"))
         return list(self.dataset_path.glob("*.json"))
     
+    def source_files(self) -> list[Path]:
+        return sorted(self._find_annotation_files())
+    
     def _find_images_dir(self) -> Path:
         for name in ["images", "train", "val", "test", "train2017", "val2017"]:
             path = self.dataset_path / name
@@ -30,7 +38,6 @@ class COCOParser(BaseParser):
     def parse(self) -> None:
         annotation_files = self._find_annotation_files()
         images_dir = self._find_images_dir()
-        
         category_map = {}
         
         for ann_file in annotation_files:
@@ -38,61 +45,109 @@ class COCOParser(BaseParser):
             if split_name not in self.splits:
                 self.splits.append(split_name)
             
-            with open(ann_file) as f:
-                data = json.load(f)
-            
-            for cat in data.get("categories", []):
-                category_map[cat["id"]] = cat["name"]
-                if cat["name"] not in self.classes:
-                    self.classes.append(cat["name"])
-            
-            image_map = {}
-            for img in data.get("images", []):
-                img_id = str(img["id"])
-                filepath = self._resolve_image_path(images_dir, img["file_name"], split_name)
-                
-                image_info = ImageInfo(
-                    id=img_id,
-                    filename=img["file_name"],
-                    filepath=str(filepath),
-                    width=img["width"],
-                    height=img["height"],
-                    split=split_name,
-                    annotations=[]
-                )
-                image_map[img["id"]] = image_info
-                self.images[img_id] = image_info
-            
-            for ann in data.get("annotations", []):
-                if ann["image_id"] not in image_map:
+            self._parse_annotation_file(ann_file, images_dir, split_name, category_map)
+            self._report_progress(files=1)
+        
+        self.store.finalize()
+        self._log_unresolved()
+    
+    def _parse_annotation_file(self, ann_file: Path, images_dir: Path, split_name: str, category_map: dict) -> None:
+        # Sections may appear in any order, so annotations are buffered as compact columns
+        # keyed by dense image/category indices and resolved once the whole file is read.
+        store = self.store
+        image_keys: dict = {}
+        image_rows = array("i")
+        image_widths = array("d")
+        image_heights = array("d")
+        category_keys: dict = {}
+        
+        ann_images = array("i")
+        ann_categories = array("i")
+        ann_boxes = array("d")
+        ann_scores = array("d")
+        
+        def image_key(image_id) -> int:
+            key = image_keys.get(image_id)
+            if key is None:
+                key = image_keys[image_id] = len(image_rows)
+                image_rows.append(-1)
+                image_widths.append(0)
+                image_heights.append(0)
+            return key
+        
+        for section, item in iter_array_items(
+            ann_file, ["categories", "images", "annotations"], lambda n: self._report_progress(bytes_read=n)
+        ):
+            if section == "annotations":
+                bbox = item.get("bbox")
+                # Boxes share one flat buffer, so a short one would shift every box after it; drop just this annotation
+                if not isinstance(bbox, list) or len(bbox) < 4 or not all(_is_number(value) for value in bbox[:4]):
                     continue
-                
-                img_info = image_map[ann["image_id"]]
-                x, y, w, h = ann["bbox"]
-                
-                bbox = BoundingBox(
-                    x=x / img_info.width,
-                    y=y / img_info.height,
-                    width=w / img_info.width,
-                    height=h / img_info.height,
-                    class_name=category_map.get(ann["category_id"], "unknown"),
-                    confidence=ann.get("score")
+                category_id = item["category_id"]
+                category = category_keys.get(category_id)
+                if category is None:
+                    category = category_keys[category_id] = len(category_keys)
+                ann_images.append(image_key(item["image_id"]))
+                ann_categories.append(category)
+                ann_boxes.extend(bbox[:4])
+                score = item.get("score")
+                ann_scores.append(np.nan if score is None else score)
+            elif section == "images":
+                filepath = self._resolve_image_path(images_dir, item["file_name"], split_name)
+                row = store.add_image(
+                    str(item["id"]),
+                    item["file_name"],
+                    str(filepath),
+                    item["width"],
+                    item["height"],
+                    split_name
                 )
-                img_info.annotations.append(bbox)
+                key = image_key(item["id"])
+                image_rows[key] = row
+                image_widths[key] = item["width"]
+                image_heights[key] = item["height"]
+            else:
+                category_map[item["id"]] = store.class_id(item["name"])
+        
+        if not ann_images:
+            return
+        
+        category_classes = np.empty(len(category_keys), dtype=np.int32)
+        for category_id, category in category_keys.items():
+            class_id = category_map.get(category_id)
+            category_classes[category] = store.class_id(self._undeclared("unknown")) if class_id is None else class_id
+        
+        keys = np.frombuffer(ann_images, dtype=np.int32)
+        rows = np.frombuffer(image_rows, dtype=np.int32)[keys]
+        valid = rows >= 0
+        keys = keys[valid]
+        widths = np.frombuffer(image_widths, dtype=np.float64)[keys]
+        heights = np.frombuffer(image_heights, dtype=np.float64)[keys]
+        boxes = np.frombuffer(ann_boxes, dtype=np.float64).reshape(-1, 4)[valid]
+        
+        store.add_boxes(
+            rows[valid],
+            boxes[:, 0] / widths,
+            boxes[:, 1] / heights,
+            boxes[:, 2] / widths,
+            boxes[:, 3] / heights,
+            category_classes[np.frombuffer(ann_categories, dtype=np.int32)[valid]],
+            np.frombuffer(ann_scores, dtype=np.float64)[valid]
+        )
     
     def _resolve_image_path(self, images_dir: Path, filename: str, split: str) -> Path:
+        listing = self.listing
         direct = images_dir / filename
-        if direct.exists():
+        if listing.exists(direct):
             return direct
         
         split_path = images_dir / split / filename
-        if split_path.exists():
+        if listing.exists(split_path):
             return split_path
         
-        for subdir in images_dir.iterdir():
-            if subdir.is_dir():
-                candidate = subdir / filename
-                if candidate.exists():
-                    return candidate
+        nested = listing.find_in_subdirs(images_dir, filename)
+        if nested is not None:
+            return nested
         
+        self._unresolved("image", direct)
         return direct
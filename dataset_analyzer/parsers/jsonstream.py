@@ -0,0 +1,151 @@
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO
+
+CHUNK_SIZE = 1 << 20
+WHITESPACE = " \t\n\r"
+# A complete string or a bracket; a lone quote is a string that continues in the next chunk
+TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}"]', re.S)
+STRING_SPECIAL = re.compile(r'["\\]')
+
+class _Reader:
+    def __init__(self, f: TextIO, chunk_size: int = CHUNK_SIZE, on_read: Optional[Callable[[int], None]] = None):
+        self.f = f
+        self.on_read = on_read
+        self.bytes_read = 0
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.on_read is not None:
+            # The text wrapper's underlying buffer position counts bytes, not decoded characters
+            position = self.f.buffer.tell()
+            self.on_read(position - self.bytes_read)
+            self.bytes_read = position
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+    
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+    
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of JSON stream")
+        self.pos += 1
+    
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number that ends exactly at the buffer edge may continue in the next chunk
+            if end == len(self.buf) and not isinstance(obj, (dict, list, str)) and self._fill():
+                continue
+            self.pos = end
+            return obj
+    
+    def _search(self, pattern: re.Pattern) -> re.Match:
+        # Consumed text is dropped on every refill, so skipping a value keeps at most one chunk in memory
+        while True:
+            match = pattern.search(self.buf, self.pos)
+            if match is not None:
+                return match
+            self.pos = len(self.buf)
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+    
+    def _skip_string(self) -> None:
+        # Called just past the opening quote
+        while True:
+            match = self._search(STRING_SPECIAL)
+            if match.group() == '"':
+                self.pos = match.end()
+                return
+            if match.end() == len(self.buf):
+                # The escaped character is in the next chunk
+                self.pos = match.start()
+                if not self._fill():
+                    raise ValueError("Unexpected end of JSON stream")
+                continue
+            self.pos = match.end() + 1
+    
+    def skip(self) -> None:
+        # Steps over one value without decoding it; retrying raw_decode after every refill would be quadratic
+        # for a large value that spans many chunks
+        if self.peek() not in '[{"':
+            self.value()
+            return
+        depth = 0
+        while True:
+            match = self._search(TOKEN)
+            token = match.group()
+            self.pos = match.end()
+            if token == '"':
+                self._skip_string()
+            elif token in ("[", "{"):
+                depth += 1
+            elif token in ("]", "}"):
+                depth -= 1
+            if depth == 0:
+                return
+    
+    def items(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Malformed JSON array near offset {self.pos}")
+
+def iter_array_items(
+    path: Path,
+    keys: Iterable[str],
+    on_read: Optional[Callable[[int], None]] = None
+) -> Iterator[tuple[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        keys = set(keys)
+        reader = _Reader(f, on_read=on_read)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key in keys and reader.peek() == "[":
+                for item in reader.items():
+                    yield key, item
+            else:
+                reader.skip()
+            char = reader.peek()
+            reader.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Malformed JSON object near offset {reader.pos}")
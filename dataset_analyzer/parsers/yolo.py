@@ -1,7 +1,97 @@
+import warnings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from PIL import Image
-from .base import BaseParser
-from ..models import ImageInfo, BoundingBox, DatasetFormat
+from typing import NamedTuple, Sequence
+from .base import BaseParser, DirectoryListing, scan_files, has_files
+from ..imageheader import probe_image_sizes, DEFAULT_IO_WORKERS
+from ..models import DatasetFormat
+from ..store import AnnotationStore
+
+IMAGE_SUFFIXES = [".jpg", ".jpeg", ".png"]
+LABEL_BATCH_SIZE = 4096
+# Byte lookup tables: ASCII whitespace as bytes.split() sees it, of which \r and \n also end a line
+LINE_BREAKS = np.zeros(256, dtype=bool)
+LINE_BREAKS[[10, 13]] = True
+BLANKS = LINE_BREAKS.copy()
+BLANKS[[9, 11, 12, 32]] = True
+
+class LabelBatch(NamedTuple):
+    # The first counts[i] boxes belong to the i-th file, the next counts[i + 1] to the one after, ...
+    counts: np.ndarray
+    class_ids: np.ndarray
+    boxes: np.ndarray
+    confidence: np.ndarray
+
+def _read_files(paths: Sequence[Path]) -> list[bytes]:
+    contents = []
+    for path in paths:
+        try:
+            contents.append(path.read_bytes())
+        except OSError:
+            contents.append(b"")
+    return contents
+
+def _to_float(token: bytes) -> float:
+    try:
+        return float(token)
+    except ValueError:
+        return np.nan
+
+def _parse_floats(blob: bytes, num_tokens: int) -> np.ndarray:
+    try:
+        with warnings.catch_warnings():
+            # numpy < 2 warns and returns a truncated array on bad input instead of raising
+            warnings.simplefilter("ignore", DeprecationWarning)
+            values = np.fromstring(blob, dtype=np.float64, sep=" ")
+        if len(values) == num_tokens:
+            return values
+    except ValueError:
+        pass
+    # Malformed tokens become NaN so only the lines containing them are dropped
+    return np.array([_to_float(token) for token in blob.split()], dtype=np.float64)
+
+def read_label_files(paths: Sequence[Path], workers: int = DEFAULT_IO_WORKERS) -> LabelBatch:
+    if workers <= 1 or len(paths) < 2:
+        contents = _read_files(paths)
+    else:
+        # One contiguous run of files per thread; a task per file costs more than reading a small label
+        step = -(-len(paths) // workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            contents = [content for chunk in executor.map(_read_files, [paths[i:i + step] for i in range(0, len(paths), step)]) for content in chunk]
+    
+    # All files are tokenized as one buffer; each token is tagged with its line and file
+    blob = b"\n".join(contents)
+    buf = np.frombuffer(blob, dtype=np.uint8)
+    blank = BLANKS[buf]
+    after_blank = np.ones_like(blank)
+    after_blank[1:] = blank[:-1]
+    token_starts = np.flatnonzero(~blank & after_blank)
+    token_lines = np.cumsum(LINE_BREAKS[buf])[token_starts]
+    file_ends = np.cumsum([len(content) + 1 for content in contents])
+    values = _parse_floats(blob, len(token_starts))
+    
+    new_line = np.ones(len(token_starts), dtype=bool)
+    new_line[1:] = token_lines[1:] != token_lines[:-1]
+    line_starts = np.flatnonzero(new_line)
+    num_fields = np.diff(np.append(line_starts, len(token_starts)))
+    # Lines need class, cx, cy, w, h; a sixth column is the confidence and anything after it is ignored
+    first = line_starts[num_fields >= 5]
+    fields = values[first[:, None] + np.arange(5)]
+    class_values = fields[:, 0]
+    valid = ~np.isnan(fields).any(axis=1) & np.isfinite(class_values) & (class_values >= 0) & (class_values == np.floor(class_values))
+    
+    has_confidence = num_fields[num_fields >= 5] > 5
+    confidence = np.full(len(first), np.nan)
+    confidence[has_confidence] = values[first[has_confidence] + 5]
+    
+    files = np.searchsorted(file_ends, token_starts[first[valid]], side="right")
+    return LabelBatch(
+        np.bincount(files, minlength=len(paths)),
+        class_values[valid].astype(np.int64),
+        fields[valid, 1:],
+        confidence[valid]
+    )
 
 class YOLOParser(BaseParser):
     @property
@@ -9,10 +99,24 @@ class YOLOParser(BaseParser):
         return DatasetFormat.YOLO
     
     def detect(self) -> bool:
-        has_yaml = any(self.dataset_path.glob("*.yaml")) or any(self.dataset_path.glob("*.yml"))
-        has_classes = (self.dataset_path / "classes.txt").exists()
-        has_labels = (self.dataset_path / "labels").exists()
-        return has_labels and (has_yaml or has_classes)
+        # Cheapest check first: most folders have no labels/ directory
+        if not (self.dataset_path / "labels").exists():
+            return False
+        return (self.dataset_path / "classes.txt").exists() or has_files(self.dataset_path, [".yaml", ".yml"])
+    
+    def source_files(self) -> list[Path]:
+        images_dir = self.dataset_path / "images"
+        if not images_dir.exists():
+            images_dir = self.dataset_path
+        
+        files = scan_files(self.dataset_path, [".yaml", ".yml", "classes.txt"])
+        # Images are tracked through the directories holding them: adding, removing or renaming an image
+        # updates its directory's mtime, so a snapshot costs one stat per split instead of one per image.
+        # An image rewritten in place under the same name is only picked up with its label file.
+        files += [images_dir] + DirectoryListing().subdirs(images_dir)
+        files += scan_files(images_dir, [".txt"], recursive=True)
+        files += scan_files(self.dataset_path / "labels", [".txt"], recursive=True)
+        return sorted(set(files))
     
     def _load_classes(self) -> list[str]:
         classes_file = self.dataset_path / "classes.txt"
@@ -44,48 +148,106 @@ class YOLOParser(BaseParser):
         
         return []
     
-    def parse(self) -> None:
-        self.classes = self._load_classes()
-        
+    def _layout(self) -> tuple[Path, Path, list[Path]]:
         images_dir = self.dataset_path / "images"
         labels_dir = self.dataset_path / "labels"
         
         if not images_dir.exists():
             images_dir = self.dataset_path
         
-        split_dirs = [d for d in images_dir.iterdir() if d.is_dir()] or [images_dir]
+        split_dirs = self.listing.subdirs(images_dir) or [images_dir]
+        return images_dir, labels_dir, split_dirs
+    
+    def parse(self) -> None:
+        self.store.set_classes(self._load_classes())
+        self._num_declared_classes = len(self.classes)
+        
+        images_dir, labels_dir, split_dirs = self._layout()
         
+        entries = []
         for split_dir in split_dirs:
             split_name = split_dir.name if split_dir != images_dir else "default"
             if split_name not in self.splits and split_name != "images":
                 self.splits.append(split_name)
             
-            image_files = list(split_dir.glob("*.jpg")) + list(split_dir.glob("*.jpeg")) + list(split_dir.glob("*.png"))
+            for suffix in IMAGE_SUFFIXES:
+                entries.extend((split_name, img_path) for img_path in self.listing.files(split_dir, suffix))
+        
+        self._add_images(self.store, entries, labels_dir)
+        self.store.finalize()
+        self._log_unresolved()
+    
+    def reparse_files(self, changed: list[Path], removed: list[Path]) -> tuple[AnnotationStore, set[str]] | None:
+        if any(p.suffix in (".yaml", ".yml") or p.name == "classes.txt" for p in changed + removed):
+            return None
+        
+        self._num_declared_classes = len(self._load_classes())
+        # Fresh listing: images and labels may have changed since the last parse
+        self.listing = DirectoryListing()
+        images_dir, labels_dir, split_dirs = self._layout()
+        stems = {p.stem for p in changed + removed if p.suffix == ".txt"}
+        
+        # Anything else is an image directory; when one changed, its images are diffed against the store
+        image_dirs = {p for p in changed + removed if p.suffix != ".txt"}
+        if not image_dirs.issubset(split_dirs):
+            # A split directory was added or removed
+            return None
+        store = self.store
+        for split_dir in image_dirs:
+            split_id = store.split_index(split_dir.name) if split_dir != images_dir else -1
+            stored = set() if split_id is None else {store.ids[row] for row in np.flatnonzero(store.split_ids == split_id).tolist()}
+            listed = {img_path.stem for suffix in IMAGE_SUFFIXES for img_path in self.listing.files(split_dir, suffix)}
+            stems |= stored ^ listed
+        
+        entries = []
+        for split_dir in split_dirs:
+            split_name = split_dir.name if split_dir != images_dir else "default"
+            if split_name not in self.splits and split_name != "images":
+                self.splits.append(split_name)
             
-            for img_path in image_files:
-                label_path = self._find_label_file(labels_dir, img_path, split_name)
-                
-                try:
-                    with Image.open(img_path) as img:
-                        width, height = img.size
-                except Exception:
+            for stem in sorted(stems):
+                for suffix in IMAGE_SUFFIXES:
+                    img_path = split_dir / f"{stem}{suffix}"
+                    if self.listing.exists(img_path):
+                        entries.append((split_name, img_path))
+        
+        patch = self.store.derive()
+        self._add_images(patch, entries, labels_dir)
+        patch.finalize()
+        return patch, stems - set(patch.ids)
+    
+    def _add_images(self, store: AnnotationStore, entries: list[tuple[str, Path]], labels_dir: Path) -> None:
+        sizes = probe_image_sizes([img_path for _, img_path in entries], self.io_workers)
+        
+        for start in range(0, len(entries), LABEL_BATCH_SIZE):
+            rows, label_paths = [], []
+            for (split_name, img_path), size in zip(entries[start:start + LABEL_BATCH_SIZE], sizes[start:start + LABEL_BATCH_SIZE]):
+                if size is None:
                     continue
+                width, height = size
                 
                 img_id = img_path.stem
-                image_info = ImageInfo(
-                    id=img_id,
-                    filename=img_path.name,
-                    filepath=str(img_path),
-                    width=width,
-                    height=height,
-                    split=split_name if split_name != "default" else None,
-                    annotations=[]
+                row = store.add_image(
+                    img_id,
+                    img_path.name,
+                    str(img_path),
+                    width,
+                    height,
+                    split_name if split_name != "default" else None
                 )
                 
-                if label_path and label_path.exists():
-                    self._parse_label_file(label_path, image_info)
-                
-                self.images[img_id] = image_info
+                label_path = self._find_label_file(labels_dir, img_path, split_name)
+                if label_path is None:
+                    self._unresolved("label", img_path.with_suffix(".txt"))
+                    continue
+                rows.append(row)
+                label_paths.append(label_path)
+            
+            self._add_labels(store, np.array(rows, dtype=np.int32), read_label_files(label_paths, self.io_workers))
+            self._report_progress(
+                len(label_paths),
+                sum(self.file_state.get(str(p), (0, 0))[0] for p in label_paths)
+            )
     
     def _find_label_file(self, labels_dir: Path, img_path: Path, split: str) -> Path | None:
         label_name = img_path.stem + ".txt"
@@ -98,30 +260,29 @@ class YOLOParser(BaseParser):
         ]
         
         for candidate in candidates:
-            if candidate.exists():
+            if self.listing.exists(candidate):
                 return candidate
         return None
     
-    def _parse_label_file(self, label_path: Path, image_info: ImageInfo) -> None:
-        for line in label_path.read_text().splitlines():
-            parts = line.strip().split()
-            if len(parts) < 5:
-                continue
-            
-            class_id = int(parts[0])
-            cx, cy, w, h = map(float, parts[1:5])
-            confidence = float(parts[5]) if len(parts) > 5 else None
-            
-            class_name = self.classes[class_id] if class_id < len(self.classes) else f"class_{class_id}"
-            if class_name not in self.classes:
-                self.classes.append(class_name)
-            
-            bbox = BoundingBox(
-                x=cx - w / 2,
-                y=cy - h / 2,
-                width=w,
-                height=h,
-                class_name=class_name,
-                confidence=confidence
-            )
-            image_info.annotations.append(bbox)
+    def _add_labels(self, store: AnnotationStore, rows: np.ndarray, labels: LabelBatch) -> None:
+        if not len(labels.class_ids):
+            return
+        
+        # Class names are registered in order of first appearance, like the per-box loop did
+        class_values, first, inverse = np.unique(labels.class_ids, return_index=True, return_inverse=True)
+        mapping = {}
+        for class_id in class_values[np.argsort(first)].tolist():
+            class_name = store.classes[class_id] if class_id < self._num_declared_classes else self._undeclared(f"class_{class_id}")
+            mapping[class_id] = store.class_id(class_name)
+        class_ids = np.array([mapping[class_id] for class_id in class_values.tolist()], dtype=np.int32)[inverse.ravel()]
+        
+        cx, cy, w, h = labels.boxes.T
+        store.add_boxes(
+            np.repeat(rows, labels.counts),
+            cx - w / 2,
+            cy - h / 2,
+            w,
+            h,
+            class_ids,
+            labels.confidence
+        )
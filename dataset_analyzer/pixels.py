@@ -0,0 +1,94 @@
+import os
+import numpy as np
+from PIL import Image
+from typing import Iterator, NamedTuple, Optional, Sequence
+from .pool import process_map
+
+DECODE_SIZE = 256
+DEFAULT_PIXEL_WORKERS = os.cpu_count() or 1
+# Below this many images the process pool start-up costs more than it saves
+MIN_PARALLEL_IMAGES = 32
+
+class ImageSummary(NamedTuple):
+    mode: str
+    count: int
+    mean: float
+    m2: float
+    histogram: np.ndarray
+    sharpness: float
+    channel_means: tuple[float, float, float]
+
+class BrightnessAccumulator:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.histogram = np.zeros(256, dtype=np.int64)
+    
+    def add_summary(self, count: int, mean: float, m2: float, histogram: Optional[np.ndarray] = None) -> None:
+        # Chan et al. pairwise update: the batched form of Welford's algorithm
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        if histogram is not None:
+            self.histogram += histogram
+    
+    def add(self, pixels: np.ndarray) -> None:
+        histogram = np.bincount(pixels.ravel(), minlength=256)
+        count = int(histogram.sum())
+        if count == 0:
+            return
+        levels = np.arange(256, dtype=np.float64)
+        mean = float(histogram @ levels) / count
+        m2 = float(histogram @ (levels - mean) ** 2)
+        self.add_summary(count, mean, m2, histogram)
+    
+    @property
+    def std(self) -> float:
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    g = gray.astype(np.float32)
+    lap = g[:-2, 1:-1] + g[2:, 1:-1] + g[1:-1, :-2] + g[1:-1, 2:] - 4 * g[1:-1, 1:-1]
+    return float(lap.var())
+
+def summarize_image(path: str, max_size: int = DECODE_SIZE) -> Optional[ImageSummary]:
+    try:
+        with Image.open(path) as img:
+            mode = img.mode
+            img.draft("RGB", (max_size, max_size))
+            rgb = img.convert("RGB")
+    except Exception:
+        return None
+    
+    # JPEG draft decodes at 1/2..1/8 scale; other formats are reduced after load
+    factor = max(rgb.size) // max_size
+    if factor > 1:
+        rgb = rgb.reduce(factor)
+    gray = np.asarray(rgb.convert("L"))
+    channels = np.asarray(rgb).reshape(-1, 3).mean(axis=0) if gray.size else np.zeros(3)
+    
+    histogram = np.bincount(gray.ravel(), minlength=256)
+    count = int(histogram.sum())
+    levels = np.arange(256, dtype=np.float64)
+    mean = float(histogram @ levels) / count if count else 0.0
+    m2 = float(histogram @ (levels - mean) ** 2) if count else 0.0
+    
+    return ImageSummary(
+        mode=mode,
+        count=count,
+        mean=mean,
+        m2=m2,
+        histogram=histogram,
+        sharpness=laplacian_variance(gray),
+        channel_means=tuple(float(c) for c in channels)
+    )
+
+def analyze_images(paths: Sequence[str], workers: int = DEFAULT_PIXEL_WORKERS) -> Iterator[Optional[ImageSummary]]:
+    return process_map(summarize_image, paths, workers, MIN_PARALLEL_IMAGES)
@@ -0,0 +1,30 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The server forks from threads holding locks (logging, PIL, executor queues), which can deadlock the child;
+# workers are started from a clean single-threaded server process instead
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def process_map(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    workers: int,
+    min_items: int = 2,
+    chunksize: Optional[int] = None
+) -> Iterator[R]:
+    # Results come back in input order; below min_items the pool start-up costs more than it saves
+    if workers <= 1 or len(items) < min_items:
+        yield from map(fn, items)
+        return
+    if chunksize is None:
+        chunksize = max(1, len(items) // (workers * 8))
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD))
+    try:
+        yield from executor.map(fn, items, chunksize=chunksize)
+    finally:
+        # A consumer that stops early closes this generator; queued items are dropped instead of processed
+        executor.shutdown(cancel_futures=True)
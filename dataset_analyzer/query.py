@@ -0,0 +1,201 @@
+import re
+import numpy as np
+from functools import lru_cache
+from typing import Optional
+from .store import AnnotationStore
+from .stats import box_pixel_sizes, size_bucket_masks, edge_bucket_masks
+
+# Query syntax, e.g.  class:cat AND NOT (size:tiny OR edge:left) AND width:>=640
+#   box-level fields:   class:<name>  size:tiny|small|medium|large  aspect:<range>  edge:top|bottom|left|right|center
+#   image-level fields: split:<name>  width:<range>  height:<range>  boxes:<range>
+#   ranges:             3  0.5..2  >=640  <=1.5  >1  <10
+# A box-level term matches images with at least one such box. Wrap terms in box(...) to require that
+# a single box satisfies all of them, e.g. box(class:person AND size:small).
+
+BOX_FIELDS = {"class", "size", "aspect", "edge"}
+IMAGE_FIELDS = {"split", "width", "height", "boxes"}
+
+TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|(\w+):("(?:[^"\\]|\\.)*"|[^\s()]+)|(\w+))')
+
+Node = tuple
+
+def _tokenize(text: str) -> list[tuple[str, ...]]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Invalid query near: {text[pos:pos + 20]!r}")
+        lparen, rparen, field, value, word = match.groups()
+        if lparen:
+            tokens.append(("(",))
+        elif rparen:
+            tokens.append((")",))
+        elif field:
+            if value.startswith('"'):
+                value = re.sub(r"\\(.)", r"\1", value[1:-1])
+            tokens.append(("term", field.lower(), value))
+        else:
+            tokens.append(("word", word.upper()))
+        pos = match.end()
+    return tokens
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, ...]]):
+        self.tokens = tokens
+        self.pos = 0
+    
+    def peek(self) -> Optional[tuple[str, ...]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+    
+    def take(self) -> tuple[str, ...]:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of query")
+        self.pos += 1
+        return token
+    
+    def parse(self) -> Node:
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected token in query: {self.peek()[-1]}")
+        return node
+    
+    def parse_or(self) -> Node:
+        node = self.parse_and()
+        while self.peek() == ("word", "OR"):
+            self.take()
+            node = ("or", node, self.parse_and())
+        return node
+    
+    def parse_and(self) -> Node:
+        node = self.parse_not()
+        while True:
+            token = self.peek()
+            if token == ("word", "AND"):
+                self.take()
+            elif token is None or token == (")",) or token == ("word", "OR"):
+                return node
+            # Adjacent terms without an operator are ANDed
+            node = ("and", node, self.parse_not())
+    
+    def parse_not(self) -> Node:
+        if self.peek() == ("word", "NOT"):
+            self.take()
+            return ("not", self.parse_not())
+        return self.parse_atom()
+    
+    def parse_atom(self) -> Node:
+        token = self.take()
+        if token == ("(",):
+            node = self.parse_or()
+            if self.peek() != (")",):
+                raise ValueError("Missing ')' in query")
+            self.take()
+            return node
+        if token == ("word", "BOX") and self.peek() == ("(",):
+            self.take()
+            node = self.parse_or()
+            if self.peek() != (")",):
+                raise ValueError("Missing ')' in query")
+            self.take()
+            return ("box", node)
+        if token[0] == "term":
+            field = token[1]
+            if field not in BOX_FIELDS and field not in IMAGE_FIELDS:
+                raise ValueError(f"Unknown query field: {field}")
+            return token
+        raise ValueError(f"Unexpected token in query: {token[-1]}")
+
+@lru_cache(maxsize=256)
+def parse_query(text: str) -> Node:
+    return _Parser(_tokenize(text)).parse()
+
+def _range_mask(values: np.ndarray, spec: str) -> np.ndarray:
+    try:
+        if ".." in spec:
+            low, high = spec.split("..", 1)
+            mask = np.ones(len(values), dtype=bool)
+            if low:
+                mask &= values >= float(low)
+            if high:
+                mask &= values <= float(high)
+            return mask
+        for op, compare in ((">=", np.greater_equal), ("<=", np.less_equal), (">", np.greater), ("<", np.less)):
+            if spec.startswith(op):
+                return compare(values, float(spec[len(op):]))
+        return values == float(spec)
+    except ValueError:
+        raise ValueError(f"Invalid range in query: {spec}") from None
+
+class QueryEngine:
+    def __init__(self, store: AnnotationStore):
+        self.store = store
+        self._pixel_sizes: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self._size_masks: Optional[dict[str, np.ndarray]] = None
+        self._edge_masks: Optional[dict[str, np.ndarray]] = None
+    
+    def _box_pixel_sizes(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._pixel_sizes is None:
+            self._pixel_sizes = box_pixel_sizes(self.store)
+        return self._pixel_sizes
+    
+    def _box_term(self, field: str, value: str) -> np.ndarray:
+        store = self.store
+        if field == "class":
+            class_id = store.class_index(value)
+            if class_id is None:
+                return np.zeros(store.num_boxes, dtype=bool)
+            return store.class_ids == class_id
+        if field == "size":
+            if self._size_masks is None:
+                self._size_masks = size_bucket_masks(*self._box_pixel_sizes())
+            if value not in self._size_masks:
+                raise ValueError(f"Unknown box size: {value}")
+            return self._size_masks[value]
+        if field == "edge":
+            if self._edge_masks is None:
+                self._edge_masks = edge_bucket_masks(store)
+            if value not in self._edge_masks:
+                raise ValueError(f"Unknown edge bucket: {value}")
+            return self._edge_masks[value]
+        pixel_w, pixel_h = self._box_pixel_sizes()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aspect = np.where(pixel_h > 0, pixel_w / pixel_h, np.nan)
+        return _range_mask(aspect, value)
+    
+    def _image_term(self, field: str, value: str) -> np.ndarray:
+        store = self.store
+        if field == "split":
+            split_id = store.split_index(value)
+            if split_id is None:
+                return np.zeros(store.num_images, dtype=bool)
+            return store.split_ids == split_id
+        values = {"width": store.widths, "height": store.heights, "boxes": store.box_counts()}[field]
+        return _range_mask(values, value)
+    
+    def _any_box(self, box_mask: np.ndarray) -> np.ndarray:
+        return np.bincount(self.store.image_index[box_mask], minlength=self.store.num_images) > 0
+    
+    def _evaluate(self, node: Node, per_box: bool) -> np.ndarray:
+        kind = node[0]
+        if kind == "and":
+            return self._evaluate(node[1], per_box) & self._evaluate(node[2], per_box)
+        if kind == "or":
+            return self._evaluate(node[1], per_box) | self._evaluate(node[2], per_box)
+        if kind == "not":
+            return ~self._evaluate(node[1], per_box)
+        if kind == "box":
+            box_mask = self._evaluate(node[1], True)
+            return box_mask if per_box else self._any_box(box_mask)
+        
+        _, field, value = node
+        if field in IMAGE_FIELDS:
+            mask = self._image_term(field, value)
+            return mask[self.store.image_index] if per_box else mask
+        mask = self._box_term(field, value)
+        return mask if per_box else self._any_box(mask)
+    
+    def evaluate(self, query: str) -> np.ndarray:
+        return self._evaluate(parse_query(query), False)
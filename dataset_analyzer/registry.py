@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from .core import Dataset
+from .cache import ParseCache
+from .imageheader import DEFAULT_IO_WORKERS
+from .jobs import LoadJob, LoadJobManager
+from .models import DatasetInfo, DatasetEntry
+from .parsers import LoadCancelled, LoadProgress, DEFAULT_PARSE_WORKERS
+from .pixels import DEFAULT_PIXEL_WORKERS
+from .stats import DEFAULT_IMAGE_SAMPLE_SIZE
+
+DEFAULT_MEMORY_BUDGET = 2 << 30
+
+logger = logging.getLogger(__name__)
+
+def dataset_id_for(path: Path) -> str:
+    return hashlib.sha1(str(path).encode()).hexdigest()[:12]
+
+class DatasetRegistry:
+    def __init__(
+        self,
+        parse_cache: Optional[ParseCache] = None,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        io_workers: int = DEFAULT_IO_WORKERS
+    ):
+        self.parse_cache = parse_cache
+        self.memory_budget = memory_budget
+        self.io_workers = io_workers
+        self.image_sample_size = DEFAULT_IMAGE_SAMPLE_SIZE
+        self.image_sampling = "random"
+        self.pixel_workers = DEFAULT_PIXEL_WORKERS
+        self.parse_workers = DEFAULT_PARSE_WORKERS
+        self.default_id: Optional[str] = None
+        self.load_jobs = LoadJobManager(self)
+        # Resident datasets in LRU order (most recently used last)
+        self._datasets: OrderedDict[str, Dataset] = OrderedDict()
+        # Every dataset ever loaded, so evicted ones can be restored on their next request
+        self._paths: dict[str, str] = {}
+        # Bumped by unload(), so a load that was in flight at the time does not re-insert the dataset
+        self._unloads: dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def _new_dataset(self, dataset_id: str) -> Dataset:
+        dataset = Dataset(self.io_workers, self.parse_cache)
+        dataset.id = dataset_id
+        dataset.image_sample_size = self.image_sample_size
+        dataset.image_sampling = self.image_sampling
+        dataset.pixel_workers = self.pixel_workers
+        dataset.parse_workers = self.parse_workers
+        return dataset
+    
+    def load(self, path: str, progress: Optional[LoadProgress] = None, make_default: bool = True) -> DatasetInfo:
+        dataset_path = Path(path).resolve()
+        dataset_id = dataset_id_for(dataset_path)
+        with self._lock:
+            dataset = self._datasets.get(dataset_id) or self._new_dataset(dataset_id)
+            unloads = self._unloads.get(dataset_id, 0)
+        
+        # Reloading a resident dataset swaps in place, so its current readers keep working
+        info = dataset.load(str(dataset_path), progress)
+        
+        with self._lock:
+            if self._unloads.get(dataset_id, 0) != unloads:
+                dataset.stats_jobs.close()
+                raise LoadCancelled("Dataset was unloaded while loading")
+            self._datasets[dataset_id] = dataset
+            self._datasets.move_to_end(dataset_id)
+            self._paths[dataset_id] = str(dataset_path)
+            if make_default or self.default_id is None:
+                self.default_id = dataset_id
+            self._enforce_budget(dataset_id)
+        return info
+    
+    def get(self, dataset_id: str) -> Optional[Dataset]:
+        # Resident datasets only; an evicted one comes back through restore()
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+            return dataset
+    
+    def restore(self, dataset_id: str) -> Optional[LoadJob]:
+        # Reloads an evicted dataset as a load job, which is an mmap of the on-disk index when the parse cache
+        # is enabled. Concurrent requests for the same dataset join one job. None if the id was never loaded.
+        with self._lock:
+            path = self._paths.get(dataset_id)
+        if path is None:
+            return None
+        logger.info("Restoring evicted dataset %s from %s", dataset_id, path)
+        return self.load_jobs.submit(path, make_default=False)
+    
+    def peek(self, dataset_id: str) -> Optional[Dataset]:
+        return self._datasets.get(dataset_id)
+    
+    @property
+    def default(self) -> Optional[Dataset]:
+        return self.get(self.default_id) if self.default_id is not None else None
+    
+    def make_default(self, dataset_id: str) -> None:
+        with self._lock:
+            if dataset_id in self._datasets:
+                self.default_id = dataset_id
+    
+    def unload(self, dataset_id: str) -> bool:
+        with self._lock:
+            if self._paths.pop(dataset_id, None) is None:
+                return False
+            self._unloads[dataset_id] = self._unloads.get(dataset_id, 0) + 1
+            dataset = self._datasets.pop(dataset_id, None)
+            if self.default_id == dataset_id:
+                self.default_id = next(reversed(self._datasets), None)
+        if dataset is not None:
+            dataset.stats_jobs.close()
+        return True
+    
+    def loaded(self) -> list[Dataset]:
+        return list(self._datasets.values())
+    
+    def entries(self) -> list[DatasetEntry]:
+        resident = dict(self._datasets)
+        return [
+            DatasetEntry(
+                id=dataset_id,
+                path=path,
+                loaded=dataset_id in resident,
+                default=dataset_id == self.default_id,
+                memory_bytes=resident[dataset_id].memory_bytes() if dataset_id in resident else 0
+            )
+            for dataset_id, path in self._paths.items()
+        ]
+    
+    def _enforce_budget(self, keep: str) -> None:
+        # The default dataset is never evicted: requests without a dataset id would restore it straight away,
+        # evicting another one in turn
+        sizes = {dataset_id: dataset.memory_bytes() for dataset_id, dataset in self._datasets.items()}
+        total = sum(sizes.values())
+        for dataset_id in list(self._datasets):
+            if total <= self.memory_budget:
+                break
+            if dataset_id in (keep, self.default_id):
+                continue
+            # A restore builds a new Dataset, so the evicted one's job threads are released
+            self._datasets.pop(dataset_id).stats_jobs.close()
+            total -= sizes[dataset_id]
+            logger.info("Evicted dataset %s (%d bytes) to stay within the memory budget", dataset_id, sizes[dataset_id])
+
+registry = DatasetRegistry(parse_cache=ParseCache())
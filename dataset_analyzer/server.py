@@ -1,16 +1,76 @@
-from fastapi import FastAPI, HTTPException, Query
+import asyncio
+import json
+import os
+import uuid
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 from typing import Optional
 
-from .core import dataset
-from .models import DatasetInfo, ImageInfo, DatasetStats, BoxStats, ImageStats, SpatialStats
-from .parsers import detect_format
+from .core import Dataset
+from .registry import registry
+from .jobs import LoadJob
+from .models import DatasetEntry, DatasetInfo, ImageInfo, DatasetStats, BoxStats, ImageStats, SpatialStats, OverlapStats, GroupedStats, DriftStats, DuplicateStats, ValidationReport, RefreshResult, StatsJobStatus, LoadJobStatus
+from .parsers import LoadCancelled
+from .browse import detector
+from .groups import GROUP_KEYS
+from .stats import DEFAULT_DUPLICATE_IOU, DEFAULT_OVERLAP_IOU, SIZE_BINS, ASPECT_BINS, GRID_SIZE
+from .cubes import GRID_SIZES, MAX_HISTOGRAM_BINS
+from .validation import RULES, DEFAULT_ISSUE_LIMIT
+from .duplicates import HASH_NAMES, DEFAULT_HASH, DEFAULT_HAMMING_THRESHOLD, MAX_HAMMING_THRESHOLD, DEFAULT_GROUP_LIMIT
+from .thumbnails import thumbnails, THUMBNAIL_FORMATS, DEFAULT_THUMBNAIL_SIZE
+from .httpcache import VersionedResponseMiddleware, etag_matches
 
 app = FastAPI(title="Dataset Analyzer", version="0.1.0")
 
+FRONTEND_DIR = Path(__file__).parent / "frontend" / "dist"
+JOB_POLL_INTERVAL = 0.25
+# Generations restart at 1 in every process, so ETags also carry a per-process token
+SERVER_TOKEN = uuid.uuid4().hex[:8]
+DATASET_PREFIX = "/api/datasets/{dataset_id}"
+VERSIONED_PATHS = {
+    "/dataset/info",
+    "/stats/overview",
+    "/stats/boxes",
+    "/stats/images",
+    "/stats/spatial",
+    "/stats/overlap",
+    "/stats/duplicates",
+    "/stats/validation",
+    "/stats/groups",
+    "/stats/drift",
+    "/validation/issues",
+    "/images",
+    "/classes",
+    "/splits",
+}
+
+def _split_dataset_path(path: str) -> tuple[Optional[str], str]:
+    # "/api/datasets/<id>/stats/boxes" -> ("<id>", "/stats/boxes"); "/api/stats/boxes" -> (None, "/stats/boxes")
+    if path.startswith("/api/datasets/"):
+        dataset_id, _, rest = path[len("/api/datasets/"):].partition("/")
+        return dataset_id, "/" + rest
+    return None, path[len("/api"):] if path.startswith("/api/") else path
+
+def _response_version(path: str) -> Optional[str]:
+    dataset_id, path = _split_dataset_path(path)
+    # /images/{id} as well, but not its /file and /thumbnail subresources
+    if path not in VERSIONED_PATHS and not (path.startswith("/images/") and path.count("/") == 2):
+        return None
+    dataset = registry.peek(dataset_id if dataset_id is not None else registry.default_id)
+    if dataset is None or not dataset.is_loaded:
+        return None
+    return f"{SERVER_TOKEN}-{dataset.generation}"
+
+def _memoize_response(path: str) -> bool:
+    # The image list warms the next page's thumbnails as a side effect, so its handler has to run every time
+    return _split_dataset_path(path)[1] != "/images"
+
+# Middleware added last runs outermost: CORS wraps the memoized responses, whose cache key has no Origin
+app.add_middleware(VersionedResponseMiddleware, get_version=_response_version, memoize=_memoize_response)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,7 +79,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-FRONTEND_DIR = Path(__file__).parent / "frontend" / "dist"
+class DatasetRestoring(Exception):
+    def __init__(self, job: LoadJob):
+        super().__init__(job.id)
+        self.job = job
+
+@app.exception_handler(DatasetRestoring)
+async def dataset_restoring(request: Request, exc: DatasetRestoring) -> JSONResponse:
+    # 202 with the restore job; clients follow its progress like any other load job and retry when it is done
+    job_url = f"/api/dataset/load/jobs/{exc.job.id}"
+    return JSONResponse(status_code=202, content=exc.job.status().model_dump(mode="json"), headers={"Location": job_url})
+
+async def current_dataset(request: Request) -> Dataset:
+    dataset_id = request.path_params.get("dataset_id")
+    if dataset_id is None:
+        dataset = registry.default
+    else:
+        dataset = registry.get(dataset_id)
+        if dataset is None:
+            job = registry.restore(dataset_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="Dataset not found")
+            raise DatasetRestoring(job)
+    if dataset is None or not dataset.is_loaded:
+        raise HTTPException(status_code=400, detail="No dataset loaded")
+    return dataset
+
+router = APIRouter()
+
+def _file_response(request: Request, path: Path, etag: str, media_type: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+def _stat_etag(path: Path, *variant) -> str:
+    st = os.stat(path)
+    return '"' + "-".join(str(part) for part in (f"{st.st_mtime_ns:x}", f"{st.st_size:x}", *variant)) + '"'
 
 @app.get("/api/browse")
 async def browse_directory(path: Optional[str] = None):
@@ -34,95 +130,288 @@ async def browse_directory(path: Optional[str] = None):
     if not target.is_dir():
         raise HTTPException(status_code=400, detail="Path is not a directory")
     
-    folders = []
-    detected_datasets = {}
-    
     try:
-        for item in sorted(target.iterdir()):
-            if item.name.startswith('.'):
-                continue
-            if item.is_dir():
-                folders.append(item.name)
-                parser = detect_format(item)
-                if parser:
-                    detected_datasets[item.name] = parser.format.value.upper()
+        folders = await run_in_threadpool(_list_folders, target)
     except PermissionError:
         raise HTTPException(status_code=403, detail="Permission denied")
     
+    detected, unresolved = await run_in_threadpool(
+        detector.detect_many, {str(target / name): mtime_ns for name, mtime_ns in folders}
+    )
+    
     return {
         "current_path": str(target),
         "parent_path": str(target.parent) if target.parent != target else None,
-        "folders": folders,
-        "detected_datasets": detected_datasets
+        "folders": [name for name, _ in folders],
+        "detected_datasets": {Path(folder).name: fmt for folder, fmt in sorted(detected.items())},
+        # Still being probed when the time budget ran out; resolve them with /api/browse/detect
+        "unknown_datasets": sorted(Path(folder).name for folder in unresolved)
     }
 
+def _list_folders(target: Path) -> list[tuple[str, int]]:
+    folders = []
+    with os.scandir(target) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_dir():
+                continue
+            try:
+                folders.append((entry.name, entry.stat().st_mtime_ns))
+            except OSError:
+                continue
+    return sorted(folders)
+
+@app.get("/api/browse/detect")
+async def detect_directory_format(path: str) -> dict:
+    try:
+        fmt = await run_in_threadpool(detector.detect, str(Path(path).resolve()))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Path not found")
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Permission denied")
+    return {"path": path, "format": fmt}
+
 @app.post("/api/dataset/load")
 async def load_dataset(path: str) -> DatasetInfo:
+    if not Path(path).exists():
+        raise HTTPException(status_code=400, detail=f"Path does not exist: {path}")
+    job = registry.load_jobs.submit(path)
     try:
-        return dataset.load(path)
+        return await asyncio.shield(asyncio.wrap_future(job.future))
+    except LoadCancelled as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/dataset/info")
-async def get_dataset_info() -> DatasetInfo:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    return DatasetInfo(
-        name=Path(dataset.parser.dataset_path).name,
-        path=str(dataset.parser.dataset_path),
-        format=dataset.parser.format,
-        total_images=len(dataset.parser.images),
-        total_annotations=sum(len(img.annotations) for img in dataset.parser.images.values()),
-        classes=dataset.parser.classes,
-        splits=dataset.parser.splits
-    )
+@app.post("/api/dataset/load/jobs")
+async def start_load_job(path: str) -> LoadJobStatus:
+    if not Path(path).exists():
+        raise HTTPException(status_code=400, detail=f"Path does not exist: {path}")
+    return registry.load_jobs.submit(path).status()
 
-@app.get("/api/stats/overview")
-async def get_overview_stats() -> DatasetStats:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    return dataset.get_dataset_stats()
+@app.get("/api/dataset/load/jobs/{job_id}")
+async def get_load_job(job_id: str) -> LoadJobStatus:
+    job = registry.load_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.status()
 
-@app.get("/api/stats/boxes")
-async def get_box_stats() -> BoxStats:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    return dataset.get_box_stats()
+@app.post("/api/dataset/load/jobs/{job_id}/cancel")
+async def cancel_load_job(job_id: str) -> LoadJobStatus:
+    job = registry.load_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.cancel()
+    return job.status()
 
-@app.get("/api/stats/images")
-async def get_image_stats() -> ImageStats:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    return dataset.get_image_stats()
+@app.get("/api/datasets")
+async def list_datasets() -> list[DatasetEntry]:
+    return registry.entries()
 
-@app.get("/api/stats/spatial")
-async def get_spatial_stats() -> SpatialStats:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    return dataset.get_spatial_stats()
+@app.delete("/api/datasets/{dataset_id}")
+async def unload_dataset(dataset_id: str) -> dict:
+    if not registry.unload(dataset_id):
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return {"unloaded": dataset_id}
+
+@router.post("/dataset/refresh")
+async def refresh_dataset(dataset: Dataset = Depends(current_dataset)) -> RefreshResult:
+    try:
+        # Stats every source file and may reparse the whole dataset, so it stays off the event loop
+        return await run_in_threadpool(dataset.refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/dataset/info")
+async def get_dataset_info(dataset: Dataset = Depends(current_dataset)) -> DatasetInfo:
+    return dataset.get_info()
+
+async def _compute_stats(dataset: Dataset, kind: str):
+    job = dataset.stats_jobs.submit(kind)
+    try:
+        # Shielded: one client disconnecting must not cancel a job other requests are waiting on
+        return await asyncio.shield(asyncio.wrap_future(job.future))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/overview")
+async def get_overview_stats(dataset: Dataset = Depends(current_dataset)) -> DatasetStats:
+    return await _compute_stats(dataset, "overview")
+
+@router.get("/stats/boxes")
+async def get_box_stats(
+    size_bins: int = Query(SIZE_BINS, ge=1, le=MAX_HISTOGRAM_BINS),
+    size_min: Optional[float] = Query(None, ge=0),
+    size_max: Optional[float] = Query(None, ge=0),
+    aspect_bins: int = Query(ASPECT_BINS, ge=1, le=MAX_HISTOGRAM_BINS),
+    aspect_min: Optional[float] = Query(None, ge=0),
+    aspect_max: Optional[float] = Query(None, ge=0),
+    log_scale: bool = False,
+    normalize: bool = True,
+    split: Optional[str] = None,
+    class_name: Optional[str] = None,
+    dataset: Dataset = Depends(current_dataset)
+) -> BoxStats:
+    if (size_bins, size_min, size_max, aspect_bins, aspect_min, aspect_max, log_scale, normalize, split, class_name) == (
+        SIZE_BINS, None, None, ASPECT_BINS, None, None, False, True, None, None
+    ):
+        return await _compute_stats(dataset, "boxes")
+    try:
+        return await run_in_threadpool(
+            dataset.get_box_stats, size_bins, (size_min, size_max), aspect_bins, (aspect_min, aspect_max), log_scale, normalize, split, class_name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/images")
+async def get_image_stats(dataset: Dataset = Depends(current_dataset)) -> ImageStats:
+    return await _compute_stats(dataset, "images")
+
+@router.get("/stats/spatial")
+async def get_spatial_stats(
+    grid_size: int = Query(GRID_SIZE, ge=1, le=max(GRID_SIZES)),
+    log_scale: bool = False,
+    normalize: bool = True,
+    split: Optional[str] = None,
+    class_name: Optional[str] = None,
+    dataset: Dataset = Depends(current_dataset)
+) -> SpatialStats:
+    if (grid_size, log_scale, normalize, split, class_name) == (GRID_SIZE, False, True, None, None):
+        return await _compute_stats(dataset, "spatial")
+    try:
+        return await run_in_threadpool(dataset.get_spatial_stats, grid_size, log_scale, normalize, split, class_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/overlap")
+async def get_overlap_stats(
+    duplicate_iou: float = Query(DEFAULT_DUPLICATE_IOU, gt=0, le=1),
+    overlap_iou: float = Query(DEFAULT_OVERLAP_IOU, gt=0, le=1),
+    dataset: Dataset = Depends(current_dataset)
+) -> OverlapStats:
+    if (duplicate_iou, overlap_iou) == (DEFAULT_DUPLICATE_IOU, DEFAULT_OVERLAP_IOU):
+        return await _compute_stats(dataset, "overlap")
+    try:
+        return await run_in_threadpool(dataset.get_overlap_stats, duplicate_iou, overlap_iou)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/duplicates")
+async def get_duplicate_stats(
+    hash_name: str = Query(DEFAULT_HASH, alias="hash", pattern=f"^({'|'.join(HASH_NAMES)})$"),
+    threshold: int = Query(DEFAULT_HAMMING_THRESHOLD, ge=0, le=MAX_HAMMING_THRESHOLD),
+    limit: int = Query(DEFAULT_GROUP_LIMIT, ge=1, le=1000),
+    dataset: Dataset = Depends(current_dataset)
+) -> DuplicateStats:
+    # The shared job hashes every image once per dataset version; other parameters reuse those hashes
+    result = await _compute_stats(dataset, "duplicates")
+    if (hash_name, threshold, limit) == (DEFAULT_HASH, DEFAULT_HAMMING_THRESHOLD, DEFAULT_GROUP_LIMIT):
+        return result
+    try:
+        return await run_in_threadpool(dataset.get_duplicate_stats, hash_name, threshold, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/groups")
+async def get_grouped_stats(
+    by: str = Query(..., pattern=f"^({'|'.join(GROUP_KEYS)})$"),
+    dataset: Dataset = Depends(current_dataset)
+) -> GroupedStats:
+    return await _compute_stats(dataset, f"{by}_groups")
+
+@router.get("/stats/drift")
+async def get_drift_stats(dataset: Dataset = Depends(current_dataset)) -> DriftStats:
+    return await _compute_stats(dataset, "drift")
+
+@router.get("/stats/validation")
+async def get_validation_report(dataset: Dataset = Depends(current_dataset)) -> ValidationReport:
+    return await _compute_stats(dataset, "validation")
+
+@router.get("/validation/issues")
+async def get_validation_issues(
+    rule: Optional[str] = Query(None, pattern=f"^({'|'.join(RULES)})$"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(DEFAULT_ISSUE_LIMIT, ge=1, le=1000),
+    dataset: Dataset = Depends(current_dataset)
+) -> dict:
+    # Pages are sliced from the issue index the shared validation job builds once per dataset version
+    await _compute_stats(dataset, "validation")
+    try:
+        issues, total = await run_in_threadpool(dataset.get_issues, rule, page, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "issues": issues,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "pages": (total + limit - 1) // limit
+    }
 
-@app.get("/api/images")
+@router.post("/stats/jobs")
+async def start_stats_job(kind: str, dataset: Dataset = Depends(current_dataset)) -> StatsJobStatus:
+    try:
+        return dataset.stats_jobs.submit(kind).status()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stats/jobs/{job_id}")
+async def get_stats_job(job_id: str, dataset: Dataset = Depends(current_dataset)) -> StatsJobStatus:
+    job = dataset.stats_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.status()
+
+@router.get("/stats/jobs/{job_id}/stream")
+async def stream_stats_job(job_id: str, dataset: Dataset = Depends(current_dataset)):
+    job = dataset.stats_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        # One JSON status per line whenever progress changes, ending with the final result
+        version = -1
+        while True:
+            finished = job.future.done()
+            if job.version != version or finished:
+                version = job.version
+                yield json.dumps(job.status().model_dump()) + "\n"
+            if finished:
+                return
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/images")
 async def get_images(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=200),
     class_filter: Optional[str] = None,
     split_filter: Optional[str] = None,
     min_boxes: Optional[int] = None,
-    max_boxes: Optional[int] = None
+    max_boxes: Optional[int] = None,
+    query: Optional[str] = None,
+    dataset: Dataset = Depends(current_dataset)
 ) -> dict:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    
-    images, total = dataset.get_images(
-        page=page,
-        limit=limit,
-        class_filter=class_filter,
-        split_filter=split_filter,
-        min_boxes=min_boxes,
-        max_boxes=max_boxes
-    )
+    try:
+        # Query evaluation scans the filter index, which is too slow for the event loop on large stores
+        images, total = await run_in_threadpool(
+            dataset.get_images,
+            page=page,
+            limit=limit,
+            class_filter=class_filter,
+            split_filter=split_filter,
+            min_boxes=min_boxes,
+            max_boxes=max_boxes,
+            query=query,
+            prefetch=thumbnails.prewarm
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "images": images,
@@ -132,44 +421,67 @@ async def get_images(
         "pages": (total + limit - 1) // limit
     }
 
-@app.get("/api/images/{image_id}")
-async def get_image(image_id: str) -> ImageInfo:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    
+@router.get("/images/{image_id}")
+async def get_image(image_id: str, dataset: Dataset = Depends(current_dataset)) -> ImageInfo:
     image = dataset.get_image(image_id)
     if image is None:
         raise HTTPException(status_code=404, detail="Image not found")
     
     return image
 
-@app.get("/api/images/{image_id}/file")
-async def get_image_file(image_id: str):
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
-    
+@router.get("/images/{image_id}/file")
+async def get_image_file(image_id: str, request: Request, dataset: Dataset = Depends(current_dataset)):
     image = dataset.get_image(image_id)
     if image is None:
         raise HTTPException(status_code=404, detail="Image not found")
     
     filepath = Path(image.filepath)
-    if not filepath.exists():
+    try:
+        etag = _stat_etag(filepath)
+    except OSError:
         raise HTTPException(status_code=404, detail="Image file not found")
     
-    return FileResponse(filepath, media_type=f"image/{filepath.suffix.lstrip('.')}")
+    return _file_response(request, filepath, etag, f"image/{filepath.suffix.lstrip('.')}")
 
-@app.get("/api/classes")
-async def get_classes() -> list[str]:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
+@router.get("/images/{image_id}/thumbnail")
+async def get_image_thumbnail(
+    image_id: str,
+    request: Request,
+    size: int = DEFAULT_THUMBNAIL_SIZE,
+    format: str = "jpeg",
+    dataset: Dataset = Depends(current_dataset)
+):
+    image = dataset.get_image(image_id)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    try:
+        # Derived from the source file, so revalidation skips the thumbnail cache entirely
+        etag = _stat_etag(Path(image.filepath), size, format)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        path = await run_in_threadpool(thumbnails.get, image.filepath, size, format)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image file not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return _file_response(request, path, etag, THUMBNAIL_FORMATS[format][1])
+
+@router.get("/classes")
+async def get_classes(dataset: Dataset = Depends(current_dataset)) -> list[str]:
     return dataset.parser.classes
 
-@app.get("/api/splits")
-async def get_splits() -> list[str]:
-    if not dataset.is_loaded:
-        raise HTTPException(status_code=400, detail="No dataset loaded")
+@router.get("/splits")
+async def get_splits(dataset: Dataset = Depends(current_dataset)) -> list[str]:
     return dataset.parser.splits
 
+# Every dataset is addressable by ID; the unprefixed routes serve the most recently loaded one
+app.include_router(router, prefix="/api")
+app.include_router(router, prefix=DATASET_PREFIX)
+
 if FRONTEND_DIR.exists():
     app.mount("/assets", StaticFiles(directory=FRONTEND_DIR / "assets"), name="assets")
     
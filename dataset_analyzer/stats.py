@@ -1,68 +1,167 @@
+import os
 import numpy as np
-from PIL import Image
 from pathlib import Path
 from collections import defaultdict
-from .models import ImageInfo, DatasetStats, BoxStats, ImageStats, SpatialStats
+from typing import Callable, Optional
+from .models import DatasetStats, BoxStats, ImageStats, SpatialStats, OverlapStats, GroupStats, GroupedStats, SplitDrift, DriftStats
+from .store import AnnotationStore
+from .overlap import iter_box_overlaps
+from .pixels import BrightnessAccumulator, DEFAULT_PIXEL_WORKERS, analyze_images
+from .groups import UNASSIGNED_SPLIT, make_groups, run_lengths, segments, grouped_histograms, grouped_summaries, divergences
+
+EDGE_THRESHOLD = 0.05
+TINY_BOX_SIZE = 16
+SMALL_BOX_AREA = 32 * 32
+MEDIUM_BOX_AREA = 96 * 96
+DEFAULT_IMAGE_SAMPLE_SIZE = 500
+# Laplacian variance below this (measured on the decoded thumbnail) counts as blurry
+BLUR_THRESHOLD = 100.0
+# Image stats report partial results roughly this many times while sampling
+PROGRESS_STEPS = 50
+# Same-class pairs at or above this IoU are reported as duplicate labels
+DEFAULT_DUPLICATE_IOU = 0.9
+# Pairs at or above this IoU count towards the class overlap matrix
+DEFAULT_OVERLAP_IOU = 0.5
+# An image is crowded when more than this fraction of its boxes intersects another box
+CROWD_FRACTION = 0.5
+IOU_BINS = 10
+MAX_DUPLICATE_EXAMPLES = 20
+SIZE_BINS = 20
+ASPECT_BINS = 15
+# Aspect ratios outside this range are left out of the histogram
+ASPECT_RANGE = (0, 3)
+GRID_SIZE = 10
+# Pseudo-count per bin so a split missing a class still has a finite KL divergence
+DRIFT_SMOOTHING = 0.5
+# Drift compares box areas in half-octave bins
+DRIFT_SIZE_BINS_PER_OCTAVE = 2
+DRIFT_SIZE_BINS = 34 * DRIFT_SIZE_BINS_PER_OCTAVE
+
+def box_pixel_sizes(store: AnnotationStore) -> tuple[np.ndarray, np.ndarray]:
+    pixel_w = store.w.astype(np.float64) * store.widths[store.image_index]
+    pixel_h = store.h.astype(np.float64) * store.heights[store.image_index]
+    return pixel_w, pixel_h
+
+def size_bucket_masks(pixel_w: np.ndarray, pixel_h: np.ndarray) -> dict[str, np.ndarray]:
+    areas = pixel_w * pixel_h
+    return {
+        "tiny": (pixel_w < TINY_BOX_SIZE) | (pixel_h < TINY_BOX_SIZE),
+        "small": areas < SMALL_BOX_AREA,
+        "medium": (areas >= SMALL_BOX_AREA) & (areas < MEDIUM_BOX_AREA),
+        "large": areas >= MEDIUM_BOX_AREA,
+    }
+
+def edge_bucket_masks(store: AnnotationStore) -> dict[str, np.ndarray]:
+    # Each box lands in the first matching bucket, checked top, bottom, left, right
+    x = store.x.astype(np.float64)
+    y = store.y.astype(np.float64)
+    top = y < EDGE_THRESHOLD
+    bottom = ~top & (y + store.h > 1 - EDGE_THRESHOLD)
+    rest = ~(top | bottom)
+    left = rest & (x < EDGE_THRESHOLD)
+    right = rest & ~left & (x + store.w > 1 - EDGE_THRESHOLD)
+    return {
+        "top": top,
+        "bottom": bottom,
+        "left": left,
+        "right": right,
+        "center": rest & ~left & ~right,
+    }
+
+def sorted_class_counts(counts: dict[str, int]) -> dict[str, int]:
+    # Largest first, ties by name, so patched and freshly computed stats list classes identically
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+def _pixel_fields(color_modes: dict[str, int], brightness: BrightnessAccumulator, sharpness: list[float], channel_sums: np.ndarray) -> dict:
+    sampled = len(sharpness)
+    sharpness = np.asarray(sharpness)
+    channel_means = channel_sums / sampled if sampled else channel_sums
+    return dict(
+        color_modes=dict(color_modes),
+        brightness_mean=round(brightness.mean, 1) if brightness.count else 128.0,
+        brightness_std=round(brightness.std, 1),
+        brightness_histogram=brightness.histogram.tolist(),
+        sampled_images=sampled,
+        sharpness_mean=round(float(sharpness.mean()), 1) if sampled else 0.0,
+        blurry_images=int((sharpness < BLUR_THRESHOLD).sum()),
+        channel_means={name: round(float(value), 1) for name, value in zip("RGB", channel_means)} if sampled else {}
+    )
 
 class StatsCalculator:
-    def __init__(self, images: list[ImageInfo]):
-        self.images = images
+    def __init__(self, store: AnnotationStore):
+        self.store = store
+    
+    def _present_classes(self) -> tuple[np.ndarray, np.ndarray]:
+        # Classes that occur at least once, in order of first occurrence, with their counts
+        class_ids, first_index, counts = np.unique(self.store.class_ids, return_index=True, return_counts=True)
+        order = np.argsort(first_index, kind="stable")
+        return class_ids[order], counts[order]
+    
+    def _grid_cells(self, grid_size: int) -> np.ndarray:
+        store = self.store
+        cx = store.x.astype(np.float64) + store.w.astype(np.float64) / 2
+        cy = store.y.astype(np.float64) + store.h.astype(np.float64) / 2
+        gx = np.clip(np.trunc(cx * grid_size), 0, grid_size - 1).astype(np.int64)
+        gy = np.clip(np.trunc(cy * grid_size), 0, grid_size - 1).astype(np.int64)
+        return gy * grid_size + gx
     
     def compute_dataset_stats(self) -> DatasetStats:
-        total_annotations = sum(len(img.annotations) for img in self.images)
-        empty_images = sum(1 for img in self.images if len(img.annotations) == 0)
+        num_images = self.store.num_images
+        total_annotations = self.store.num_boxes
+        empty_images = int((self.store.box_counts() == 0).sum())
         
-        class_counts = defaultdict(int)
-        for img in self.images:
-            for ann in img.annotations:
-                class_counts[ann.class_name] += 1
+        class_ids, counts = self._present_classes()
+        class_distribution = sorted_class_counts(dict(zip((self.store.classes[c] for c in class_ids.tolist()), counts.tolist())))
         
-        avg_boxes = total_annotations / len(self.images) if self.images else 0
+        avg_boxes = total_annotations / num_images if num_images else 0
         
         return DatasetStats(
-            total_images=len(self.images),
+            total_images=num_images,
             total_annotations=total_annotations,
-            total_classes=len(class_counts),
+            total_classes=len(class_ids),
             avg_boxes_per_image=round(avg_boxes, 2),
             empty_images=empty_images,
-            class_distribution=dict(sorted(class_counts.items(), key=lambda x: -x[1]))
+            class_distribution=class_distribution
+        )
+    
+    def patch_dataset_stats(self, stats: DatasetStats, removed_counts: dict[str, int], added_counts: dict[str, int]) -> DatasetStats:
+        class_counts = dict(stats.class_distribution)
+        for name, count in removed_counts.items():
+            class_counts[name] = class_counts.get(name, 0) - count
+        for name, count in added_counts.items():
+            class_counts[name] = class_counts.get(name, 0) + count
+        class_counts = {name: count for name, count in class_counts.items() if count > 0}
+        
+        num_images = self.store.num_images
+        total_annotations = self.store.num_boxes
+        avg_boxes = total_annotations / num_images if num_images else 0
+        
+        return DatasetStats(
+            total_images=num_images,
+            total_annotations=total_annotations,
+            total_classes=len(class_counts),
+            avg_boxes_per_image=round(avg_boxes, 2),
+            empty_images=int((self.store.box_counts() == 0).sum()),
+            class_distribution=sorted_class_counts(class_counts)
         )
     
     def compute_box_stats(self) -> BoxStats:
-        areas = []
-        aspect_ratios = []
-        boxes_per_image = []
-        tiny_count = 0
-        small_count = 0
-        medium_count = 0
-        large_count = 0
-        
-        for img in self.images:
-            boxes_per_image.append(len(img.annotations))
-            
-            for ann in img.annotations:
-                pixel_w = ann.width * img.width
-                pixel_h = ann.height * img.height
-                area = pixel_w * pixel_h
-                areas.append(area)
-                
-                if pixel_h > 0:
-                    aspect_ratios.append(pixel_w / pixel_h)
-                
-                if pixel_w < 16 or pixel_h < 16:
-                    tiny_count += 1
-                
-                if area < 32 * 32:
-                    small_count += 1
-                elif area < 96 * 96:
-                    medium_count += 1
-                else:
-                    large_count += 1
+        pixel_w, pixel_h = box_pixel_sizes(self.store)
+        areas = pixel_w * pixel_h
+        
+        valid_h = pixel_h > 0
+        aspect_ratios = pixel_w[valid_h] / pixel_h[valid_h]
+        
+        buckets = size_bucket_masks(pixel_w, pixel_h)
+        tiny_count = int(buckets["tiny"].sum())
+        small_count = int(buckets["small"].sum())
+        medium_count = int(buckets["medium"].sum())
+        large_count = len(areas) - small_count - medium_count
         
-        size_hist = self._compute_histogram(areas, bins=20) if areas else []
-        ar_hist = self._compute_histogram(aspect_ratios, bins=15, range_limit=(0, 3)) if aspect_ratios else []
+        size_hist = self._compute_histogram(areas, bins=SIZE_BINS) if len(areas) else []
+        ar_hist = self._compute_histogram(aspect_ratios, bins=ASPECT_BINS, range_limit=ASPECT_RANGE) if len(aspect_ratios) else []
         
-        bpi_array = np.array(boxes_per_image) if boxes_per_image else np.array([0])
+        bpi_array = self.store.box_counts() if self.store.num_images else np.array([0])
         
         return BoxStats(
             size_distribution=size_hist,
@@ -79,74 +178,156 @@ class StatsCalculator:
             tiny_boxes=tiny_count
         )
     
-    def compute_image_stats(self, sample_size: int = 100) -> ImageStats:
-        widths = [img.width for img in self.images]
-        heights = [img.height for img in self.images]
+    def compute_overlap_stats(self, duplicate_iou: float = DEFAULT_DUPLICATE_IOU, overlap_iou: float = DEFAULT_OVERLAP_IOU) -> OverlapStats:
+        store = self.store
+        num_classes = len(store.classes)
+        paired = []
+        iou_histogram = np.zeros(IOU_BINS, dtype=np.int64)
+        matrix = np.zeros(num_classes * num_classes, dtype=np.int64)
+        duplicates = []
+        
+        # Only box indices are kept per pair; IoUs and classes are folded into counts batch by batch
+        for first, second, iou in iter_box_overlaps(store):
+            paired += [first, second]
+            iou_histogram += np.bincount(np.minimum((iou * IOU_BINS).astype(np.int64), IOU_BINS - 1), minlength=IOU_BINS)
+            first_class, second_class = store.class_ids[first], store.class_ids[second]
+            
+            close = iou >= overlap_iou
+            low = np.minimum(first_class[close], second_class[close]).astype(np.int64)
+            high = np.maximum(first_class[close], second_class[close]).astype(np.int64)
+            matrix += np.bincount(low * num_classes + high, minlength=len(matrix))
+            
+            duplicate = (iou >= duplicate_iou) & (first_class == second_class)
+            duplicates.append(np.stack([first[duplicate], second[duplicate]], axis=1))
+        
+        neighbors = np.bincount(np.concatenate(paired), minlength=store.num_boxes) if paired else np.zeros(store.num_boxes, dtype=np.int64)
+        
+        # Symmetric: each unordered class pair was counted once in its upper triangle
+        matrix = matrix.reshape(num_classes, num_classes)
+        matrix = matrix + np.triu(matrix, 1).T
+        
+        duplicates = np.concatenate(duplicates) if duplicates else np.empty((0, 2), dtype=np.int64)
+        duplicate_boxes = np.unique(duplicates)
+        duplicate_images = store.image_index[duplicates[:, 0]]
+        per_image = np.bincount(duplicate_images, minlength=store.num_images)
+        per_class = np.bincount(store.class_ids[duplicates[:, 0]], minlength=num_classes)
+        examples = np.argsort(-per_image, kind="stable")[:min(MAX_DUPLICATE_EXAMPLES, int((per_image > 0).sum()))]
         
+        box_counts = store.box_counts()
+        overlapping = np.bincount(store.image_index[neighbors > 0], minlength=store.num_images)
+        crowded = (box_counts > 1) & (overlapping > CROWD_FRACTION * box_counts)
+        
+        return OverlapStats(
+            duplicate_iou=duplicate_iou,
+            overlap_iou=overlap_iou,
+            overlapping_pairs=int(iou_histogram.sum()),
+            iou_histogram=iou_histogram.tolist(),
+            duplicate_pairs=len(duplicates),
+            duplicate_boxes=len(duplicate_boxes),
+            images_with_duplicates=int((per_image > 0).sum()),
+            duplicates_per_class={name: int(count) for name, count in zip(store.classes, per_class.tolist()) if count},
+            duplicate_examples=[store.ids[row] for row in examples.tolist()],
+            classes=store.classes,
+            overlap_matrix=matrix.tolist(),
+            overlapping_boxes=int((neighbors > 0).sum()),
+            mean_neighbors=round(float(neighbors.mean()), 2) if len(neighbors) else 0.0,
+            max_neighbors=int(neighbors.max()) if len(neighbors) else 0,
+            crowded_images=int(crowded.sum())
+        )
+    
+    def sample_rows(self, sample_size: int, sampling: str = "random", seed: int = 0) -> np.ndarray:
+        num_images = self.store.num_images
+        if sample_size >= num_images:
+            return np.arange(num_images)
+        if sampling == "first":
+            return np.arange(sample_size)
+        
+        rng = np.random.default_rng(seed)
+        if sampling == "random":
+            return np.sort(rng.choice(num_images, sample_size, replace=False))
+        if sampling != "stratified":
+            raise ValueError(f"Unknown sampling mode: {sampling}")
+        
+        # Proportional allocation per split, at least one image from every non-empty split
+        split_ids = self.store.split_ids
+        groups, counts = np.unique(split_ids, return_counts=True)
+        quotas = np.maximum(1, np.floor(counts / num_images * sample_size).astype(np.int64))
+        rows = [
+            rng.choice(np.flatnonzero(split_ids == group), min(quota, count), replace=False)
+            for group, count, quota in zip(groups, counts, quotas)
+        ]
+        return np.sort(np.concatenate(rows))
+    
+    def compute_image_stats(
+        self,
+        sample_size: int = DEFAULT_IMAGE_SAMPLE_SIZE,
+        sampling: str = "random",
+        seed: int = 0,
+        workers: int = DEFAULT_PIXEL_WORKERS,
+        progress: Optional[Callable[[int, int, ImageStats], None]] = None
+    ) -> ImageStats:
         formats = defaultdict(int)
-        for img in self.images:
-            ext = Path(img.filename).suffix.lower().lstrip(".")
+        for filename in self.store.filenames:
+            ext = Path(filename).suffix.lower().lstrip(".")
             formats[ext] += 1
         
-        sample_images = self.images[:sample_size]
-        brightness_values = []
+        brightness = BrightnessAccumulator()
         color_modes = defaultdict(int)
+        sharpness = []
+        channel_sums = np.zeros(3)
         
-        for img_info in sample_images:
-            try:
-                with Image.open(img_info.filepath) as img:
-                    color_modes[img.mode] += 1
-                    gray = img.convert("L")
-                    brightness_values.extend(list(gray.getdata()))
-            except Exception:
-                continue
+        paths = [self.store.filepaths[row] for row in self.sample_rows(sample_size, sampling, seed).tolist()]
+        report_every = max(1, len(paths) // PROGRESS_STEPS)
+        for done, summary in enumerate(analyze_images(paths, workers), 1):
+            if summary is not None:
+                color_modes[summary.mode] += 1
+                brightness.add_summary(summary.count, summary.mean, summary.m2, summary.histogram)
+                sharpness.append(summary.sharpness)
+                channel_sums += summary.channel_means
+            if progress is not None and done % report_every == 0 and done < len(paths):
+                progress(done, len(paths), self._image_stats(formats, color_modes, brightness, sharpness, channel_sums))
         
-        brightness_array = np.array(brightness_values) if brightness_values else np.array([128])
+        stats = self._image_stats(formats, color_modes, brightness, sharpness, channel_sums)
+        if progress is not None:
+            progress(len(paths), len(paths), stats)
+        return stats
+    
+    def _image_stats(
+        self,
+        formats: dict[str, int],
+        color_modes: dict[str, int],
+        brightness: BrightnessAccumulator,
+        sharpness: list[float],
+        channel_sums: np.ndarray
+    ) -> ImageStats:
+        widths = self.store.widths
+        heights = self.store.heights
+        has_images = len(widths) > 0
         
         return ImageStats(
-            min_width=min(widths) if widths else 0,
-            max_width=max(widths) if widths else 0,
-            min_height=min(heights) if heights else 0,
-            max_height=max(heights) if heights else 0,
-            avg_width=round(np.mean(widths), 1) if widths else 0,
-            avg_height=round(np.mean(heights), 1) if heights else 0,
+            min_width=int(widths.min()) if has_images else 0,
+            max_width=int(widths.max()) if has_images else 0,
+            min_height=int(heights.min()) if has_images else 0,
+            max_height=int(heights.max()) if has_images else 0,
+            avg_width=round(float(widths.mean()), 1) if has_images else 0,
+            avg_height=round(float(heights.mean()), 1) if has_images else 0,
             formats=dict(formats),
-            color_modes=dict(color_modes),
-            brightness_mean=round(float(brightness_array.mean()), 1),
-            brightness_std=round(float(brightness_array.std()), 1)
+            **_pixel_fields(color_modes, brightness, sharpness, channel_sums)
         )
     
-    def compute_spatial_stats(self, grid_size: int = 10) -> SpatialStats:
-        heatmap = np.zeros((grid_size, grid_size))
-        per_class_heatmaps = defaultdict(lambda: np.zeros((grid_size, grid_size)))
-        
-        edge_counts = {"top": 0, "bottom": 0, "left": 0, "right": 0, "center": 0}
-        total_boxes = 0
-        
-        for img in self.images:
-            for ann in img.annotations:
-                cx = ann.x + ann.width / 2
-                cy = ann.y + ann.height / 2
-                
-                gx = min(int(cx * grid_size), grid_size - 1)
-                gy = min(int(cy * grid_size), grid_size - 1)
-                
-                heatmap[gy, gx] += 1
-                per_class_heatmaps[ann.class_name][gy, gx] += 1
-                
-                total_boxes += 1
-                
-                threshold = 0.05
-                if ann.y < threshold:
-                    edge_counts["top"] += 1
-                elif ann.y + ann.height > 1 - threshold:
-                    edge_counts["bottom"] += 1
-                elif ann.x < threshold:
-                    edge_counts["left"] += 1
-                elif ann.x + ann.width > 1 - threshold:
-                    edge_counts["right"] += 1
-                else:
-                    edge_counts["center"] += 1
+    def compute_spatial_stats(self, grid_size: int = GRID_SIZE) -> SpatialStats:
+        store = self.store
+        num_cells = grid_size * grid_size
+        total_boxes = store.num_boxes
+        
+        cells = self._grid_cells(grid_size)
+        heatmap = np.bincount(cells, minlength=num_cells).astype(np.float64).reshape(grid_size, grid_size)
+        
+        class_cells = store.class_ids.astype(np.int64) * num_cells + cells
+        class_heatmaps = np.bincount(class_cells, minlength=len(store.classes) * num_cells)
+        class_heatmaps = class_heatmaps.astype(np.float64).reshape(-1, grid_size, grid_size)
+        
+        edge_counts = {name: int(mask.sum()) for name, mask in edge_bucket_masks(store).items()}
         
         if heatmap.max() > 0:
             heatmap = heatmap / heatmap.max()
@@ -154,10 +335,11 @@ class StatsCalculator:
         edge_pct = {k: round(v / total_boxes * 100, 1) if total_boxes > 0 else 0 for k, v in edge_counts.items()}
         
         class_heatmaps_normalized = {}
-        for class_name, h in per_class_heatmaps.items():
+        for class_id in self._present_classes()[0]:
+            h = class_heatmaps[class_id]
             if h.max() > 0:
                 h = h / h.max()
-            class_heatmaps_normalized[class_name] = h.tolist()
+            class_heatmaps_normalized[store.classes[class_id]] = h.tolist()
         
         return SpatialStats(
             heatmap=heatmap.tolist(),
@@ -165,11 +347,197 @@ class StatsCalculator:
             per_class_heatmaps=class_heatmaps_normalized
         )
     
-    def _compute_histogram(self, values: list, bins: int = 20, range_limit: tuple = None) -> list[int]:
-        if not values:
+    def compute_grouped_stats(
+        self,
+        by: str,
+        sample_size: int = DEFAULT_IMAGE_SAMPLE_SIZE,
+        sampling: str = "random",
+        seed: int = 0,
+        workers: int = DEFAULT_PIXEL_WORKERS,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> GroupedStats:
+        # Every family at once for each split or class: one bincount or sorted reduction per field over group keys
+        store = self.store
+        groups = make_groups(store, by)
+        num_groups = len(groups.names)
+        num_classes = len(store.classes)
+        box_groups = groups.box_groups
+        member_groups = groups.member_groups
+        member_counts = np.bincount(member_groups, minlength=num_groups)
+        box_totals = np.bincount(box_groups, minlength=num_groups)
+        
+        # Present classes per group in order of first occurrence in the whole dataset
+        present_classes = self._present_classes()[0]
+        first_rank = np.zeros(num_classes, dtype=np.int64)
+        first_rank[present_classes] = np.arange(len(present_classes))
+        pairs, pair_counts = run_lengths(box_groups * num_classes + store.class_ids)
+        pair_groups, pair_classes = pairs // num_classes, pairs % num_classes
+        pair_starts, pair_lengths = segments(pair_groups, num_groups)
+        
+        pixel_w, pixel_h = box_pixel_sizes(store)
+        valid_h = pixel_h > 0
+        size_hists = grouped_histograms(pixel_w * pixel_h, box_groups, num_groups, SIZE_BINS)
+        aspect_hists = grouped_histograms(pixel_w[valid_h] / pixel_h[valid_h], box_groups[valid_h], num_groups, ASPECT_BINS, ASPECT_RANGE)
+        aspect_totals = np.bincount(box_groups[valid_h], minlength=num_groups)
+        buckets = {name: np.bincount(box_groups[mask], minlength=num_groups) for name, mask in size_bucket_masks(pixel_w, pixel_h).items()}
+        per_image = grouped_summaries(groups.member_boxes, member_groups, num_groups, median=True)
+        empty_images = np.bincount(member_groups[groups.member_boxes == 0], minlength=num_groups)
+        
+        widths = grouped_summaries(store.widths[groups.member_rows], member_groups, num_groups)
+        heights = grouped_summaries(store.heights[groups.member_rows], member_groups, num_groups)
+        ext_index: dict[str, int] = {}
+        ext_ids = np.array(
+            [ext_index.setdefault(os.path.splitext(filename)[1].lower().lstrip("."), len(ext_index)) for filename in store.filenames],
+            dtype=np.int64
+        )
+        formats = np.bincount(member_groups * len(ext_index) + ext_ids[groups.member_rows], minlength=num_groups * len(ext_index))
+        formats = formats.reshape(num_groups, len(ext_index))
+        
+        num_cells = GRID_SIZE * GRID_SIZE
+        cells = self._grid_cells(GRID_SIZE)
+        heatmaps = np.bincount(box_groups * num_cells + cells, minlength=num_groups * num_cells).reshape(num_groups, GRID_SIZE, GRID_SIZE)
+        edge_ids = np.zeros(store.num_boxes, dtype=np.int64)
+        edge_names = []
+        for i, (name, mask) in enumerate(edge_bucket_masks(store).items()):
+            edge_ids[mask] = i
+            edge_names.append(name)
+        edges = np.bincount(box_groups * len(edge_names) + edge_ids, minlength=num_groups * len(edge_names)).reshape(num_groups, -1)
+        # One heatmap per present (group, class) pair, in the order of `pairs`
+        cell_keys, cell_counts = run_lengths((box_groups * num_classes + store.class_ids) * num_cells + cells)
+        class_heatmaps = np.zeros((len(pairs), num_cells))
+        class_heatmaps[np.searchsorted(pairs, cell_keys // num_cells), cell_keys % num_cells] = cell_counts
+        
+        # Pixel statistics: each sampled image is folded into every group it belongs to
+        brightness = defaultdict(BrightnessAccumulator)
+        color_modes = defaultdict(lambda: defaultdict(int))
+        sharpness = defaultdict(list)
+        channel_sums = defaultdict(lambda: np.zeros(3))
+        rows = self.sample_rows(sample_size, sampling, seed).tolist()
+        paths = [store.filepaths[row] for row in rows]
+        report_every = max(1, len(paths) // PROGRESS_STEPS)
+        for done, (row, summary) in enumerate(zip(rows, analyze_images(paths, workers)), 1):
+            if summary is not None:
+                if by == "split":
+                    keys = [int(store.split_ids[row]) + 1]
+                else:
+                    keys = np.unique(store.class_ids[store.offsets[row]:store.offsets[row + 1]]).tolist()
+                for key in keys:
+                    color_modes[key][summary.mode] += 1
+                    brightness[key].add_summary(summary.count, summary.mean, summary.m2, summary.histogram)
+                    sharpness[key].append(summary.sharpness)
+                    channel_sums[key] += summary.channel_means
+            if progress is not None and (done % report_every == 0 or done == len(paths)):
+                progress(done, len(paths))
+        
+        def normalized(heatmap: np.ndarray) -> list[list[float]]:
+            heatmap = heatmap.astype(np.float64)
+            return (heatmap / heatmap.max() if heatmap.max() > 0 else heatmap).tolist()
+        
+        results = {}
+        for g in np.flatnonzero(member_counts).tolist():
+            span = slice(pair_starts[g], pair_starts[g] + pair_lengths[g])
+            classes, counts = pair_classes[span], pair_counts[span]
+            by_first = np.argsort(first_rank[classes], kind="stable")
+            num_images, num_boxes = int(member_counts[g]), int(box_totals[g])
+            total_edges = int(edges[g].sum())
+            results[groups.names[g]] = GroupStats(
+                dataset=DatasetStats(
+                    total_images=num_images,
+                    total_annotations=num_boxes,
+                    total_classes=len(classes),
+                    avg_boxes_per_image=round(num_boxes / num_images, 2),
+                    empty_images=int(empty_images[g]),
+                    class_distribution=sorted_class_counts(dict(zip((store.classes[c] for c in classes.tolist()), counts.tolist())))
+                ),
+                boxes=BoxStats(
+                    size_distribution=size_hists[g].tolist() if num_boxes else [],
+                    aspect_ratio_distribution=aspect_hists[g].tolist() if aspect_totals[g] else [],
+                    small_count=int(buckets["small"][g]),
+                    medium_count=int(buckets["medium"][g]),
+                    large_count=num_boxes - int(buckets["small"][g]) - int(buckets["medium"][g]),
+                    boxes_per_image={
+                        "min": int(per_image["min"][g]),
+                        "max": int(per_image["max"][g]),
+                        "avg": round(float(per_image["avg"][g]), 1),
+                        "median": int(per_image["median"][g])
+                    },
+                    tiny_boxes=int(buckets["tiny"][g])
+                ),
+                images=ImageStats(
+                    min_width=int(widths["min"][g]),
+                    max_width=int(widths["max"][g]),
+                    min_height=int(heights["min"][g]),
+                    max_height=int(heights["max"][g]),
+                    avg_width=round(float(widths["avg"][g]), 1),
+                    avg_height=round(float(heights["avg"][g]), 1),
+                    formats={name: int(count) for name, count in zip(ext_index, formats[g]) if count},
+                    **_pixel_fields(color_modes[g], brightness[g], sharpness[g], channel_sums[g])
+                ),
+                spatial=SpatialStats(
+                    heatmap=normalized(heatmaps[g]),
+                    edge_proximity={
+                        name: round(int(count) / total_edges * 100, 1) if total_edges > 0 else 0
+                        for name, count in zip(edge_names, edges[g])
+                    },
+                    per_class_heatmaps={
+                        store.classes[classes[i]]: normalized(class_heatmaps[span][i].reshape(GRID_SIZE, GRID_SIZE))
+                        for i in by_first.tolist()
+                    }
+                )
+            )
+        return GroupedStats(by=by, sampled_images=len(rows), groups=results)
+    
+    def compute_drift_stats(self) -> DriftStats:
+        # Pairwise divergence between the class and box-size distributions of every split with boxes
+        store = self.store
+        num_classes = len(store.classes)
+        names = [UNASSIGNED_SPLIT] + store.split_names
+        box_splits = store.split_ids[store.image_index].astype(np.int64) + 1
+        class_counts = np.bincount(box_splits * num_classes + store.class_ids, minlength=len(names) * num_classes).reshape(len(names), -1)
+        
+        pixel_w, pixel_h = box_pixel_sizes(store)
+        areas = pixel_w * pixel_h
+        sized = np.isfinite(areas)
+        with np.errstate(divide="ignore"):
+            size_bins = np.clip(np.log2(np.maximum(areas[sized], 1)) * DRIFT_SIZE_BINS_PER_OCTAVE, 0, DRIFT_SIZE_BINS - 1).astype(np.int64)
+        size_counts = np.bincount(box_splits[sized] * DRIFT_SIZE_BINS + size_bins, minlength=len(names) * DRIFT_SIZE_BINS).reshape(len(names), -1)
+        
+        present = np.flatnonzero(class_counts.sum(axis=1))
+        class_counts, size_counts = class_counts[present], size_counts[present]
+        names = [names[i] for i in present.tolist()]
+        if not names:
+            return DriftStats(reference="", splits=[], class_js_matrix=[], size_js_matrix=[], drift=[])
+        class_kl, class_js = divergences(class_counts, DRIFT_SMOOTHING)
+        size_kl, size_js = divergences(size_counts, DRIFT_SMOOTHING)
+        totals = class_counts.sum(axis=1)
+        reference = int(np.argmax(totals))
+        
+        return DriftStats(
+            reference=names[reference],
+            splits=names,
+            class_js_matrix=np.round(class_js, 4).tolist(),
+            size_js_matrix=np.round(size_js, 4).tolist(),
+            drift=[
+                SplitDrift(
+                    split=name,
+                    boxes=int(totals[i]),
+                    class_kl=round(float(class_kl[i, reference]), 4),
+                    class_js=round(float(class_js[i, reference]), 4),
+                    size_kl=round(float(size_kl[i, reference]), 4),
+                    size_js=round(float(size_js[i, reference]), 4),
+                    missing_classes=[
+                        store.classes[c] for c in np.flatnonzero((class_counts[reference] > 0) & (class_counts[i] == 0)).tolist()
+                    ]
+                )
+                for i, name in enumerate(names)
+            ]
+        )
+    
+    def _compute_histogram(self, values: np.ndarray, bins: int = 20, range_limit: tuple = None) -> list[int]:
+        if len(values) == 0:
             return [0] * bins
         
-        arr = np.array(values)
+        arr = np.asarray(values)
         if range_limit:
             arr = arr[(arr >= range_limit[0]) & (arr <= range_limit[1])]
         
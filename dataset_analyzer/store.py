@@ -0,0 +1,259 @@
+import numpy as np
+from array import array
+from typing import Iterable, Optional
+from .models import ImageInfo, BoundingBox
+
+def _as_floats(values: np.ndarray) -> list[float]:
+    # float32 carries ~7 significant digits; rounding drops the widening noise (0.2 -> 0.20000000298)
+    return np.round(values.astype(np.float64), 6).tolist()
+
+ARRAY_FIELDS = (
+    "widths", "heights", "split_ids",
+    "x", "y", "w", "h", "class_ids", "confidence",
+    "image_index", "offsets",
+)
+
+# Rough heap cost of one image's id, filename and filepath strings plus its index entry
+IMAGE_OVERHEAD_BYTES = 400
+
+class AnnotationStore:
+    def __init__(self):
+        self.classes: list[str] = []
+        self.split_names: list[str] = []
+        self.ids: list[str] = []
+        self.filenames: list[str] = []
+        self.filepaths: list[str] = []
+        self.index: dict[str, int] = {}
+        self._class_index: dict[str, int] = {}
+        self._split_index: dict[str, int] = {}
+        
+        self._widths = array("i")
+        self._heights = array("i")
+        self._split_ids = array("i")
+        self._box_image = array("i")
+        self._x = array("f")
+        self._y = array("f")
+        self._w = array("f")
+        self._h = array("f")
+        self._class_ids = array("i")
+        self._confidence = array("f")
+        
+        self.widths = np.zeros(0, dtype=np.int32)
+        self.heights = np.zeros(0, dtype=np.int32)
+        self.split_ids = np.zeros(0, dtype=np.int32)
+        self.x = np.zeros(0, dtype=np.float32)
+        self.y = np.zeros(0, dtype=np.float32)
+        self.w = np.zeros(0, dtype=np.float32)
+        self.h = np.zeros(0, dtype=np.float32)
+        self.class_ids = np.zeros(0, dtype=np.int32)
+        self.confidence = np.zeros(0, dtype=np.float32)
+        self.image_index = np.zeros(0, dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int32)
+    
+    @property
+    def num_images(self) -> int:
+        return len(self.ids)
+    
+    @property
+    def num_boxes(self) -> int:
+        return len(self.class_ids)
+    
+    def nbytes(self) -> int:
+        # Memory-mapped columns from the parse cache live in the page cache, not on the heap
+        arrays = (getattr(self, field) for field in ARRAY_FIELDS)
+        return sum(a.nbytes for a in arrays if not isinstance(a, np.memmap)) + self.num_images * IMAGE_OVERHEAD_BYTES
+    
+    def set_classes(self, classes: list[str]) -> None:
+        self.classes = []
+        self._class_index = {}
+        for name in classes:
+            self.class_id(name)
+    
+    def class_id(self, name: str) -> int:
+        class_id = self._class_index.get(name)
+        if class_id is None:
+            class_id = len(self.classes)
+            self._class_index[name] = class_id
+            self.classes.append(name)
+        return class_id
+    
+    def split_id(self, name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        split_id = self._split_index.get(name)
+        if split_id is None:
+            split_id = len(self.split_names)
+            self._split_index[name] = split_id
+            self.split_names.append(name)
+        return split_id
+    
+    def class_index(self, name: str) -> Optional[int]:
+        return self._class_index.get(name)
+    
+    def split_index(self, name: str) -> Optional[int]:
+        return self._split_index.get(name)
+    
+    def add_image(self, image_id: str, filename: str, filepath: str, width: int, height: int, split: Optional[str] = None) -> int:
+        row = len(self.ids)
+        self.ids.append(image_id)
+        self.filenames.append(filename)
+        self.filepaths.append(filepath)
+        self._widths.append(width)
+        self._heights.append(height)
+        self._split_ids.append(self.split_id(split))
+        self.index[image_id] = row
+        return row
+    
+    def add_box(self, row: int, x: float, y: float, width: float, height: float, class_id: int, confidence: Optional[float] = None) -> None:
+        self._box_image.append(row)
+        self._x.append(x)
+        self._y.append(y)
+        self._w.append(width)
+        self._h.append(height)
+        self._class_ids.append(class_id)
+        self._confidence.append(np.nan if confidence is None else confidence)
+    
+    def add_boxes(self, rows: np.ndarray, x: np.ndarray, y: np.ndarray, width: np.ndarray, height: np.ndarray, class_ids: np.ndarray, confidence: Optional[np.ndarray] = None) -> None:
+        if confidence is None:
+            confidence = np.full(len(rows), np.nan)
+        for buf, values, dtype in (
+            (self._box_image, rows, np.int32), (self._x, x, np.float32), (self._y, y, np.float32),
+            (self._w, width, np.float32), (self._h, height, np.float32),
+            (self._class_ids, class_ids, np.int32), (self._confidence, confidence, np.float32),
+        ):
+            buf.frombytes(np.ascontiguousarray(values, dtype=dtype).tobytes())
+    
+    def finalize(self) -> None:
+        widths = np.frombuffer(self._widths, dtype=np.int32).copy()
+        heights = np.frombuffer(self._heights, dtype=np.int32).copy()
+        split_ids = np.frombuffer(self._split_ids, dtype=np.int32).copy()
+        box_image = np.frombuffer(self._box_image, dtype=np.int32).copy()
+        columns = [np.frombuffer(buf, dtype=dtype).copy() for buf, dtype in (
+            (self._x, np.float32), (self._y, np.float32), (self._w, np.float32), (self._h, np.float32),
+            (self._class_ids, np.int32), (self._confidence, np.float32),
+        )]
+        
+        # Later rows win on duplicate ids, matching the old dict-overwrite behaviour
+        keep = np.zeros(len(self.ids), dtype=bool)
+        keep[list(self.index.values())] = True
+        if not keep.all():
+            remap = np.cumsum(keep, dtype=np.int32) - 1
+            box_keep = keep[box_image]
+            box_image = remap[box_image[box_keep]]
+            columns = [col[box_keep] for col in columns]
+            rows = np.flatnonzero(keep)
+            self.ids = [self.ids[i] for i in rows]
+            self.filenames = [self.filenames[i] for i in rows]
+            self.filepaths = [self.filepaths[i] for i in rows]
+            widths, heights, split_ids = widths[keep], heights[keep], split_ids[keep]
+            self.index = {image_id: row for row, image_id in enumerate(self.ids)}
+        
+        order = np.argsort(box_image, kind="stable")
+        self.image_index = box_image[order]
+        self.x, self.y, self.w, self.h, self.class_ids, self.confidence = (col[order] for col in columns)
+        self.widths, self.heights, self.split_ids = widths, heights, split_ids
+        
+        counts = np.bincount(self.image_index, minlength=len(self.ids))
+        self.offsets = np.zeros(len(self.ids) + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.offsets[1:])
+        
+        for buf in (self._widths, self._heights, self._split_ids, self._box_image, self._x, self._y,
+                    self._w, self._h, self._class_ids, self._confidence):
+            del buf[:]
+    
+    def derive(self) -> "AnnotationStore":
+        patch = AnnotationStore()
+        patch.set_classes(self.classes)
+        for name in self.split_names:
+            patch.split_id(name)
+        return patch
+    
+    def affected_rows(self, image_ids: Iterable[str]) -> np.ndarray:
+        rows = [self.index[image_id] for image_id in image_ids if image_id in self.index]
+        return np.array(sorted(rows), dtype=np.int64)
+    
+    def merge(self, patch: "AnnotationStore", removed_ids: Iterable[str] = ()) -> "AnnotationStore":
+        # patch must come from derive() and be finalized; its rows replace same-id rows in place.
+        # Returns a new store so readers of this one keep a consistent view.
+        num_old = self.num_images
+        drop = np.zeros(num_old, dtype=bool)
+        drop[self.affected_rows(removed_ids)] = True
+        
+        patch_rows = np.full(num_old, -1, dtype=np.int64)
+        appended = []
+        for row, image_id in enumerate(patch.ids):
+            old_row = self.index.get(image_id)
+            if old_row is None:
+                appended.append(row)
+            else:
+                patch_rows[old_row] = row
+                drop[old_row] = False
+        
+        kept = np.flatnonzero(~drop)
+        pick = np.where(patch_rows[kept] >= 0, patch_rows[kept] + num_old, kept)
+        pick = np.concatenate([pick, np.array(appended, dtype=np.int64) + num_old])
+        
+        merged = AnnotationStore()
+        for field in ("widths", "heights", "split_ids"):
+            setattr(merged, field, np.concatenate([getattr(self, field), getattr(patch, field)])[pick])
+        for field in ("ids", "filenames", "filepaths"):
+            combined = getattr(self, field) + getattr(patch, field)
+            setattr(merged, field, [combined[i] for i in pick.tolist()])
+        
+        final_row = np.full(num_old + patch.num_images, -1, dtype=np.int64)
+        final_row[pick] = np.arange(len(pick))
+        box_rows = final_row[np.concatenate([self.image_index, patch.image_index + num_old])]
+        box_keep = box_rows >= 0
+        order = np.argsort(box_rows[box_keep], kind="stable")
+        merged.image_index = box_rows[box_keep][order].astype(np.int32)
+        for field in ("x", "y", "w", "h", "class_ids", "confidence"):
+            combined = np.concatenate([getattr(self, field), getattr(patch, field)])
+            setattr(merged, field, combined[box_keep][order])
+        
+        counts = np.bincount(merged.image_index, minlength=len(pick))
+        merged.offsets = np.zeros(len(pick) + 1, dtype=np.int32)
+        np.cumsum(counts, out=merged.offsets[1:])
+        
+        merged.classes = list(patch.classes)
+        merged.split_names = list(patch.split_names)
+        merged.rebuild_indexes()
+        return merged
+    
+    def rebuild_indexes(self) -> None:
+        self.index = {image_id: row for row, image_id in enumerate(self.ids)}
+        self._class_index = {name: class_id for class_id, name in enumerate(self.classes)}
+        self._split_index = {name: split_id for split_id, name in enumerate(self.split_names)}
+    
+    def box_counts(self) -> np.ndarray:
+        return np.diff(self.offsets)
+    
+    def image_info(self, row: int) -> ImageInfo:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        annotations = [
+            BoundingBox(
+                x=x, y=y, width=w, height=h,
+                class_name=self.classes[class_id],
+                confidence=None if conf != conf else conf
+            )
+            for x, y, w, h, class_id, conf in zip(
+                _as_floats(self.x[start:end]), _as_floats(self.y[start:end]),
+                _as_floats(self.w[start:end]), _as_floats(self.h[start:end]),
+                self.class_ids[start:end].tolist(), _as_floats(self.confidence[start:end]),
+            )
+        ]
+        split_id = int(self.split_ids[row])
+        return ImageInfo(
+            id=self.ids[row],
+            filename=self.filenames[row],
+            filepath=self.filepaths[row],
+            width=int(self.widths[row]),
+            height=int(self.heights[row]),
+            split=self.split_names[split_id] if split_id >= 0 else None,
+            annotations=annotations
+        )
+    
+    def get_image(self, image_id: str) -> Optional[ImageInfo]:
+        row = self.index.get(image_id)
+        if row is None:
+            return None
+        return self.image_info(row)
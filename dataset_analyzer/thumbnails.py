@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+from PIL import Image
+from .cache import DEFAULT_CACHE_DIR
+
+THUMBNAIL_SIZES = (128, 256, 512)
+DEFAULT_THUMBNAIL_SIZE = 256
+THUMBNAIL_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+DEFAULT_THUMBNAIL_CACHE_BYTES = 512 * 1024 * 1024
+# Eviction trims the cache to this fraction of its budget so it does not run on every write
+EVICT_TO = 0.9
+# Prewarm requests beyond this many queued thumbnails are dropped; they render on demand instead
+MAX_PREWARM_PENDING = 256
+
+logger = logging.getLogger(__name__)
+
+def render_thumbnail(source: str, target: Path, size: int, fmt: str) -> None:
+    with Image.open(source) as img:
+        # JPEG draft decodes directly at 1/2..1/8 scale, so 4K originals never get fully decoded
+        img.draft("RGB", (size, size))
+        thumb = img.convert("RGB")
+    thumb.thumbnail((size, size), Image.Resampling.BILINEAR)
+    
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex[:8]}")
+    thumb.save(tmp, THUMBNAIL_FORMATS[fmt][0], quality=80)
+    os.replace(tmp, target)
+
+class ThumbnailCache:
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR / "thumbnails", max_bytes: int = DEFAULT_THUMBNAIL_CACHE_BYTES, workers: int = 4):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+        self._total_bytes = None
+        self._lock = threading.Lock()
+        # (source, size, format) of every queued or running prewarm
+        self._pending: set[tuple[str, int, str]] = set()
+        self._pending_lock = threading.Lock()
+    
+    def path_for(self, source: str, size: int, fmt: str) -> Path:
+        st = os.stat(source)
+        key = hashlib.sha1(f"{source}|{st.st_mtime_ns}|{st.st_size}|{size}".encode()).hexdigest()
+        return self.root / key[:2] / f"{key}.{fmt}"
+    
+    def get(self, source: str, size: int = DEFAULT_THUMBNAIL_SIZE, fmt: str = "jpeg") -> Path:
+        if size not in THUMBNAIL_SIZES:
+            raise ValueError(f"Unsupported thumbnail size: {size}")
+        if fmt not in THUMBNAIL_FORMATS:
+            raise ValueError(f"Unsupported thumbnail format: {fmt}")
+        
+        target = self.path_for(source, size, fmt)
+        try:
+            # The file mtime doubles as the LRU timestamp
+            os.utime(target)
+            return target
+        except FileNotFoundError:
+            pass
+        
+        render_thumbnail(source, target, size, fmt)
+        self._account(target.stat().st_size)
+        return target
+    
+    def prewarm(self, sources: Iterable[str], size: int = DEFAULT_THUMBNAIL_SIZE, fmt: str = "jpeg") -> None:
+        for source in sources:
+            key = (source, size, fmt)
+            with self._pending_lock:
+                if key in self._pending or len(self._pending) >= MAX_PREWARM_PENDING:
+                    continue
+                self._pending.add(key)
+            self.executor.submit(self._prewarm_one, key)
+    
+    def _prewarm_one(self, key: tuple[str, int, str]) -> None:
+        source, size, fmt = key
+        try:
+            if not self.path_for(source, size, fmt).exists():
+                self.get(source, size, fmt)
+        except Exception:
+            logger.debug("Failed to prewarm thumbnail for %s", source, exc_info=True)
+        finally:
+            with self._pending_lock:
+                self._pending.discard(key)
+    
+    def _entries(self) -> list[os.DirEntry]:
+        entries = []
+        if not self.root.exists():
+            return entries
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if shard.is_dir():
+                    with os.scandir(shard.path) as it:
+                        entries.extend(entry for entry in it if entry.is_file() and not entry.name.startswith("."))
+        return entries
+    
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+            else:
+                self._total_bytes += added
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self) -> None:
+        entries = []
+        for entry in self._entries():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        entries.sort()
+        
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_bytes * EVICT_TO
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+thumbnails = ThumbnailCache()
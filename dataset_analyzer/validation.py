@@ -0,0 +1,164 @@
+import os
+import numpy as np
+from typing import Callable, Optional
+from .imageheader import DEFAULT_IO_WORKERS, probe_image_sizes
+from .models import ValidationIssue, ValidationReport
+from .store import AnnotationStore, _as_floats
+
+BOX_RULES = ("nan_coordinates", "degenerate_box", "out_of_bounds", "unknown_class")
+IMAGE_RULES = ("missing_file", "unreadable_image", "size_mismatch")
+# Issues store their rule as an index into this tuple
+RULES = BOX_RULES + IMAGE_RULES
+# Normalized slack for boxes drawn up to the image edge, about a pixel at 1000px
+BOUNDS_TOLERANCE = 1e-3
+HEADER_BATCH_SIZE = 4096
+DEFAULT_ISSUE_LIMIT = 50
+
+def box_issue_masks(store: AnnotationStore, undeclared_classes: list[str]) -> dict[str, np.ndarray]:
+    x, y, w, h = (column.astype(np.float64) for column in (store.x, store.y, store.w, store.h))
+    finite = np.isfinite(x) & np.isfinite(y) & np.isfinite(w) & np.isfinite(h)
+    undeclared = np.zeros(len(store.classes), dtype=bool)
+    undeclared[[i for i, name in enumerate(store.classes) if name in undeclared_classes]] = True
+    return {
+        "nan_coordinates": ~finite,
+        "degenerate_box": finite & ((w <= 0) | (h <= 0)),
+        "out_of_bounds": finite & (
+            (x < -BOUNDS_TOLERANCE) | (y < -BOUNDS_TOLERANCE)
+            | (x + w > 1 + BOUNDS_TOLERANCE) | (y + h > 1 + BOUNDS_TOLERANCE)
+        ),
+        "unknown_class": undeclared[store.class_ids],
+    }
+
+def missing_files(filepaths: list[str]) -> np.ndarray:
+    # One listing per directory instead of a stat per image
+    listings: dict[str, set[str]] = {}
+    missing = np.zeros(len(filepaths), dtype=bool)
+    for row, path in enumerate(filepaths):
+        directory, _, name = path.rpartition(os.sep)
+        names = listings.get(directory)
+        if names is None:
+            try:
+                names = set(os.listdir(directory or os.sep))
+            except OSError:
+                names = set()
+            listings[directory] = names
+        missing[row] = name not in names
+    return missing
+
+def header_sizes(
+    filepaths: list[str],
+    rows: np.ndarray,
+    workers: int = DEFAULT_IO_WORKERS,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> np.ndarray:
+    # (width, height) read from each file header, -1 where it could not be read
+    sizes = np.full((len(rows), 2), -1, dtype=np.int64)
+    for start in range(0, len(rows), HEADER_BATCH_SIZE):
+        batch = rows[start:start + HEADER_BATCH_SIZE].tolist()
+        probed = probe_image_sizes([filepaths[row] for row in batch], workers)
+        for i, size in enumerate(probed, start):
+            if size is not None:
+                sizes[i] = size
+        if progress is not None:
+            progress(start + len(batch), len(rows))
+    return sizes
+
+class IssueIndex:
+    def __init__(self, store: AnnotationStore, rules: np.ndarray, rows: np.ndarray, boxes: np.ndarray, report: ValidationReport, headers: Optional[np.ndarray] = None):
+        # Sorted by image, then box (image-level issues first), then rule
+        order = np.lexsort((rules, boxes, rows))
+        self.store = store
+        self.rules = rules[order]
+        self.rows = rows[order]
+        self.boxes = boxes[order]
+        self.report = report
+        self.headers = headers
+    
+    def page(self, rule: Optional[str], page: int, limit: int) -> tuple[list[ValidationIssue], int]:
+        if rule is None:
+            selected = np.arange(len(self.rules))
+        elif rule in RULES:
+            selected = np.flatnonzero(self.rules == RULES.index(rule))
+        else:
+            raise ValueError(f"Unknown validation rule: {rule}")
+        start = (page - 1) * limit
+        return [self._issue(int(i)) for i in selected[start:start + limit]], len(selected)
+    
+    def _issue(self, i: int) -> ValidationIssue:
+        store = self.store
+        row, box = int(self.rows[i]), int(self.boxes[i])
+        split_id = int(store.split_ids[row])
+        issue = ValidationIssue(
+            rule=RULES[self.rules[i]],
+            image_id=store.ids[row],
+            filename=store.filenames[row],
+            split=store.split_names[split_id] if split_id >= 0 else None,
+            image_size=[int(store.widths[row]), int(store.heights[row])]
+        )
+        if box >= 0:
+            issue.box_index = box - int(store.offsets[row])
+            issue.class_name = store.classes[store.class_ids[box]]
+            issue.box = _as_floats(np.array([store.x[box], store.y[box], store.w[box], store.h[box]]))
+        elif self.headers is not None and self.headers[row, 0] >= 0:
+            issue.header_size = self.headers[row].tolist()
+        return issue
+    
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.rules, self.rows, self.boxes)) + (0 if self.headers is None else self.headers.nbytes)
+
+def validate(
+    store: AnnotationStore,
+    undeclared_classes: list[str],
+    check_headers: bool = True,
+    workers: int = DEFAULT_IO_WORKERS,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> IssueIndex:
+    masks = box_issue_masks(store, undeclared_classes)
+    missing = missing_files(store.filepaths)
+    masks["missing_file"] = missing
+    
+    headers = None
+    unreadable = np.zeros(store.num_images, dtype=bool)
+    mismatch = np.zeros(store.num_images, dtype=bool)
+    if check_headers:
+        present = np.flatnonzero(~missing)
+        headers = np.full((store.num_images, 2), -1, dtype=np.int64)
+        headers[present] = header_sizes(store.filepaths, present, workers, progress)
+        read = headers[:, 0] >= 0
+        unreadable[present] = ~read[present]
+        mismatch = read & ((headers[:, 0] != store.widths) | (headers[:, 1] != store.heights))
+    elif progress is not None:
+        progress(store.num_images, store.num_images)
+    masks["unreadable_image"] = unreadable
+    masks["size_mismatch"] = mismatch
+    
+    rules, rows, boxes = [], [], []
+    for code, rule in enumerate(RULES):
+        hits = np.flatnonzero(masks[rule])
+        rules.append(np.full(len(hits), code, dtype=np.int8))
+        if rule in BOX_RULES:
+            rows.append(store.image_index[hits].astype(np.int64))
+            boxes.append(hits)
+        else:
+            rows.append(hits)
+            boxes.append(np.full(len(hits), -1, dtype=np.int64))
+    rules, rows, boxes = np.concatenate(rules), np.concatenate(rows), np.concatenate(boxes).astype(np.int64)
+    
+    box_issues = boxes[boxes >= 0]
+    flagged_images = np.zeros(store.num_images, dtype=bool)
+    flagged_images[rows] = True
+    flagged_boxes = np.zeros(store.num_boxes, dtype=bool)
+    flagged_boxes[box_issues] = True
+    class_counts = np.bincount(store.class_ids[box_issues], minlength=len(store.classes))
+    report = ValidationReport(
+        rules=list(RULES),
+        headers_checked=check_headers,
+        checked_images=store.num_images,
+        checked_boxes=store.num_boxes,
+        total_issues=len(rules),
+        issues_per_rule={rule: int(count) for rule, count in zip(RULES, np.bincount(rules, minlength=len(RULES)))},
+        issues_per_class={name: int(count) for name, count in zip(store.classes, class_counts) if count},
+        images_with_issues=int(np.count_nonzero(flagged_images)),
+        boxes_with_issues=int(np.count_nonzero(flagged_boxes))
+    )
+    return IssueIndex(store, rules, rows, boxes, report, headers)
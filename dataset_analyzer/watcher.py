@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from typing import Optional
+from .registry import DatasetRegistry
+from .models import RefreshResult
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# Polling waits at least this many times as long as the last pass over every dataset took,
+# so snapshotting large datasets uses a bounded share of the machine
+POLL_COST_FACTOR = 10
+
+logger = logging.getLogger(__name__)
+
+class _ChangeHandler(FileSystemEventHandler):
+    def __init__(self, changed: threading.Event, dirty: set[str], root: str):
+        super().__init__()
+        self.changed = changed
+        self.dirty = dirty
+        self.root = root
+    
+    def on_any_event(self, event) -> None:
+        if not event.is_directory:
+            self.dirty.add(self.root)
+            self.changed.set()
+
+class DatasetWatcher:
+    def __init__(self, registry: DatasetRegistry, debounce: float = 1.0, poll_interval: float = 2.0):
+        self.registry = registry
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.last_result: Optional[RefreshResult] = None
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        # Dataset root -> watchdog watch handle; with polling the handle is None
+        self._watches: dict[str, object] = {}
+        self._dirty: set[str] = set()
+        # Seconds the last polling pass spent snapshotting and refreshing
+        self._poll_cost = 0.0
+    
+    @property
+    def uses_notifications(self) -> bool:
+        return Observer is not None
+    
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._unwatch()
+    
+    def _unwatch(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._watches.clear()
+    
+    def _loaded_datasets(self) -> dict:
+        return {str(dataset.parser.dataset_path): dataset for dataset in self.registry.loaded() if dataset.is_loaded}
+    
+    def _sync_watch(self) -> None:
+        roots = self._loaded_datasets().keys()
+        if Observer is not None and self._observer is None and roots:
+            self._observer = Observer()
+            self._observer.start()
+        for root in self._watches.keys() - roots:
+            watch = self._watches.pop(root)
+            if watch is not None:
+                self._observer.unschedule(watch)
+        for root in roots - self._watches.keys():
+            handler = _ChangeHandler(self._changed, self._dirty, root)
+            self._watches[root] = self._observer.schedule(handler, root, recursive=True) if self._observer else None
+    
+    def _wait_for_changes(self) -> bool:
+        if Observer is None:
+            # Polling fallback: every interval is a candidate change, refresh() diffs the file snapshot.
+            # Snapshots stat label and annotation files only, and the interval grows with their cost.
+            return not self._stop.wait(max(self.poll_interval, POLL_COST_FACTOR * self._poll_cost))
+        
+        # The timeout lets us notice a newly loaded dataset path even when nothing changes
+        if not self._changed.wait(self.poll_interval):
+            return False
+        # Debounce: wait until events stop arriving for `debounce` seconds
+        while self._changed.is_set() and not self._stop.is_set():
+            self._changed.clear()
+            self._stop.wait(self.debounce)
+        return not self._stop.is_set()
+    
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._sync_watch()
+            if not self._wait_for_changes():
+                continue
+            datasets = self._loaded_datasets()
+            if Observer is not None:
+                dirty = set(self._dirty)
+                self._dirty.difference_update(dirty)
+                datasets = {root: dataset for root, dataset in datasets.items() if root in dirty}
+            start = time.perf_counter()
+            for root, dataset in datasets.items():
+                self._refresh(root, dataset)
+            if Observer is None:
+                self._poll_cost = time.perf_counter() - start
+    
+    def _refresh(self, root: str, dataset) -> None:
+        try:
+            result = dataset.refresh()
+        except Exception:
+            logger.exception("Failed to refresh dataset %s", root)
+            return
+        if result.added or result.modified or result.removed or result.full_reparse:
+            self.last_result = result
+            logger.info(
+                "Dataset %s updated: %d added, %d modified, %d removed%s",
+                root, result.added, result.modified, result.removed,
+                " (full reparse)" if result.full_reparse else ""
+            )
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import pytest
+from pathlib import Path
+from dataset_analyzer import browse
+from dataset_analyzer.browse import FormatDetector
+from dataset_analyzer.parsers import detect_format
+
+@pytest.fixture
+def folders(tmp_path):
+    (tmp_path / "yolo" / "labels").mkdir(parents=True)
+    (tmp_path / "yolo" / "images").mkdir()
+    (tmp_path / "yolo" / "labels" / "a.txt").write_text("0 0.5 0.5 0.1 0.1\n")
+    (tmp_path / "yolo" / "data.yaml").write_text("names: [cat]\n")
+    (tmp_path / "voc" / "Annotations").mkdir(parents=True)
+    (tmp_path / "voc" / "Annotations" / "a.xml").write_text("<annotation></annotation>")
+    (tmp_path / "coco" / "annotations").mkdir(parents=True)
+    (tmp_path / "coco" / "annotations" / "instances_train.json").write_text(json.dumps({"images": [], "annotations": []}))
+    (tmp_path / "plain").mkdir()
+    return {str(path): os.stat(path).st_mtime_ns for path in tmp_path.iterdir()}
+
+def expected_format(path):
+    parser = detect_format(Path(path))
+    return parser.format.value.upper() if parser else None
+
+def counting_detect(monkeypatch):
+    calls = []
+    
+    def detect(path):
+        calls.append(str(path))
+        return detect_format(path)
+    
+    monkeypatch.setattr(browse, "detect_format", detect)
+    return calls
+
+def test_detect_many_matches_serial_detection(folders):
+    detected, unresolved = FormatDetector(workers=4).detect_many(folders)
+    assert unresolved == []
+    expected = {path: expected_format(path) for path in folders}
+    assert detected == {path: fmt for path, fmt in expected.items() if fmt is not None}
+    assert len(detected) == 3
+
+def test_cache_is_keyed_by_mtime(folders, monkeypatch):
+    calls = counting_detect(monkeypatch)
+    detector = FormatDetector(workers=4)
+    first = detector.detect_many(folders)
+    assert detector.detect_many(folders) == first
+    assert len(calls) == len(folders)
+    
+    # A folder that changed is probed again, the others come from the cache
+    path = next(iter(folders))
+    folders[path] += 1
+    detector.detect_many(folders)
+    assert calls[len(folders):] == [path]
+
+def test_slow_folders_finish_in_the_background(folders, monkeypatch):
+    release = threading.Event()
+    slow = next(path for path in folders if path.endswith("voc"))
+    
+    def detect(path):
+        if str(path) == slow:
+            release.wait(5)
+        return detect_format(path)
+    
+    monkeypatch.setattr(browse, "detect_format", detect)
+    detector = FormatDetector(workers=4)
+    detected, unresolved = detector.detect_many(folders, time_budget=0.2)
+    assert unresolved == [slow]
+    assert slow not in detected
+    
+    release.set()
+    assert detector.detect(slow) == "VOC"
+    detected, unresolved = detector.detect_many(folders, time_budget=0)
+    assert unresolved == [] and detected[slow] == "VOC"
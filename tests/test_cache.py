@@ -0,0 +1,63 @@
+import os
+import pytest
+from PIL import Image
+from dataset_analyzer.cache import ParseCache, _save_strings, _load_strings
+from dataset_analyzer.parsers import get_parser
+
+@pytest.mark.parametrize("values", [[], [""], ["", ""], ["a", "ünï/ cödé.jpg", "", "x\ny"]])
+def test_strings_round_trip(tmp_path, values):
+    path = tmp_path / "ids.npy"
+    _save_strings(path, values)
+    assert _load_strings(path, len(values)) == values
+
+def test_strings_reject_nul(tmp_path):
+    with pytest.raises(ValueError):
+        _save_strings(tmp_path / "ids.npy", ["a\0b"])
+
+def test_strings_count_mismatch(tmp_path):
+    path = tmp_path / "ids.npy"
+    _save_strings(path, ["a", "b"])
+    with pytest.raises(ValueError):
+        _load_strings(path, 3)
+
+@pytest.fixture
+def yolo_dataset(tmp_path):
+    root = tmp_path / "dataset"
+    (root / "images").mkdir(parents=True)
+    (root / "labels").mkdir()
+    (root / "classes.txt").write_text("cat\ndog\n")
+    for i in range(3):
+        Image.new("RGB", (32 + i, 24)).save(root / "images" / f"imagé {i}.jpg")
+        (root / "labels" / f"imagé {i}.txt").write_text(f"{i % 2} 0.5 0.5 0.2 0.{i + 1}\n")
+    return root
+
+def test_parse_cache_round_trip(tmp_path, yolo_dataset):
+    cache = ParseCache(tmp_path / "cache")
+    parsed = get_parser(yolo_dataset)
+    parsed.parse()
+    cache.save(parsed)
+    
+    cached = get_parser(yolo_dataset)
+    assert cache.load(cached)
+    assert [image.model_dump() for image in cached.get_images()] == [image.model_dump() for image in parsed.get_images()]
+    assert cached.store.classes == parsed.store.classes
+    
+    # Any change to a source file invalidates the entry
+    label = yolo_dataset / "labels" / "imagé 0.txt"
+    st = os.stat(label)
+    os.utime(label, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+    assert not cache.load(get_parser(yolo_dataset))
+
+def test_content_hash_fingerprint(tmp_path, yolo_dataset):
+    cache = ParseCache(tmp_path / "cache", content_hash=True)
+    parsed = get_parser(yolo_dataset)
+    parsed.parse()
+    cache.save(parsed)
+    assert cache.load(get_parser(yolo_dataset))
+    
+    # Same size and mtime, different content: only the content hash notices
+    label = yolo_dataset / "labels" / "imagé 1.txt"
+    st = os.stat(label)
+    label.write_text(label.read_text().replace("1 ", "0 ", 1))
+    os.utime(label, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert not cache.load(get_parser(yolo_dataset))
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from dataset_analyzer.cubes import StatsCubes, rebin, GRID_SIZES
+from dataset_analyzer.stats import StatsCalculator
+from dataset_analyzer.store import AnnotationStore
+
+CENTERS = np.arange(10) + 0.5
+FINE = np.array([1, 2, 0, 4, 5, 0, 0, 8, 9, 3])
+
+def test_rebin_folds_fine_counts():
+    hist, used = rebin(FINE, CENTERS, 5, (0.0, 10.0), normalize=False)
+    assert hist == [3, 4, 5, 8, 12]
+    assert used == [0.0, 10.0]
+    
+def test_rebin_open_range_follows_data():
+    hist, used = rebin(FINE, CENTERS, 3, (None, None), normalize=False)
+    assert used == [0.5, 9.5]
+    # The top edge belongs to the last bin
+    assert hist == [3, 9, 20]
+    
+def test_rebin_clips_to_range_and_bounds():
+    hist, used = rebin(FINE, CENTERS, 2, (2.0, None), normalize=False)
+    assert used == [2.0, 9.5]
+    assert sum(hist) == FINE[2:].sum()
+    hist, used = rebin(FINE, CENTERS, 2, (None, None), bounds=(0.0, 5.0), normalize=False)
+    assert used == [0.5, 4.5]
+    assert sum(hist) == FINE[:5].sum()
+
+def test_rebin_log_scale():
+    centers = 2.0 ** np.arange(-2, 8)
+    fine = np.ones(10, dtype=np.int64)
+    # Non-positive lower bounds are replaced by the smallest occupied center on a log axis
+    hist, used = rebin(fine, centers, 5, (0.0, None), log_scale=True, normalize=False)
+    assert used == [0.25, 128.0]
+    assert hist == [2, 2, 2, 2, 2]
+
+def test_rebin_normalizes_to_percent_of_peak():
+    hist, _ = rebin(FINE, CENTERS, 5, (0.0, 10.0))
+    assert hist == [25, 33, 41, 66, 100]
+    assert rebin(np.zeros(10), CENTERS, 4, (None, None))[0] == [0, 0, 0, 0]
+
+def test_rebin_rejects_inverted_range():
+    with pytest.raises(ValueError, match="inverted"):
+        rebin(FINE, CENTERS, 5, (8.0, 2.0))
+
+@pytest.fixture
+def store():
+    rng = np.random.default_rng(0)
+    store = AnnotationStore()
+    store.set_classes(["cat", "dog", "bird"])
+    for i in range(200):
+        row = store.add_image(str(i), f"{i}.jpg", f"/{i}.jpg", int(rng.integers(100, 2000)), int(rng.integers(100, 2000)), ["train", "val"][i % 2])
+        n = int(rng.integers(0, 6))
+        w, h = rng.uniform(0.001, 0.5, n), rng.uniform(0.001, 0.5, n)
+        store.add_boxes(np.full(n, row), rng.uniform(0, 1 - w), rng.uniform(0, 1 - h), w, h, rng.integers(0, 3, n))
+    store.finalize()
+    return store
+
+@pytest.mark.parametrize("grid_size", [2, 5, 10])
+def test_spatial_cubes_match_direct_computation(store, grid_size):
+    assert grid_size in GRID_SIZES
+    direct = StatsCalculator(store).compute_spatial_stats(grid_size)
+    cubes = StatsCubes(store).spatial_stats(grid_size)
+    assert np.allclose(cubes.heatmap, direct.heatmap)
+    assert cubes.per_class_heatmaps.keys() == direct.per_class_heatmaps.keys()
+    assert cubes.edge_proximity == direct.edge_proximity
+
+def test_scoped_box_stats_partition_the_dataset(store):
+    cubes = StatsCubes(store)
+    options = (20, (None, None), 20, (None, None), False, False)
+    total = cubes.box_stats(*options)
+    per_split = [cubes.box_stats(*options, split=split) for split in store.split_names]
+    per_class = [cubes.box_stats(*options, class_name=name) for name in store.classes]
+    for parts in (per_split, per_class):
+        for field in ("small_count", "medium_count", "large_count", "tiny_boxes"):
+            assert sum(getattr(part, field) for part in parts) == getattr(total, field)
+    assert total.small_count + total.medium_count + total.large_count == store.num_boxes
+    
+    with pytest.raises(ValueError, match="Unknown split"):
+        cubes.box_stats(*options, split="test")
+    with pytest.raises(ValueError, match="Grid size"):
+        cubes.spatial_stats(7)
+
+def test_class_boxes_per_image_matches_class_groups(store):
+    cubes = StatsCubes(store)
+    options = (20, (None, None), 20, (None, None))
+    groups = StatsCalculator(store).compute_grouped_stats("class", sample_size=0).groups
+    for name in store.classes:
+        assert cubes.box_stats(*options, class_name=name).boxes_per_image == groups[name].boxes.boxes_per_image
+    # Scoped to a split as well: only that split's images with the class
+    rows = np.flatnonzero(store.split_ids == store.split_names.index("val"))
+    per_image = np.array([int((store.class_ids[store.offsets[r]:store.offsets[r + 1]] == 0).sum()) for r in rows])
+    per_image = per_image[per_image > 0]
+    stats = cubes.box_stats(*options, split="val", class_name="cat").boxes_per_image
+    assert (stats["min"], stats["max"], stats["median"]) == (per_image.min(), per_image.max(), int(np.median(per_image)))
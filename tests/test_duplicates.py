@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from dataset_analyzer.duplicates import connected_components, hamming_pairs, popcount, MAX_HAMMING_THRESHOLD
+
+def brute_force_pairs(codes, threshold):
+    distances = popcount((codes[:, None] ^ codes[None, :]).ravel()).reshape(len(codes), len(codes))
+    first, second = np.nonzero(np.triu(distances <= threshold, k=1))
+    return sorted(zip(first.tolist(), second.tolist()))
+
+def near_duplicate_codes(seed, n=400):
+    # Clusters of codes a few bit flips apart plus unrelated codes, made unique like find_duplicates does
+    rng = np.random.default_rng(seed)
+    centers = rng.integers(0, 2 ** 63, size=n // 8, dtype=np.uint64)
+    codes = [rng.integers(0, 2 ** 63, size=n // 2, dtype=np.uint64)]
+    for center in centers:
+        flips = rng.integers(0, 64, size=(4, rng.integers(1, 7)))
+        codes.append(np.array([center] + [center ^ np.uint64(sum(1 << int(b) for b in set(row))) for row in flips], dtype=np.uint64))
+    return np.unique(np.concatenate(codes))
+
+@pytest.mark.parametrize("threshold", range(1, MAX_HAMMING_THRESHOLD + 1))
+def test_hamming_pairs_matches_brute_force(threshold):
+    codes = near_duplicate_codes(threshold)
+    pairs = hamming_pairs(codes, threshold)
+    assert [tuple(pair) for pair in pairs.tolist()] == brute_force_pairs(codes, threshold)
+
+def test_hamming_pairs_edge_cases():
+    assert hamming_pairs(np.array([1, 3], dtype=np.uint64), 0).shape == (0, 2)
+    assert hamming_pairs(np.array([7], dtype=np.uint64), 4).shape == (0, 2)
+    codes = np.array([0, 2 ** 64 - 1, 1 << 63], dtype=np.uint64)
+    assert hamming_pairs(codes, 1).tolist() == [[0, 2]]
+
+def test_connected_components():
+    pairs = np.array([[0, 3], [3, 5], [1, 2], [6, 5]])
+    assert connected_components(8, pairs).tolist() == [0, 1, 1, 0, 4, 0, 0, 7]
+    assert connected_components(3, np.empty((0, 2), dtype=np.int64)).tolist() == [0, 1, 2]
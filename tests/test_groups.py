@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from dataset_analyzer.stats import StatsCalculator
+from dataset_analyzer.store import AnnotationStore
+
+@pytest.fixture(scope="module")
+def store():
+    rng = np.random.default_rng(23)
+    store = AnnotationStore()
+    store.set_classes(["cat", "dog", "bird"])
+    for i in range(150):
+        split = ["train", "train", "val", None][i % 4]
+        row = store.add_image(str(i), f"{i}.jpg", f"/{i}.jpg", int(rng.integers(200, 1200)), int(rng.integers(200, 1200)), split)
+        n = int(rng.integers(0, 6))
+        w, h = rng.uniform(0.01, 0.6, n), rng.uniform(0.01, 0.6, n)
+        store.add_boxes(np.full(n, row), rng.uniform(0, 1 - w), rng.uniform(0, 1 - h), w, h, rng.integers(0, 3, n))
+    store.finalize()
+    return store
+
+def substore(store, rows, class_id=None):
+    # The images in rows as a dataset of their own, keeping only boxes of class_id when given
+    sub = store.derive()
+    for row in rows:
+        split_id = int(store.split_ids[row])
+        new_row = sub.add_image(store.ids[row], store.filenames[row], store.filepaths[row], int(store.widths[row]), int(store.heights[row]), store.split_names[split_id] if split_id >= 0 else None)
+        for box in range(store.offsets[row], store.offsets[row + 1]):
+            if class_id is None or store.class_ids[box] == class_id:
+                sub.add_box(new_row, float(store.x[box]), float(store.y[box]), float(store.w[box]), float(store.h[box]), int(store.class_ids[box]))
+    sub.finalize()
+    return sub
+
+def assert_group_matches(group, sub):
+    calculator = StatsCalculator(sub)
+    assert group.dataset == calculator.compute_dataset_stats()
+    assert list(group.dataset.class_distribution.items()) == list(calculator.compute_dataset_stats().class_distribution.items())
+    assert group.boxes == calculator.compute_box_stats()
+    spatial = calculator.compute_spatial_stats()
+    assert np.allclose(group.spatial.heatmap, spatial.heatmap)
+    assert group.spatial.edge_proximity == spatial.edge_proximity
+    assert group.spatial.per_class_heatmaps.keys() == spatial.per_class_heatmaps.keys()
+    for name, heatmap in spatial.per_class_heatmaps.items():
+        assert np.allclose(group.spatial.per_class_heatmaps[name], heatmap)
+
+def test_split_groups_match_each_split_alone(store):
+    grouped = StatsCalculator(store).compute_grouped_stats("split", sample_size=0)
+    assert grouped.by == "split"
+    assert list(grouped.groups) == ["unassigned", "train", "val"]
+    for name, group in grouped.groups.items():
+        split_id = -1 if name == "unassigned" else store.split_names.index(name)
+        assert_group_matches(group, substore(store, np.flatnonzero(store.split_ids == split_id).tolist()))
+
+def test_class_groups_match_each_class_alone(store):
+    grouped = StatsCalculator(store).compute_grouped_stats("class", sample_size=0)
+    assert list(grouped.groups) == store.classes
+    for class_id, name in enumerate(store.classes):
+        rows = sorted(set(store.image_index[store.class_ids == class_id].tolist()))
+        assert_group_matches(grouped.groups[name], substore(store, rows, class_id))
+    with pytest.raises(ValueError, match="Unknown grouping"):
+        StatsCalculator(store).compute_grouped_stats("camera", sample_size=0)
+
+def drift_store(split_classes):
+    store = AnnotationStore()
+    store.set_classes(["cat", "dog", "bird"])
+    for split, class_ids in split_classes.items():
+        for i, class_id in enumerate(class_ids):
+            row = store.add_image(f"{split}{i}", "", "", 100, 100, split)
+            store.add_box(row, 0.1, 0.1, 0.2 if class_id != 2 else 0.8, 0.2 if class_id != 2 else 0.8, store.class_id(["cat", "dog", "bird"][class_id]))
+    store.finalize()
+    return store
+
+def test_drift_stats():
+    store = drift_store({
+        "train": [0] * 10 + [1] * 10 + [2] * 4,
+        "val": [0] * 5 + [1] * 5 + [2] * 2,
+        "test": [0] * 6,
+    })
+    drift = StatsCalculator(store).compute_drift_stats()
+    assert drift.reference == "train"
+    assert drift.splits == ["train", "val", "test"]
+    by_split = {entry.split: entry for entry in drift.drift}
+    assert [by_split[name].boxes for name in drift.splits] == [24, 12, 6]
+    # val has the same class and size mix as train; only the additive smoothing separates them
+    assert by_split["val"].class_js < 1e-3 and by_split["val"].size_js < 1e-3
+    assert by_split["train"].class_kl == 0
+    assert by_split["test"].class_js > 0.1 and by_split["test"].size_js > 0.01
+    assert by_split["test"].missing_classes == ["dog", "bird"]
+    assert by_split["val"].missing_classes == []
+    
+    for matrix in (drift.class_js_matrix, drift.size_js_matrix):
+        matrix = np.array(matrix)
+        assert np.allclose(matrix, matrix.T)
+        assert np.allclose(np.diag(matrix), 0)
+        assert ((matrix >= 0) & (matrix <= np.log(2) + 1e-9)).all()
+    
+    empty = StatsCalculator(drift_store({})).compute_drift_stats()
+    assert (empty.reference, empty.splits, empty.drift) == ("", [], [])
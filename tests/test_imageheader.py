@@ -0,0 +1,33 @@
+import pytest
+from PIL import Image
+from dataset_analyzer.imageheader import read_image_size, probe_image_sizes
+
+SIZES = [(1, 1), (64, 48), (33, 517), (1023, 7)]
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i, (width, height) in enumerate(SIZES):
+        image = Image.new("RGB", (width, height), (i * 40, 80, 120))
+        image.save(tmp_path / f"{i}.png")
+        image.save(tmp_path / f"{i}.jpg", quality=90)
+        # Progressive JPEGs carry their size in SOF2 after extra segments
+        image.save(tmp_path / f"{i}_progressive.jpg", progressive=True, optimize=True, exif=Image.Exif().tobytes())
+        # Neither PNG nor JPEG, so the size comes from PIL
+        image.save(tmp_path / f"{i}.bmp")
+        paths += [tmp_path / f"{i}{suffix}" for suffix in (".png", ".jpg", "_progressive.jpg", ".bmp")]
+    return paths
+
+def pil_size(path):
+    with Image.open(path) as img:
+        return img.size
+
+def test_header_sizes_match_pil(images):
+    for path in images:
+        assert read_image_size(path) == pil_size(path), path.name
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_probe_keeps_input_order(images, tmp_path, workers):
+    (tmp_path / "broken.jpg").write_bytes(b"\xff\xd8\xff\xe0\x00\x10JFIF")
+    paths = images + [tmp_path / "broken.jpg", tmp_path / "missing.png"]
+    assert probe_image_sizes(paths, workers) == [pil_size(path) for path in images] + [None, None]
@@ -0,0 +1,58 @@
+import itertools
+import numpy as np
+import pytest
+from dataset_analyzer.index import FilterIndex
+from dataset_analyzer.store import AnnotationStore
+
+@pytest.fixture(scope="module")
+def store():
+    rng = np.random.default_rng(3)
+    store = AnnotationStore()
+    store.set_classes(["cat", "dog", "bird", "unused"])
+    for i in range(300):
+        split = [None, "train", "val"][int(rng.integers(0, 3))]
+        row = store.add_image(str(i), f"{i}.jpg", f"/{i}.jpg", 64, 48, split)
+        n = int(rng.integers(0, 5))
+        store.add_boxes(np.full(n, row), np.full(n, 0.1), np.full(n, 0.1), np.full(n, 0.2), np.full(n, 0.2), rng.integers(0, 3, n))
+    store.finalize()
+    return store
+
+def linear_filter(images, class_filter, split_filter, min_boxes, max_boxes):
+    # The per-image scan /api/images used before the index
+    if class_filter:
+        images = [img for img in images if any(ann.class_name == class_filter for ann in img.annotations)]
+    if split_filter:
+        images = [img for img in images if img.split == split_filter]
+    if min_boxes is not None:
+        images = [img for img in images if len(img.annotations) >= min_boxes]
+    if max_boxes is not None:
+        images = [img for img in images if len(img.annotations) <= max_boxes]
+    return images
+
+def test_matches_linear_filter(store):
+    index = FilterIndex(store)
+    images = [store.image_info(row) for row in range(store.num_images)]
+    for options in itertools.product([None, "cat", "bird", "unused", "missing"], [None, "train", "val", "test"], [None, 0, 2], [None, 1, 3]):
+        expected = linear_filter(images, *options)
+        for page, limit in ((1, 50), (2, 7), (100, 50)):
+            page_rows, total = index.page(index.query(*options), page, limit)
+            assert total == len(expected)
+            start = (page - 1) * limit
+            assert [store.ids[row] for row in page_rows.tolist()] == [img.id for img in expected[start:start + limit]]
+
+def test_unfiltered_query_is_every_row(store):
+    index = FilterIndex(store)
+    assert index.query() is None
+    rows, total = index.page(None, 3, 100)
+    assert total == store.num_images
+    assert rows.tolist() == list(range(200, 300))
+
+def test_query_combines_with_filters(store):
+    index = FilterIndex(store)
+    rows = index.query(class_filter="cat", split_filter="val", query="class:dog")
+    expected = [
+        row for row in range(store.num_images)
+        if store.split_ids[row] == store.split_names.index("val")
+        and {"cat", "dog"} <= {store.classes[c] for c in store.class_ids[store.offsets[row]:store.offsets[row + 1]].tolist()}
+    ]
+    assert rows.tolist() == expected
@@ -0,0 +1,150 @@
+import threading
+import pytest
+from PIL import Image
+from dataset_analyzer.core import Dataset
+from dataset_analyzer.jobs import LoadJobManager, StatsJobManager
+from dataset_analyzer.models import DatasetFormat, DatasetInfo, DatasetStats
+from dataset_analyzer.parsers import LoadCancelled
+
+TIMEOUT = 30
+
+def overview(total_images: int) -> DatasetStats:
+    return DatasetStats(
+        total_images=total_images, total_annotations=0, total_classes=0,
+        avg_boxes_per_image=0, empty_images=total_images, class_distribution={}
+    )
+
+class BlockingDataset:
+    # Stands in for Dataset: get_dataset_stats blocks until released and counts its calls
+    def __init__(self):
+        self.generation = 1
+        self.release = threading.Event()
+        self.calls = 0
+        self.fail = False
+    
+    def get_dataset_stats(self) -> DatasetStats:
+        self.calls += 1
+        assert self.release.wait(TIMEOUT)
+        if self.fail:
+            raise ValueError("boom")
+        return overview(self.generation)
+
+class BlockingRegistry:
+    # Stands in for DatasetRegistry: load waits for a release, then checks for cancellation like a parser would
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.loads = []
+        self.default = None
+    
+    def load(self, path, progress, make_default=True):
+        self.loads.append(path)
+        self.started.set()
+        assert self.release.wait(TIMEOUT)
+        progress.check()
+        return DatasetInfo(
+            id=path, name="dataset", path=path, format=DatasetFormat.YOLO,
+            total_images=0, total_annotations=0, classes=[], splits=[]
+        )
+    
+    def make_default(self, dataset_id):
+        self.default = dataset_id
+
+def test_stats_jobs_are_shared_per_generation():
+    dataset = BlockingDataset()
+    jobs = StatsJobManager(dataset)
+    first = jobs.submit("overview")
+    assert jobs.submit("overview") is first
+    assert first.status().state in ("pending", "running")
+    dataset.release.set()
+    assert first.future.result(TIMEOUT).total_images == 1
+    status = first.status()
+    assert (status.state, status.done, status.total, status.partial) == ("done", 1, 1, False)
+    assert status.result["total_images"] == 1
+    # A finished job still answers for its generation; a new generation gets a new job
+    assert jobs.submit("overview") is first
+    dataset.generation = 2
+    second = jobs.submit("overview")
+    assert second is not first
+    assert second.future.result(TIMEOUT).total_images == 2
+    assert dataset.calls == 2
+    jobs.close()
+
+def test_failed_stats_job_is_retried():
+    dataset = BlockingDataset()
+    dataset.fail = True
+    dataset.release.set()
+    jobs = StatsJobManager(dataset)
+    failed = jobs.submit("overview")
+    with pytest.raises(ValueError):
+        failed.future.result(TIMEOUT)
+    assert (failed.status().state, failed.status().error) == ("failed", "boom")
+    dataset.fail = False
+    retry = jobs.submit("overview")
+    assert retry is not failed
+    assert retry.future.result(TIMEOUT).total_images == 1
+    jobs.close()
+
+def test_closed_stats_jobs_reject_submissions():
+    jobs = StatsJobManager(BlockingDataset())
+    jobs.close()
+    with pytest.raises(ValueError, match="unloaded"):
+        jobs.submit("overview")
+    with pytest.raises(ValueError, match="Unknown stats kind"):
+        StatsJobManager(BlockingDataset()).submit("colours")
+
+def test_load_jobs_are_shared_per_path(tmp_path):
+    registry = BlockingRegistry()
+    jobs = LoadJobManager(registry)
+    first = jobs.submit(str(tmp_path), make_default=False)
+    # Same directory spelled differently
+    joined = jobs.submit(str(tmp_path / "."), make_default=True)
+    assert joined is first
+    other = jobs.submit(str(tmp_path.parent))
+    assert other is not first
+    registry.release.set()
+    assert first.future.result(TIMEOUT).id == str(tmp_path)
+    other.future.result(TIMEOUT)
+    assert sorted(registry.loads) == sorted([str(tmp_path), str(tmp_path.parent)])
+    # The joining request asked for the default, so the shared job sets it
+    assert first.make_default
+    assert first.status().state == "done"
+    # A finished job is not joined: loading again reloads
+    assert jobs.submit(str(tmp_path)) is not first
+    jobs.close()
+
+def test_load_job_cancellation(tmp_path):
+    registry = BlockingRegistry()
+    jobs = LoadJobManager(registry)
+    job = jobs.submit(str(tmp_path))
+    assert registry.started.wait(TIMEOUT)
+    job.cancel()
+    # A cancelled job is not joined by the next request for the same path
+    retry = jobs.submit(str(tmp_path))
+    assert retry is not job
+    registry.release.set()
+    with pytest.raises(LoadCancelled):
+        job.future.result(TIMEOUT)
+    assert job.status().state == "cancelled"
+    assert job.status().error is None
+    assert retry.future.result(TIMEOUT).id == str(tmp_path)
+    assert registry.default == str(tmp_path)
+    jobs.close()
+
+def test_stats_job_progress_on_a_real_dataset(tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "labels").mkdir()
+    (tmp_path / "classes.txt").write_text("cat\n")
+    for i in range(4):
+        Image.new("RGB", (32, 24), (i * 60, 0, 0)).save(tmp_path / "images" / f"{i}.jpg")
+        (tmp_path / "labels" / f"{i}.txt").write_text("0 0.5 0.5 0.2 0.2\n")
+    dataset = Dataset()
+    dataset.pixel_workers = 1
+    dataset.load(str(tmp_path))
+    job = dataset.stats_jobs.submit("images")
+    result = job.future.result(TIMEOUT)
+    status = job.status()
+    assert status.state == "done" and status.done == status.total > 0
+    assert result == dataset.get_image_stats()
+    assert dataset.stats_jobs.submit("images") is job
+    dataset.stats_jobs.close()
@@ -0,0 +1,36 @@
+import json
+import pytest
+from dataset_analyzer.parsers import jsonstream
+from dataset_analyzer.parsers.jsonstream import iter_array_items
+
+DOCUMENT = {
+    "info": {"description": 'quotes " and \\ backslashes ]}', "nested": [[{"a": "}"}], []], "year": 2024},
+    "licenses": [{"id": 1, "name": "CC ["}],
+    "images": [{"id": 1, "file_name": "a.jpg"}, {"id": 2, "file_name": "b ünï.jpg"}],
+    "skipped_scalar": 12345678901234567890,
+    "empty": [],
+    "annotations": [{"id": 7, "bbox": [1.5, 2, 3e2, 4]}],
+    "tail": "\\\\",
+}
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_matches_json_load(tmp_path, monkeypatch, chunk_size):
+    path = tmp_path / "instances.json"
+    path.write_text(json.dumps(DOCUMENT, ensure_ascii=False, indent=1), encoding="utf-8")
+    monkeypatch.setattr(jsonstream._Reader.__init__, "__defaults__", (chunk_size, None))
+    items = list(iter_array_items(path, ["images", "annotations", "empty"]))
+    assert items == [("images", image) for image in DOCUMENT["images"]] + [("annotations", DOCUMENT["annotations"][0])]
+
+def test_reports_bytes_read(tmp_path):
+    path = tmp_path / "instances.json"
+    path.write_text(json.dumps(DOCUMENT))
+    read = []
+    list(iter_array_items(path, ["images"], on_read=read.append))
+    assert sum(read) == path.stat().st_size
+
+@pytest.mark.parametrize("text", ['{"info": {"a": [1, 2}', '{"info": "unterminated', '{"images": [1 2]}'])
+def test_malformed_input(tmp_path, text):
+    path = tmp_path / "instances.json"
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        list(iter_array_items(path, ["images"]))
@@ -0,0 +1,109 @@
+import numpy as np
+from itertools import combinations
+from dataset_analyzer.overlap import iter_box_overlaps
+from dataset_analyzer.store import AnnotationStore
+
+def random_store(seed, num_images=30, max_boxes=25):
+    rng = np.random.default_rng(seed)
+    store = AnnotationStore()
+    class_id = store.class_id("object")
+    for i in range(num_images):
+        row = store.add_image(str(i), f"{i}.jpg", f"/{i}.jpg", 640, 480)
+        n = int(rng.integers(0, max_boxes))
+        # Coarse coordinates so exact duplicates and edge-touching boxes occur
+        x, y = rng.integers(0, 10, n) / 10, rng.integers(0, 10, n) / 10
+        w, h = rng.integers(1, 6, n) / 10, rng.integers(1, 6, n) / 10
+        store.add_boxes(np.full(n, row), x, y, w, h, np.full(n, class_id))
+    store.finalize()
+    return store
+
+def brute_force(store):
+    x0, y0 = store.x.astype(np.float64), store.y.astype(np.float64)
+    x1, y1 = x0 + store.w, y0 + store.h
+    expected = {}
+    for row in range(store.num_images):
+        for a, b in combinations(range(store.offsets[row], store.offsets[row + 1]), 2):
+            inter_w = min(x1[a], x1[b]) - max(x0[a], x0[b])
+            inter_h = min(y1[a], y1[b]) - max(y0[a], y0[b])
+            if inter_w > 0 and inter_h > 0:
+                inter = inter_w * inter_h
+                union = (x1[a] - x0[a]) * (y1[a] - y0[a]) + (x1[b] - x0[b]) * (y1[b] - y0[b]) - inter
+                expected[(a, b)] = inter / union
+    return expected
+
+def test_matches_brute_force_iou():
+    for seed in range(5):
+        store = random_store(seed)
+        found = {}
+        for first, second, iou in iter_box_overlaps(store):
+            for a, b, value in zip(first.tolist(), second.tolist(), iou.tolist()):
+                key = (min(a, b), max(a, b))
+                assert key not in found
+                found[key] = value
+        expected = brute_force(store)
+        assert found.keys() == expected.keys()
+        assert np.allclose([found[key] for key in expected], list(expected.values()))
+        assert expected
+
+def found_pairs(store):
+    found = {}
+    for first, second, iou in iter_box_overlaps(store):
+        for a, b, value in zip(first.tolist(), second.tolist(), iou.tolist()):
+            key = (min(a, b), max(a, b))
+            assert key not in found
+            found[key] = value
+    return found
+
+def test_banded_layouts_match_brute_force():
+    # Stacked full-width lines, tall boxes spanning many bands, and boxes past the image edges
+    rng = np.random.default_rng(7)
+    store = AnnotationStore()
+    class_id = store.class_id("object")
+    for i in range(12):
+        row = store.add_image(str(i), f"{i}.jpg", f"/{i}.jpg", 640, 480)
+        n = 40
+        y = np.sort(rng.uniform(-0.1, 1.0, n))
+        h = np.where(rng.random(n) < 0.2, rng.uniform(0.3, 1.2, n), rng.uniform(0.005, 0.04, n))
+        x = rng.uniform(-0.05, 0.2, n)
+        store.add_boxes(np.full(n, row), x, y, rng.uniform(0.1, 0.9, n), h, np.full(n, class_id))
+    store.finalize()
+    found = found_pairs(store)
+    expected = brute_force(store)
+    assert found.keys() == expected.keys()
+    assert np.allclose([found[key] for key in expected], list(expected.values()))
+
+def test_degenerate_boxes_never_overlap():
+    store = AnnotationStore()
+    class_id = store.class_id("object")
+    row = store.add_image("a", "a.jpg", "/a.jpg", 100, 100)
+    x = np.array([0.1, 0.1, 0.1, 0.1])
+    y = np.array([0.1, 0.1, np.nan, 0.1])
+    h = np.array([0.5, -0.2, 0.5, 0.0])
+    store.add_boxes(np.full(4, row), x, y, np.full(4, 0.5), h, np.full(4, class_id))
+    store.finalize()
+    assert found_pairs(store) == {}
+
+def test_identical_and_touching_boxes():
+    store = AnnotationStore()
+    class_id = store.class_id("object")
+    row = store.add_image("a", "a.jpg", "/a.jpg", 100, 100)
+    # Boxes 0 and 1 are identical, box 2 touches them on the right edge only
+    store.add_boxes(np.full(3, row), np.array([0.25, 0.25, 0.75]), np.full(3, 0.25), np.full(3, 0.5), np.full(3, 0.5), np.full(3, class_id))
+    store.finalize()
+    pairs = [(a, b, iou) for first, second, ious in iter_box_overlaps(store) for a, b, iou in zip(first.tolist(), second.tolist(), ious.tolist())]
+    assert [(min(a, b), max(a, b)) for a, b, _ in pairs] == [(0, 1)]
+    assert pairs[0][2] == 1.0
+
+def test_pairs_never_cross_images():
+    store = AnnotationStore()
+    class_id = store.class_id("object")
+    for i in range(3):
+        row = store.add_image(str(i), f"{i}.jpg", f"/{i}.jpg", 100, 100)
+        store.add_box(row, 0.1, 0.1, 0.5, 0.5, class_id)
+    store.finalize()
+    assert sum(len(first) for first, _, _ in iter_box_overlaps(store)) == 0
+
+def test_empty_store():
+    store = AnnotationStore()
+    store.finalize()
+    assert list(iter_box_overlaps(store)) == []
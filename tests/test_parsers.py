@@ -0,0 +1,210 @@
+import json
+import numpy as np
+import pytest
+from dataset_analyzer.parsers import get_parser
+from dataset_analyzer.parsers.base import DirectoryListing
+
+def images_by_id(parser):
+    return {image.id: image.model_dump() for image in parser.get_images()}
+
+@pytest.fixture
+def coco_dataset(tmp_path):
+    (tmp_path / "annotations").mkdir()
+    (tmp_path / "images").mkdir()
+    document = {
+        "images": [{"id": i, "file_name": f"{i}.jpg", "width": 100, "height": 50} for i in range(3)],
+        "categories": [{"id": 1, "name": "cat"}, {"id": 2, "name": "dog"}],
+        "annotations": [
+            {"id": 1, "image_id": 0, "category_id": 1, "bbox": [10, 5, 20, 10]},
+            {"id": 2, "image_id": 0, "category_id": 2, "bbox": [1, 2]},
+            {"id": 3, "image_id": 1, "category_id": 2, "bbox": [0, 0, 50, 25], "score": 0.5},
+            {"id": 4, "image_id": 1, "category_id": 1, "bbox": [0, "0", 5, 5]},
+            {"id": 5, "image_id": 2, "category_id": 1, "bbox": None},
+            {"id": 6, "image_id": 2, "category_id": 1, "bbox": [50, 25, 50, 25, 99]},
+        ],
+    }
+    (tmp_path / "annotations" / "instances_train.json").write_text(json.dumps(document))
+    return tmp_path
+
+def test_coco_skips_malformed_boxes(coco_dataset):
+    parser = get_parser(coco_dataset)
+    parser.parse()
+    boxes = {
+        image_id: [(a["x"], a["y"], a["width"], a["height"], a["class_name"], a["confidence"]) for a in image["annotations"]]
+        for image_id, image in images_by_id(parser).items()
+    }
+    assert boxes == {
+        "0": [(0.1, 0.1, 0.2, 0.2, "cat", None)],
+        "1": [(0.0, 0.0, 0.5, 0.5, "dog", 0.5)],
+        "2": [(0.5, 0.5, 0.5, 0.5, "cat", None)],
+    }
+
+def write_voc(path, filename, boxes, width=64, height=48, extra=""):
+    objects = "".join(
+        f"<object><name>{name}</name><bndbox><xmin>{x0}</xmin><ymin>{y0}</ymin><xmax>{x1}</xmax><ymax>{y1}</ymax></bndbox></object>"
+        for name, x0, y0, x1, y1 in boxes
+    )
+    path.write_text(f"<annotation><filename>{filename}</filename><size><width>{width}</width><height>{height}</height></size>{objects}{extra}</annotation>")
+
+@pytest.fixture
+def voc_dataset(tmp_path):
+    annotations = tmp_path / "Annotations"
+    annotations.mkdir()
+    (tmp_path / "JPEGImages").mkdir()
+    rng = np.random.default_rng(5)
+    for i in range(23):
+        boxes = [(["cat", "dog", "bird"][int(c)], 1, 2, 30 + int(c), 40) for c in rng.integers(0, 3, int(rng.integers(0, 4)))]
+        write_voc(annotations / f"{i:03d}.xml", f"{i:03d}.jpg", boxes, extra="<object><name>nobox</name></object>" if i == 7 else "")
+    (annotations / "broken.xml").write_text("<annotation><size>")
+    (annotations / "nosize.xml").write_text("<annotation><filename>x.jpg</filename></annotation>")
+    write_voc(annotations / "zero.xml", "zero.jpg", [("cat", 1, 1, 2, 2)], width=0)
+    return tmp_path
+
+def parse_voc(path, monkeypatch, backend, workers):
+    from dataset_analyzer.parsers import voc
+    monkeypatch.setattr(voc, "XML_BACKEND", backend)
+    # Several shards, so the process pool actually splits the work
+    monkeypatch.setattr(voc, "SHARD_SIZE", 5)
+    parser = get_parser(path)
+    parser.parse_workers = workers
+    parser.parse()
+    return parser
+
+def test_voc_backends_and_shards_agree(voc_dataset, monkeypatch):
+    pytest.importorskip("lxml")
+    serial = parse_voc(voc_dataset, monkeypatch, "etree", 1)
+    assert serial.store.num_images == 23
+    expected = images_by_id(serial)
+    for backend, workers in (("lxml", 1), ("etree", 2), ("lxml", 2)):
+        parser = parse_voc(voc_dataset, monkeypatch, backend, workers)
+        assert images_by_id(parser) == expected
+        assert parser.store.classes == serial.store.classes
+        assert parser.store.ids == serial.store.ids
+
+def per_line_labels(content: bytes):
+    # The line-by-line parse the bulk reader replaced, with malformed lines skipped instead of raising
+    rows = []
+    for line in content.splitlines():
+        parts = line.split()
+        if len(parts) < 5:
+            continue
+        try:
+            values = [float(part) for part in parts[:5]]
+        except ValueError:
+            continue
+        if any(np.isnan(values)) or not np.isfinite(values[0]) or values[0] < 0 or values[0] != int(values[0]):
+            continue
+        try:
+            confidence = float(parts[5]) if len(parts) > 5 else np.nan
+        except ValueError:
+            confidence = np.nan
+        rows.append((int(values[0]), *values[1:], confidence))
+    return rows
+
+LABEL_LINES = [
+    b"0 0.5 0.5 0.2 0.2", b"1\t0.1 0.2\t0.3 0.4", b"  2 0.5 0.5 0.1 0.1   ", b"", b"   ",
+    b"3 0.5 0.5 0.2 0.2 0.87", b"4 0.5 0.5 0.2 0.2 0.5 extra tokens", b"5 0.5 0.5 0.2", b"x 0.5 0.5 0.2 0.2",
+    b"1.0 0.5 0.5 0.2 0.2", b"1.5 0.5 0.5 0.2 0.2", b"-1 0.5 0.5 0.2 0.2", b"6 nan 0.5 0.2 0.2", b"inf 0.5 0.5 0.2 0.2",
+    b"7 1e-1 5E-1 .2 2.", b"8 0.5 0.5 0.2 0.2 high", b"9 0,5 0.5 0.2 0.2", b"10 0.5 0.5 0.2 0.2\x0b",
+]
+
+def test_bulk_label_reader_matches_per_line_parse(tmp_path):
+    from dataset_analyzer.parsers.yolo import read_label_files
+    rng = np.random.default_rng(11)
+    paths, contents = [], []
+    for i in range(60):
+        lines = [LABEL_LINES[j] for j in rng.integers(0, len(LABEL_LINES), int(rng.integers(0, 8)))]
+        newline = [b"\n", b"\r\n", b"\r"][i % 3]
+        content = newline.join(lines) + (newline if i % 2 else b"")
+        path = tmp_path / f"{i}.txt"
+        path.write_bytes(content)
+        paths.append(path)
+        contents.append(content)
+    paths.append(tmp_path / "missing.txt")
+    contents.append(b"")
+    
+    expected = [per_line_labels(content) for content in contents]
+    for workers in (1, 4):
+        batch = read_label_files(paths, workers)
+        assert batch.counts.tolist() == [len(rows) for rows in expected]
+        flat = [row for rows in expected for row in rows]
+        assert batch.class_ids.tolist() == [row[0] for row in flat]
+        assert np.array_equal(batch.boxes, np.array([row[1:5] for row in flat]).reshape(-1, 4))
+        assert np.array_equal(batch.confidence, np.array([row[5] for row in flat]), equal_nan=True)
+
+def test_yolo_parse_matches_per_line_parse(tmp_path):
+    from PIL import Image
+    rng = np.random.default_rng(13)
+    (tmp_path / "classes.txt").write_text("cat\ndog\n")
+    expected = {}
+    for split in ("train", "val"):
+        (tmp_path / "images" / split).mkdir(parents=True)
+        (tmp_path / "labels" / split).mkdir(parents=True)
+        for i in range(15):
+            name = f"{split}{i}"
+            size = (int(rng.integers(16, 64)), int(rng.integers(16, 64)))
+            Image.new("RGB", size).save(tmp_path / "images" / split / f"{name}.jpg")
+            annotations = []
+            if i % 5:
+                lines = [LABEL_LINES[j] for j in rng.integers(0, len(LABEL_LINES), 6)]
+                content = b"\n".join(lines)
+                (tmp_path / "labels" / split / f"{name}.txt").write_bytes(content)
+                for class_id, cx, cy, w, h, confidence in per_line_labels(content):
+                    class_name = ["cat", "dog"][class_id] if class_id < 2 else f"class_{class_id}"
+                    annotations.append((class_name, cx - w / 2, cy - h / 2, w, h, None if np.isnan(confidence) else confidence))
+            expected[name] = (split, size, annotations)
+    
+    parser = get_parser(tmp_path)
+    parser.parse()
+    images = {image.id: image for image in parser.get_images()}
+    assert images.keys() == expected.keys()
+    for image_id, (split, size, annotations) in expected.items():
+        image = images[image_id]
+        assert (image.split, (image.width, image.height)) == (split, size)
+        found = [(a.class_name, a.x, a.y, a.width, a.height, a.confidence) for a in image.annotations]
+        assert [row[0] for row in found] == [row[0] for row in annotations]
+        assert np.allclose([row[1:5] for row in found], [row[1:5] for row in annotations], atol=1e-6) or not annotations
+        assert [row[5] for row in found] == pytest.approx([row[5] for row in annotations], abs=1e-6)
+
+def test_directory_listing_matches_filesystem(tmp_path):
+    for name in ["b.jpg", "a.jpg", ".hidden.jpg", "c.txt", "sub1/x.jpg", "sub2/x.jpg", "sub2/y.jpg", "sub2/deeper/z.jpg"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "dir.jpg").mkdir()
+    listing = DirectoryListing()
+    
+    for name in ["a.jpg", "c.txt", "sub1", "dir.jpg", "missing.jpg", "sub2/y.jpg", "sub1/y.jpg", "nope/a.jpg"]:
+        assert listing.exists(tmp_path / name) == (tmp_path / name).exists(), name
+    assert listing.files(tmp_path, ".jpg") == [tmp_path / "a.jpg", tmp_path / "b.jpg"]
+    assert sorted(listing.subdirs(tmp_path)) == sorted(path for path in tmp_path.iterdir() if path.is_dir())
+    assert listing.files(tmp_path / "missing", ".jpg") == []
+    
+    assert listing.find_in_subdirs(tmp_path, "y.jpg") == tmp_path / "sub2" / "y.jpg"
+    assert listing.find_in_subdirs(tmp_path, "x.jpg") in (tmp_path / "sub1" / "x.jpg", tmp_path / "sub2" / "x.jpg")
+    assert listing.find_in_subdirs(tmp_path, "deeper/z.jpg") == tmp_path / "sub2" / "deeper" / "z.jpg"
+    # Only immediate subdirectories are searched
+    assert listing.find_in_subdirs(tmp_path, "z.jpg") is None
+
+def test_coco_image_path_resolution(tmp_path):
+    (tmp_path / "annotations").mkdir()
+    for name in ["images/direct.jpg", "images/train/split.jpg", "images/other/nested.jpg"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(b"")
+    names = ["direct.jpg", "split.jpg", "nested.jpg", "lost.jpg"]
+    document = {
+        "images": [{"id": i, "file_name": name, "width": 10, "height": 10} for i, name in enumerate(names)],
+        "categories": [],
+        "annotations": []
+    }
+    (tmp_path / "annotations" / "instances_train.json").write_text(json.dumps(document))
+    
+    parser = get_parser(tmp_path)
+    parser.parse()
+    paths = {image.filename: image.filepath for image in parser.get_images()}
+    assert paths == {
+        "direct.jpg": str(tmp_path / "images" / "direct.jpg"),
+        "split.jpg": str(tmp_path / "images" / "train" / "split.jpg"),
+        "nested.jpg": str(tmp_path / "images" / "other" / "nested.jpg"),
+        # Unresolved images keep the direct path
+        "lost.jpg": str(tmp_path / "images" / "lost.jpg")
+    }
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from PIL import Image
+from dataset_analyzer import pixels as pixels_module
+from dataset_analyzer.pixels import BrightnessAccumulator, DECODE_SIZE, analyze_images, summarize_image
+
+def test_brightness_accumulator_matches_numpy():
+    rng = np.random.default_rng(0)
+    batches = [rng.integers(0, 256, size, dtype=np.uint8) for size in [(5, 7), (1, 1), (0, 3), (64, 48), (3, 200)]]
+    # Skewed batches put the Welford merge under more strain than uniform noise
+    batches.append(np.full((10, 10), 255, dtype=np.uint8))
+    batches.append(rng.integers(0, 8, (40, 40), dtype=np.uint8))
+    
+    accumulator = BrightnessAccumulator()
+    for pixels in batches:
+        accumulator.add(pixels)
+    
+    pixels = np.concatenate([batch.ravel() for batch in batches])
+    assert accumulator.count == len(pixels)
+    assert accumulator.mean == pytest.approx(pixels.mean())
+    assert accumulator.std == pytest.approx(pixels.std())
+    assert accumulator.histogram.tolist() == np.bincount(pixels, minlength=256).tolist()
+
+def test_empty_accumulator():
+    accumulator = BrightnessAccumulator()
+    accumulator.add(np.zeros((0, 0), dtype=np.uint8))
+    assert (accumulator.count, accumulator.mean, accumulator.std) == (0, 0.0, 0.0)
+
+@pytest.fixture
+def image_paths(tmp_path):
+    rng = np.random.default_rng(1)
+    paths = []
+    for i in range(6):
+        # Large enough that the decode is reduced, in both a JPEG and a non-JPEG mode
+        pixels = rng.integers(0, 256, (300 + 40 * i, 520, 3), dtype=np.uint8)
+        image = Image.fromarray(pixels)
+        if i % 2:
+            image = image.convert("L")
+        path = tmp_path / (f"{i}.jpg" if i % 3 else f"{i}.png")
+        image.save(path)
+        paths.append(str(path))
+    (tmp_path / "broken.jpg").write_bytes(b"not an image")
+    paths.insert(3, str(tmp_path / "broken.jpg"))
+    return paths
+
+def test_pool_analysis_matches_serial(image_paths, monkeypatch):
+    serial = [summarize_image(path) for path in image_paths]
+    monkeypatch.setattr(pixels_module, "MIN_PARALLEL_IMAGES", 2)
+    pooled = list(analyze_images(image_paths, workers=2))
+    
+    assert len(pooled) == len(serial)
+    for expected, actual in zip(serial, pooled):
+        if expected is None:
+            assert actual is None
+            continue
+        assert actual.mode == expected.mode
+        assert (actual.count, actual.mean, actual.m2, actual.sharpness) == (expected.count, expected.mean, expected.m2, expected.sharpness)
+        assert actual.histogram.tolist() == expected.histogram.tolist()
+        assert actual.channel_means == expected.channel_means
+        # Decoded at reduced size, never the full image
+        assert actual.count < (2 * DECODE_SIZE) ** 2
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from dataset_analyzer.query import QueryEngine, parse_query
+from dataset_analyzer.store import AnnotationStore
+
+@pytest.fixture
+def engine():
+    # a: small cat + large dog, b: large cat, c: no boxes, d: small dog at the left edge
+    store = AnnotationStore()
+    store.set_classes(["cat", "dog"])
+    for image_id, split, width, boxes in [
+        ("a", "train", 640, [(0.4, 0.4, 0.02, 0.02, 0), (0.2, 0.2, 0.6, 0.6, 1)]),
+        ("b", "train", 1280, [(0.2, 0.2, 0.5, 0.5, 0)]),
+        ("c", "val", 640, []),
+        ("d", "val", 320, [(0.0, 0.4, 0.05, 0.05, 1)]),
+    ]:
+        row = store.add_image(image_id, f"{image_id}.jpg", f"/{image_id}.jpg", width, 480, split)
+        for x, y, w, h, class_id in boxes:
+            store.add_box(row, x, y, w, h, class_id)
+    store.finalize()
+    return QueryEngine(store)
+
+def matches(engine, query):
+    return [engine.store.ids[row] for row in np.flatnonzero(engine.evaluate(query)).tolist()]
+
+def test_parse_precedence():
+    assert parse_query("class:cat OR class:dog AND NOT split:val") == (
+        "or", ("term", "class", "cat"), ("and", ("term", "class", "dog"), ("not", ("term", "split", "val")))
+    )
+    # Adjacent terms are ANDed, operators are case-insensitive and quoted values may contain spaces
+    assert parse_query('class:"traffic light" not width:>10') == (
+        "and", ("term", "class", "traffic light"), ("not", ("term", "width", ">10"))
+    )
+    assert parse_query("box(class:cat size:small)") == ("box", ("and", ("term", "class", "cat"), ("term", "size", "small")))
+
+@pytest.mark.parametrize("query, message", [
+    ("colour:red", "Unknown query field"),
+    ("(class:cat", r"Missing '\)'"),
+    ("box(class:cat", r"Missing '\)'"),
+    ("class:cat AND", "Unexpected end of query"),
+    ("NOT", "Unexpected end of query"),
+    ("class:cat)", "Unexpected token"),
+    ("OR class:cat", "Unexpected token"),
+    ("class:cat & class:dog", "Invalid query near"),
+])
+def test_parse_errors(query, message):
+    with pytest.raises(ValueError, match=message):
+        parse_query(query)
+
+@pytest.mark.parametrize("query", ["width:abc", "boxes:1..x", "aspect:>=wide"])
+def test_invalid_ranges(engine, query):
+    with pytest.raises(ValueError, match="Invalid range"):
+        engine.evaluate(query)
+
+def test_unknown_buckets(engine):
+    with pytest.raises(ValueError, match="Unknown box size"):
+        engine.evaluate("size:huge")
+    with pytest.raises(ValueError, match="Unknown edge bucket"):
+        engine.evaluate("edge:middle")
+
+def test_evaluate(engine):
+    assert matches(engine, "class:cat") == ["a", "b"]
+    assert matches(engine, "NOT class:cat") == ["c", "d"]
+    assert matches(engine, "class:bird") == []
+    assert matches(engine, "split:val OR width:>=1280") == ["b", "c", "d"]
+    assert matches(engine, "boxes:1..") == ["a", "b", "d"]
+    assert matches(engine, "boxes:0") == ["c"]
+    assert matches(engine, "edge:left") == ["d"]
+    # Separate terms may be satisfied by different boxes, box(...) needs one box to satisfy both
+    assert matches(engine, "class:cat size:large") == ["a", "b"]
+    assert matches(engine, "box(class:cat size:large)") == ["b"]
+    assert matches(engine, "box(class:dog split:val)") == ["d"]
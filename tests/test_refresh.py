@@ -0,0 +1,131 @@
+import os
+import pytest
+from PIL import Image
+from dataset_analyzer.core import Dataset
+from dataset_analyzer.parsers import YOLOParser
+
+def write_image(path, width=64, height=48):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (width, height)).save(path)
+
+def write_label(path, lines):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"{line}\n" for line in lines))
+
+def touch(path):
+    # Changes must be visible even on filesystems with coarse timestamps
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+
+def write_voc(path, filename, boxes, width=64, height=48):
+    objects = "".join(
+        f"<object><name>{name}</name><bndbox><xmin>{x0}</xmin><ymin>{y0}</ymin><xmax>{x1}</xmax><ymax>{y1}</ymax></bndbox></object>"
+        for name, x0, y0, x1, y1 in boxes
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f"<annotation><filename>{filename}</filename><size><width>{width}</width><height>{height}</height></size>{objects}</annotation>")
+
+@pytest.fixture
+def yolo_dataset(tmp_path):
+    (tmp_path / "classes.txt").write_text("cat\ndog\n")
+    for split in ("train", "val"):
+        for i in range(4):
+            write_image(tmp_path / "images" / split / f"{split}{i}.jpg")
+            write_label(tmp_path / "labels" / split / f"{split}{i}.txt", ["0 0.5 0.5 0.2 0.2", f"1 0.3 0.3 0.1 0.{i + 1}"])
+    return tmp_path
+
+@pytest.fixture
+def voc_dataset(tmp_path):
+    for i in range(4):
+        write_voc(tmp_path / "Annotations" / f"{i:03d}.xml", f"{i:03d}.jpg", [("cat", 1, 2, 30, 40), ("dog", 5, 5, 10, 10 + i)])
+        write_image(tmp_path / "JPEGImages" / f"{i:03d}.jpg")
+    return tmp_path
+
+def snapshot(dataset):
+    store = dataset.stats_calculator.store
+    return {image_id: store.image_info(row).model_dump() for image_id, row in store.index.items()}
+
+def assert_matches_full_parse(dataset, path):
+    fresh = Dataset()
+    fresh.pixel_workers = 1
+    fresh.load(str(path))
+    assert snapshot(dataset) == snapshot(fresh)
+    patched, computed = dataset.get_dataset_stats(), fresh.get_dataset_stats()
+    assert patched == computed
+    # Dict equality ignores order; ties in the class counts must come out in the same order too
+    assert list(patched.class_distribution.items()) == list(computed.class_distribution.items())
+    assert dataset.get_info().classes == fresh.get_info().classes
+
+def load(path):
+    dataset = Dataset()
+    dataset.pixel_workers = 1
+    dataset.load(str(path))
+    # Cached overview stats are patched instead of recomputed on refresh
+    dataset.get_dataset_stats()
+    return dataset
+
+def test_yolo_refresh_matches_full_parse(yolo_dataset):
+    dataset = load(yolo_dataset)
+    generation = dataset.generation
+    
+    write_label(yolo_dataset / "labels" / "train" / "train0.txt", ["1 0.1 0.1 0.1 0.1", "1 0.2 0.2 0.1 0.1", "2 0.5 0.5 0.5 0.5"])
+    touch(yolo_dataset / "labels" / "train" / "train0.txt")
+    os.remove(yolo_dataset / "labels" / "train" / "train1.txt")
+    os.remove(yolo_dataset / "images" / "val" / "val2.jpg")
+    os.remove(yolo_dataset / "labels" / "val" / "val2.txt")
+    write_image(yolo_dataset / "images" / "val" / "new.jpg", 100, 80)
+    write_label(yolo_dataset / "labels" / "val" / "new.txt", ["0 0.5 0.5 0.5 0.5"])
+    # An image without a label is only visible through its directory
+    write_image(yolo_dataset / "images" / "train" / "unlabeled.jpg")
+    for split in ("train", "val"):
+        touch(yolo_dataset / "images" / split)
+    
+    result = dataset.refresh()
+    assert not result.full_reparse
+    assert (result.added, result.modified, result.removed) == (2, 2, 1)
+    assert dataset.generation != generation
+    assert_matches_full_parse(dataset, yolo_dataset)
+
+def test_yolo_refresh_without_changes_keeps_generation(yolo_dataset):
+    dataset = load(yolo_dataset)
+    generation = dataset.generation
+    result = dataset.refresh()
+    assert (result.added, result.modified, result.removed, result.full_reparse) == (0, 0, 0, False)
+    assert dataset.generation == generation
+
+def test_yolo_class_list_change_reparses(yolo_dataset):
+    dataset = load(yolo_dataset)
+    (yolo_dataset / "classes.txt").write_text("cat\ndog\nbird\n")
+    touch(yolo_dataset / "classes.txt")
+    assert dataset.refresh().full_reparse
+    assert_matches_full_parse(dataset, yolo_dataset)
+
+def test_full_reparse_runs_outside_update_lock(yolo_dataset, monkeypatch):
+    dataset = load(yolo_dataset)
+    (yolo_dataset / "classes.txt").write_text("cat\ndog\nbird\n")
+    touch(yolo_dataset / "classes.txt")
+    locked = []
+    parse = YOLOParser.parse
+    
+    def recording_parse(parser):
+        locked.append(dataset._update_lock.locked())
+        parse(parser)
+    
+    monkeypatch.setattr(YOLOParser, "parse", recording_parse)
+    assert dataset.refresh().full_reparse
+    assert locked == [False]
+    assert dataset.parser.store is dataset.stats_calculator.store
+
+def test_voc_refresh_matches_full_parse(voc_dataset):
+    dataset = load(voc_dataset)
+    write_voc(voc_dataset / "Annotations" / "001.xml", "001.jpg", [("bird", 0, 0, 20, 20)], width=32, height=32)
+    touch(voc_dataset / "Annotations" / "001.xml")
+    os.remove(voc_dataset / "Annotations" / "002.xml")
+    write_voc(voc_dataset / "Annotations" / "004.xml", "004.jpg", [("cat", 3, 3, 9, 9), ("bird", 1, 1, 5, 5)])
+    write_image(voc_dataset / "JPEGImages" / "004.jpg")
+    
+    result = dataset.refresh()
+    assert not result.full_reparse
+    assert (result.added, result.modified, result.removed) == (1, 1, 1)
+    assert_matches_full_parse(dataset, voc_dataset)
+    assert list(dataset.get_dataset_stats().class_distribution.items()) == [("cat", 3), ("bird", 2), ("dog", 2)]
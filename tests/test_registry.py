@@ -0,0 +1,104 @@
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from dataset_analyzer import server
+from dataset_analyzer.registry import DatasetRegistry, dataset_id_for
+
+def make_dataset(root, num_images=6):
+    (root / "images").mkdir(parents=True)
+    (root / "labels").mkdir()
+    (root / "classes.txt").write_text("cat\ndog\n")
+    for i in range(num_images):
+        Image.new("RGB", (32, 24)).save(root / "images" / f"{i}.jpg")
+        (root / "labels" / f"{i}.txt").write_text(f"{i % 2} 0.5 0.5 0.2 0.2\n")
+    return root
+
+@pytest.fixture
+def paths(tmp_path):
+    return [make_dataset(tmp_path / name) for name in ("a", "b", "c")]
+
+def ids(paths):
+    return [dataset_id_for(path.resolve()) for path in paths]
+
+def new_registry(paths, datasets_in_budget):
+    # Equal-sized datasets, so the budget is a dataset count
+    probe = DatasetRegistry()
+    probe.load(str(paths[0]))
+    size = probe.default.memory_bytes()
+    registry = DatasetRegistry(memory_budget=int(size * (datasets_in_budget + 0.5)))
+    registry.pixel_workers = 1
+    return registry
+
+def test_budget_evicts_least_recently_used(paths):
+    a, b, c = ids(paths)
+    registry = new_registry(paths, 2)
+    registry.load(str(paths[0]))
+    registry.load(str(paths[1]), make_default=False)
+    evicted = registry.get(b)
+    registry.load(str(paths[2]), make_default=False)
+    
+    assert registry.default_id == a
+    assert registry.get(b) is None
+    assert registry.get(c) is not None
+    assert evicted.stats_jobs.closed
+    assert {entry.id: entry.loaded for entry in registry.entries()} == {a: True, b: False, c: True}
+
+def test_default_dataset_is_never_evicted(paths):
+    a, b, c = ids(paths)
+    registry = new_registry(paths, 2)
+    registry.load(str(paths[0]))
+    registry.load(str(paths[1]), make_default=False)
+    # b is now more recently used than a, but a is still the default
+    registry.get(b)
+    registry.load(str(paths[2]), make_default=False)
+    registry.get(c)
+    assert registry.get(a) is not None
+    assert registry.default is registry.get(a)
+
+def test_restore_goes_through_a_load_job(paths):
+    a, b, c = ids(paths)
+    registry = new_registry(paths, 2)
+    for path in paths:
+        registry.load(str(path), make_default=path == paths[0])
+    assert registry.get(b) is None
+    
+    job = registry.restore(b)
+    # Concurrent requests for the same dataset share the restore
+    assert registry.restore(b) is job
+    info = job.future.result(timeout=30)
+    assert info.id == b
+    assert registry.get(b) is not None
+    assert registry.default_id == a
+    assert registry.restore("unknown") is None
+
+def test_unloaded_dataset_is_not_restored(paths):
+    a, b, _ = ids(paths)
+    registry = new_registry(paths, 2)
+    registry.load(str(paths[0]))
+    registry.load(str(paths[1]), make_default=False)
+    dataset = registry.get(b)
+    assert registry.unload(b)
+    assert dataset.stats_jobs.closed
+    assert registry.get(b) is None
+    assert registry.restore(b) is None
+    assert not registry.unload(b)
+
+def test_server_answers_evicted_dataset_with_restore_job(paths, monkeypatch):
+    a, b, _ = ids(paths)
+    registry = new_registry(paths, 2)
+    for path in paths:
+        registry.load(str(path), make_default=path == paths[0])
+    monkeypatch.setattr(server, "registry", registry)
+    client = TestClient(server.app)
+    
+    response = client.get(f"/api/datasets/{b}/stats/overview")
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.headers["location"] == f"/api/dataset/load/jobs/{job_id}"
+    registry.load_jobs.get(job_id).future.result(timeout=30)
+    assert client.get(response.headers["location"]).json()["state"] == "done"
+    
+    response = client.get(f"/api/datasets/{b}/stats/overview")
+    assert response.status_code == 200
+    assert response.json()["total_images"] == 6
+    assert client.get("/api/datasets/unknown/stats/overview").status_code == 404
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+from dataset_analyzer import server
+from dataset_analyzer.registry import DatasetRegistry
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    root = tmp_path / "dataset"
+    (root / "images").mkdir(parents=True)
+    (root / "labels").mkdir()
+    (root / "classes.txt").write_text("".join(f"class{i}\n" for i in range(40)))
+    for i in range(30):
+        Image.new("RGB", (64, 48)).save(root / "images" / f"{i:03d}.jpg")
+        (root / "labels" / f"{i:03d}.txt").write_text(f"{i % 40} 0.5 0.5 0.2 0.2\n{(i * 7) % 40} 0.3 0.3 0.1 0.1\n")
+    registry = DatasetRegistry()
+    registry.pixel_workers = 1
+    registry.load(str(root))
+    monkeypatch.setattr(server, "registry", registry)
+    monkeypatch.setattr(server.thumbnails, "root", tmp_path / "thumbnails")
+    return TestClient(server.app)
+
+def test_etag_revalidation(client):
+    first = client.get("/api/stats/overview")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    
+    revalidated = client.get("/api/stats/overview", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert client.get("/api/stats/overview", headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+    # Unversioned routes are left alone
+    assert "etag" not in client.get("/api/datasets").headers
+
+def test_compressed_bodies(client):
+    plain = client.get("/api/stats/spatial", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    for _ in range(2):
+        # The second request is served from the memoized body
+        raw = client.get("/api/stats/spatial", headers={"Accept-Encoding": "gzip"})
+        assert raw.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in raw.headers["vary"]
+        assert raw.json() == plain.json()
+        assert int(raw.headers["content-length"]) < len(plain.content)
+
+def test_cors_headers_follow_each_request(client):
+    # Credentialed CORS echoes the request Origin, so a memoized response must not replay another origin's headers
+    for origin in ("http://a.example", "http://b.example"):
+        response = client.get("/api/stats/overview", headers={"Origin": origin})
+        assert response.headers["access-control-allow-origin"] == origin
+    assert "access-control-allow-origin" not in client.get("/api/stats/overview").headers
+
+def test_image_list_prewarms_every_time(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(server.thumbnails, "prewarm", calls.append)
+    for _ in range(2):
+        response = client.get("/api/images", params={"limit": 10})
+        assert response.status_code == 200
+        assert "etag" in response.headers
+    assert len(calls) == 2 and len(calls[0]) == 10
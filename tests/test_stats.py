@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from collections import Counter
+from dataset_analyzer.stats import StatsCalculator
+from dataset_analyzer.store import AnnotationStore
+
+GRID = 10
+
+@pytest.fixture
+def store():
+    rng = np.random.default_rng(0)
+    store = AnnotationStore()
+    store.set_classes(["cat", "dog", "bird", "unused"])
+    for row in range(40):
+        store.add_image(str(row), f"{row}.jpg", f"/data/{row}.jpg", int(rng.integers(100, 1200)), int(rng.integers(80, 900)), "train")
+        # Every fifth image stays empty
+        for _ in range(0 if row % 5 == 0 else int(rng.integers(1, 8))):
+            w, h = rng.uniform(0.005, 0.7, 2)
+            x, y = rng.uniform(-0.1, 1.05 - w), rng.uniform(-0.1, 1.05 - h)
+            store.add_box(row, x, y, w, h, int(rng.integers(0, 3)))
+    # Zero height, and a centre past the bottom-right corner
+    store.add_box(1, 0.5, 0.5, 0.1, 0.0, 0)
+    store.add_box(2, 0.9, 0.95, 0.3, 0.3, 1)
+    store.finalize()
+    return store
+
+def reference_stats(store):
+    # One box at a time, the way the stats were computed before they were vectorized
+    classes = Counter()
+    sizes = Counter()
+    edges = Counter()
+    heatmaps = {}
+    areas = []
+    for row in range(store.num_images):
+        for i in range(store.offsets[row], store.offsets[row + 1]):
+            x, y, w, h = (float(a[i]) for a in (store.x, store.y, store.w, store.h))
+            name = store.classes[store.class_ids[i]]
+            classes[name] += 1
+            pw, ph = w * store.widths[row], h * store.heights[row]
+            areas.append(pw * ph)
+            sizes["tiny"] += pw < 16 or ph < 16
+            sizes["small" if pw * ph < 32 * 32 else "medium" if pw * ph < 96 * 96 else "large"] += 1
+            if y < 0.05:
+                edges["top"] += 1
+            elif y + h > 0.95:
+                edges["bottom"] += 1
+            elif x < 0.05:
+                edges["left"] += 1
+            elif x + w > 0.95:
+                edges["right"] += 1
+            else:
+                edges["center"] += 1
+            gx = min(max(int((x + w / 2) * GRID), 0), GRID - 1)
+            gy = min(max(int((y + h / 2) * GRID), 0), GRID - 1)
+            heatmaps.setdefault(name, np.zeros((GRID, GRID)))[gy, gx] += 1
+    return classes, sizes, edges, heatmaps, areas
+
+def test_vectorized_stats_match_per_box_loop(store):
+    classes, sizes, edges, heatmaps, areas = reference_stats(store)
+    calculator = StatsCalculator(store)
+    dataset_stats = calculator.compute_dataset_stats()
+    box_stats = calculator.compute_box_stats()
+    spatial_stats = calculator.compute_spatial_stats(GRID)
+    
+    assert dataset_stats.class_distribution == dict(classes)
+    assert dataset_stats.total_classes == 3
+    assert dataset_stats.empty_images == 8
+    counts = [store.offsets[row + 1] - store.offsets[row] for row in range(store.num_images)]
+    assert box_stats.boxes_per_image == {
+        "min": min(counts),
+        "max": max(counts),
+        "avg": round(float(np.mean(counts)), 1),
+        "median": int(np.median(counts))
+    }
+    assert (box_stats.tiny_boxes, box_stats.small_count, box_stats.medium_count, box_stats.large_count) == (
+        sizes["tiny"], sizes["small"], sizes["medium"], sizes["large"]
+    )
+    # Histograms are scaled to the tallest bin
+    hist, _ = np.histogram(areas, bins=len(box_stats.size_distribution))
+    assert box_stats.size_distribution == [int(v / hist.max() * 100) for v in hist]
+    
+    assert spatial_stats.edge_proximity == {
+        name: round(edges[name] / store.num_boxes * 100, 1) for name in ("top", "bottom", "left", "right", "center")
+    }
+    total = sum(heatmaps.values())
+    assert np.allclose(spatial_stats.heatmap, total / total.max())
+    assert set(spatial_stats.per_class_heatmaps) == set(heatmaps)
+    for name, heatmap in heatmaps.items():
+        assert np.allclose(spatial_stats.per_class_heatmaps[name], heatmap / heatmap.max())
+
+def test_empty_store_stats():
+    store = AnnotationStore()
+    store.finalize()
+    calculator = StatsCalculator(store)
+    assert calculator.compute_dataset_stats().total_images == 0
+    assert calculator.compute_box_stats().boxes_per_image == {"min": 0, "max": 0, "avg": 0.0, "median": 0}
+    assert calculator.compute_spatial_stats(GRID).per_class_heatmaps == {}
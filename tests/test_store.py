@@ -0,0 +1,99 @@
+import numpy as np
+from dataset_analyzer.store import AnnotationStore
+
+def build(images, classes=("cat", "dog")):
+    # images: (id, split, [(x, y, w, h, class_name), ...]); the store is finalized
+    store = AnnotationStore()
+    store.set_classes(list(classes))
+    for image_id, split, boxes in images:
+        row = store.add_image(image_id, f"{image_id}.jpg", f"/data/{image_id}.jpg", 640, 480, split)
+        for x, y, w, h, class_name in boxes:
+            store.add_box(row, x, y, w, h, store.class_id(class_name))
+    store.finalize()
+    return store
+
+def as_dict(store):
+    return {image_id: store.image_info(row).model_dump() for image_id, row in store.index.items()}
+
+def test_finalize_groups_boxes_by_image():
+    store = build([
+        ("a", "train", [(0.1, 0.1, 0.2, 0.2, "cat")]),
+        ("b", None, []),
+        ("c", "val", [(0.5, 0.5, 0.1, 0.1, "dog"), (0.0, 0.0, 0.3, 0.3, "cat")]),
+    ])
+    assert store.ids == ["a", "b", "c"]
+    assert store.box_counts().tolist() == [1, 0, 2]
+    assert store.offsets.tolist() == [0, 1, 1, 3]
+    assert store.image_index.tolist() == [0, 2, 2]
+    assert store.split_ids.tolist() == [0, -1, 1]
+    assert [box.class_name for box in store.get_image("c").annotations] == ["dog", "cat"]
+
+def test_finalize_keeps_last_row_of_duplicate_id():
+    store = AnnotationStore()
+    first = store.add_image("a", "a.jpg", "/old/a.jpg", 100, 100)
+    store.add_box(first, 0.1, 0.1, 0.1, 0.1, store.class_id("cat"))
+    other = store.add_image("b", "b.jpg", "/b.jpg", 100, 100)
+    store.add_box(other, 0.2, 0.2, 0.2, 0.2, store.class_id("dog"))
+    second = store.add_image("a", "a.jpg", "/new/a.jpg", 200, 50)
+    store.add_box(second, 0.3, 0.3, 0.3, 0.3, store.class_id("dog"))
+    store.add_box(second, 0.4, 0.4, 0.4, 0.4, store.class_id("dog"))
+    store.finalize()
+    
+    assert store.ids == ["b", "a"]
+    assert store.index == {"b": 0, "a": 1}
+    assert store.filepaths == ["/b.jpg", "/new/a.jpg"]
+    assert store.widths.tolist() == [100, 200]
+    assert store.box_counts().tolist() == [1, 2]
+    image = store.get_image("a")
+    assert (image.width, image.height) == (200, 50)
+    assert [box.x for box in image.annotations] == [0.3, 0.4]
+
+def test_merge_matches_a_store_built_from_scratch():
+    store = build([
+        ("a", "train", [(0.1, 0.1, 0.2, 0.2, "cat")]),
+        ("b", "train", [(0.2, 0.2, 0.2, 0.2, "dog")]),
+        ("c", "val", [(0.3, 0.3, 0.1, 0.1, "cat"), (0.4, 0.4, 0.1, 0.1, "cat")]),
+    ])
+    patch = store.derive()
+    row = patch.add_image("b", "b.jpg", "/data/b.jpg", 640, 480, "val")
+    patch.add_box(row, 0.5, 0.5, 0.1, 0.1, patch.class_id("bird"))
+    row = patch.add_image("d", "d.jpg", "/data/d.jpg", 640, 480, "test")
+    patch.add_box(row, 0.6, 0.6, 0.1, 0.1, patch.class_id("dog"))
+    patch.finalize()
+    
+    merged = store.merge(patch, removed_ids=["c"])
+    expected = build([
+        ("a", "train", [(0.1, 0.1, 0.2, 0.2, "cat")]),
+        ("b", "val", [(0.5, 0.5, 0.1, 0.1, "bird")]),
+        ("d", "test", [(0.6, 0.6, 0.1, 0.1, "dog")]),
+    ], classes=("cat", "dog", "bird"))
+    
+    assert merged.ids == ["a", "b", "d"]
+    assert as_dict(merged) == as_dict(expected)
+    assert merged.offsets.tolist() == expected.offsets.tolist()
+    # The original store is left untouched for its readers
+    assert store.ids == ["a", "b", "c"] and store.num_boxes == 4
+
+def test_merge_with_duplicate_ids_in_patch():
+    store = build([("a", None, [(0.1, 0.1, 0.1, 0.1, "cat")]), ("b", None, [])])
+    patch = store.derive()
+    patch.add_image("a", "a.jpg", "/data/a.jpg", 640, 480)
+    row = patch.add_image("a", "a.jpg", "/data/a.jpg", 320, 240)
+    patch.add_box(row, 0.7, 0.7, 0.1, 0.1, patch.class_id("dog"))
+    patch.finalize()
+    
+    merged = store.merge(patch)
+    assert merged.ids == ["a", "b"]
+    image = merged.get_image("a")
+    assert (image.width, image.height) == (320, 240)
+    assert [box.class_name for box in image.annotations] == ["dog"]
+    assert merged.box_counts().tolist() == [1, 0]
+
+def test_merge_removing_everything():
+    store = build([("a", None, [(0.1, 0.1, 0.1, 0.1, "cat")])])
+    patch = store.derive()
+    patch.finalize()
+    merged = store.merge(patch, removed_ids=["a", "missing"])
+    assert merged.num_images == 0 and merged.num_boxes == 0
+    assert merged.offsets.tolist() == [0]
+    assert np.array_equal(merged.image_index, np.zeros(0, dtype=np.int32))
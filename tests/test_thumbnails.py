@@ -0,0 +1,82 @@
+import os
+import threading
+import pytest
+from PIL import Image
+from dataset_analyzer import thumbnails as thumbnails_module
+from dataset_analyzer.thumbnails import ThumbnailCache, MAX_PREWARM_PENDING
+
+def write_image(path, size=(800, 600), color=(200, 30, 30)):
+    Image.new("RGB", size, color).save(path, quality=95)
+    return str(path)
+
+@pytest.fixture
+def source(tmp_path):
+    return write_image(tmp_path / "photo.jpg")
+
+def test_renders_and_reuses_thumbnails(tmp_path, source, monkeypatch):
+    cache = ThumbnailCache(tmp_path / "cache")
+    path = cache.get(source, 128, "jpeg")
+    with Image.open(path) as thumb:
+        assert thumb.format == "JPEG"
+        assert max(thumb.size) == 128 and thumb.size == (128, 96)
+    with Image.open(cache.get(source, 256, "webp")) as thumb:
+        assert thumb.format == "WEBP"
+    
+    renders = []
+    monkeypatch.setattr(thumbnails_module, "render_thumbnail", lambda *args: renders.append(args))
+    assert cache.get(source, 128, "jpeg") == path
+    assert renders == []
+    
+    # A changed source gets a new cache key
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+    assert cache.path_for(source, 128, "jpeg") != path
+
+def test_rejects_unsupported_options(tmp_path, source):
+    cache = ThumbnailCache(tmp_path / "cache")
+    with pytest.raises(ValueError, match="size"):
+        cache.get(source, 100)
+    with pytest.raises(ValueError, match="format"):
+        cache.get(source, 128, "png")
+
+def test_evicts_least_recently_used(tmp_path):
+    sources = [write_image(tmp_path / f"{i}.jpg", color=(i * 20, 255 - i * 20, i)) for i in range(8)]
+    probe = ThumbnailCache(tmp_path / "probe")
+    size = probe.get(sources[0], 128).stat().st_size
+    cache = ThumbnailCache(tmp_path / "cache", max_bytes=int(size * 4.5))
+    paths = []
+    for i, src in enumerate(sources):
+        paths.append(cache.get(src, 128))
+        # mtime is the LRU clock; keep it strictly increasing on coarse filesystems
+        os.utime(paths[-1], ns=(i * 10**9, i * 10**9))
+    total = sum(entry.stat().st_size for entry in cache._entries())
+    assert total <= cache.max_bytes
+    assert paths[-1].exists()
+    assert not paths[0].exists()
+    assert cache._total_bytes == total
+
+def test_prewarm_dedupes_and_caps_queue(tmp_path, source, monkeypatch):
+    cache = ThumbnailCache(tmp_path / "cache", workers=1)
+    release = threading.Event()
+    rendered = []
+    
+    def slow_get(src, size, fmt):
+        assert release.wait(30)
+        rendered.append(src)
+    
+    monkeypatch.setattr(cache, "get", slow_get)
+    monkeypatch.setattr(cache, "path_for", lambda src, size, fmt: tmp_path / "not-rendered")
+    many = [f"{source}.{i}" for i in range(MAX_PREWARM_PENDING + 50)]
+    cache.prewarm([source, source] + many)
+    assert len(cache._pending) == MAX_PREWARM_PENDING
+    release.set()
+    cache.executor.shutdown(wait=True)
+    assert len(rendered) == MAX_PREWARM_PENDING
+    assert rendered.count(source) == 1
+    assert cache._pending == set()
+
+def test_prewarm_renders_into_the_cache(tmp_path, source):
+    cache = ThumbnailCache(tmp_path / "cache")
+    cache.prewarm([source, str(tmp_path / "missing.jpg")])
+    cache.executor.shutdown(wait=True)
+    assert cache.path_for(source, 256, "jpeg").exists()
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from PIL import Image
+from dataset_analyzer.store import AnnotationStore
+from dataset_analyzer.validation import validate, box_issue_masks, BOUNDS_TOLERANCE, RULES
+
+def reference_box_rules(x, y, w, h, class_name, undeclared):
+    # One box at a time, as the rules are documented
+    rules = []
+    if not all(np.isfinite(v) for v in (x, y, w, h)):
+        return ["nan_coordinates"] + (["unknown_class"] if class_name in undeclared else [])
+    if w <= 0 or h <= 0:
+        rules.append("degenerate_box")
+    t = BOUNDS_TOLERANCE
+    if x < -t or y < -t or x + w > 1 + t or y + h > 1 + t:
+        rules.append("out_of_bounds")
+    if class_name in undeclared:
+        rules.append("unknown_class")
+    return rules
+
+def test_box_rules_match_per_box_checks():
+    rng = np.random.default_rng(17)
+    store = AnnotationStore()
+    store.set_classes(["cat", "dog", "class_7"])
+    for i in range(100):
+        row = store.add_image(str(i), f"{i}.jpg", f"/{i}.jpg", 100, 100)
+        n = int(rng.integers(0, 6))
+        values = rng.choice([-0.1, -0.0005, 0.0, 0.2, 0.5, 0.9995, 1.0, 1.2, np.nan, np.inf], size=(n, 4))
+        store.add_boxes(np.full(n, row), values[:, 0], values[:, 1], values[:, 2], values[:, 3], rng.integers(0, 3, n))
+    store.finalize()
+    
+    masks = box_issue_masks(store, ["class_7"])
+    for box in range(store.num_boxes):
+        coords = [float(np.float32(column[box])) for column in (store.x, store.y, store.w, store.h)]
+        expected = reference_box_rules(*coords, store.classes[store.class_ids[box]], ["class_7"])
+        assert [rule for rule, mask in masks.items() if mask[box]] == expected
+
+@pytest.fixture
+def store(tmp_path):
+    Image.new("RGB", (100, 50)).save(tmp_path / "good.jpg")
+    Image.new("RGB", (80, 50)).save(tmp_path / "resized.jpg")
+    (tmp_path / "corrupt.jpg").write_bytes(b"not an image")
+    store = AnnotationStore()
+    store.set_classes(["cat"])
+    unknown = store.class_id("class_3")
+    for name in ("good", "resized", "corrupt", "missing"):
+        store.add_image(name, f"{name}.jpg", str(tmp_path / f"{name}.jpg"), 100, 50, "train")
+    good = store.index["good"]
+    store.add_box(good, 0.1, 0.1, 0.2, 0.2, 0)
+    store.add_box(good, 0.9, 0.1, 0.1 + BOUNDS_TOLERANCE / 2, 0.2, 0)
+    store.add_box(good, 0.5, 0.5, 0.0, 0.2, 0)
+    store.add_box(good, np.nan, 0.5, 0.1, 0.2, unknown)
+    store.add_box(store.index["missing"], 0.8, 0.8, 0.4, 0.1, unknown)
+    store.finalize()
+    return store
+
+def test_validate_reports_every_rule(store):
+    index = validate(store, ["class_3"], workers=2)
+    report = index.report
+    assert report.issues_per_rule == {
+        "nan_coordinates": 1, "degenerate_box": 1, "out_of_bounds": 1, "unknown_class": 2,
+        "missing_file": 1, "unreadable_image": 1, "size_mismatch": 1,
+    }
+    assert report.total_issues == 8
+    # Counted per issue: the NaN box and the out-of-bounds box each also carry unknown_class
+    assert report.issues_per_class == {"cat": 1, "class_3": 4}
+    assert (report.checked_images, report.checked_boxes) == (4, 5)
+    assert (report.images_with_issues, report.boxes_with_issues) == (4, 3)
+    
+    mismatch, total = index.page("size_mismatch", 1, 10)
+    assert total == 1
+    assert (mismatch[0].image_id, mismatch[0].image_size, mismatch[0].header_size) == ("resized", [100, 50], [80, 50])
+    nan_box = index.page("nan_coordinates", 1, 10)[0][0]
+    assert (nan_box.image_id, nan_box.box_index, nan_box.class_name, nan_box.split) == ("good", 3, "class_3", "train")
+    
+    # Unfiltered pages are ordered by image, then box with image-level issues first
+    issues, total = index.page(None, 1, 100)
+    assert total == 8
+    assert [(issue.image_id, issue.box_index, issue.rule) for issue in issues[:4]] == [
+        ("good", 2, "degenerate_box"), ("good", 3, "nan_coordinates"), ("good", 3, "unknown_class"), ("resized", None, "size_mismatch"),
+    ]
+    assert [issue.rule for issue in index.page(None, 2, 3)[0]] == [issue.rule for issue in issues[3:6]]
+    with pytest.raises(ValueError, match="Unknown validation rule"):
+        index.page("blurry", 1, 10)
+
+def test_validate_without_headers(store):
+    progress = []
+    report = validate(store, ["class_3"], check_headers=False, progress=lambda done, total: progress.append((done, total))).report
+    assert not report.headers_checked
+    assert report.issues_per_rule["unreadable_image"] == report.issues_per_rule["size_mismatch"] == 0
+    assert report.issues_per_rule["missing_file"] == 1
+    assert progress == [(4, 4)]
+    assert set(report.issues_per_rule) == set(RULES)
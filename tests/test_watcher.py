@@ -0,0 +1,68 @@
+import os
+import time
+import pytest
+from PIL import Image
+from dataset_analyzer import watcher as watcher_module
+from dataset_analyzer.registry import DatasetRegistry
+from dataset_analyzer.watcher import DatasetWatcher, POLL_COST_FACTOR
+
+@pytest.fixture
+def registry(tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "labels").mkdir()
+    (tmp_path / "classes.txt").write_text("cat\ndog\n")
+    for i in range(3):
+        Image.new("RGB", (32, 24)).save(tmp_path / "images" / f"{i}.jpg")
+        (tmp_path / "labels" / f"{i}.txt").write_text("0 0.5 0.5 0.2 0.2\n")
+    registry = DatasetRegistry()
+    registry.pixel_workers = 1
+    registry.load(str(tmp_path))
+    return registry
+
+@pytest.fixture
+def polling(monkeypatch):
+    # Force the fallback even where watchdog is installed
+    monkeypatch.setattr(watcher_module, "Observer", None)
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_polling_picks_up_label_changes(registry, tmp_path, polling):
+    watcher = DatasetWatcher(registry, poll_interval=0.02)
+    assert not watcher.uses_notifications
+    watcher.start()
+    try:
+        label = tmp_path / "labels" / "1.txt"
+        label.write_text("1 0.5 0.5 0.2 0.2\n1 0.1 0.1 0.1 0.1\n")
+        st = os.stat(label)
+        os.utime(label, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+        wait_for(lambda: watcher.last_result is not None)
+    finally:
+        watcher.stop()
+    result = watcher.last_result
+    assert (result.added, result.modified, result.removed, result.full_reparse) == (0, 1, 0, False)
+    assert registry.default.get_dataset_stats().class_distribution == {"dog": 2, "cat": 2}
+
+def test_polling_interval_grows_with_poll_cost(registry, polling, monkeypatch):
+    watcher = DatasetWatcher(registry, poll_interval=0.5)
+    timeouts = []
+    monkeypatch.setattr(watcher._stop, "wait", lambda timeout: timeouts.append(timeout) or False)
+    assert watcher._wait_for_changes()
+    watcher._poll_cost = 0.2
+    assert watcher._wait_for_changes()
+    assert timeouts == [0.5, POLL_COST_FACTOR * 0.2]
+
+def test_polling_without_changes_leaves_datasets_alone(registry, polling):
+    dataset = registry.default
+    generation = dataset.generation
+    watcher = DatasetWatcher(registry, poll_interval=0.01)
+    watcher.start()
+    try:
+        wait_for(lambda: watcher._poll_cost > 0)
+    finally:
+        watcher.stop()
+    assert watcher.last_result is None
+    assert dataset.generation == generation